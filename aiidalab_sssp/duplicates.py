@@ -0,0 +1,105 @@
+"""Module contains the lookup of the finished verifications of a pseudo with the
+same settings, so that a resubmission can reuse them or run only the properties
+missing from them. The verifications are matched by the md5 of the UPF file and
+a hash of the settings, which is stored in the extras of the work chain on
+submission."""
+import hashlib
+import json
+
+from aiida.common.links import LinkType
+from aiida.orm import QueryBuilder, WorkflowNode
+from aiida.plugins import DataFactory
+from aiida_sssp_workflow.workflows.verifications import DEFAULT_PROPERTIES_LIST
+
+UpfData = DataFactory("pseudo.upf")
+
+SETTINGS_HASH_EXTRA = "sssp_settings_hash"
+
+# The state in the submission report of a pseudo with a finished verification reused
+REUSED = "reused"
+
+# The inputs of the verification which change the results of a property, the
+# resources and the parallelization do not
+SETTINGS_KEYS = {
+    "accuracy": ("protocol", "cutoff_control"),
+    "convergence": ("protocol", "cutoff_control", "criteria"),
+}
+
+
+def settings_hash(inputs) -> str:
+    """Return the hash of the settings of the json inputs of a verification"""
+    settings = {
+        namespace: {key: inputs[namespace].get(key) for key in keys}
+        for namespace, keys in SETTINGS_KEYS.items()
+    }
+    return hashlib.md5(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def verification_settings(node) -> dict:
+    """Return the settings of a verification work chain read from its inputs, in
+    the form of the json inputs"""
+    inputs = {namespace: {} for namespace in SETTINGS_KEYS}
+    for link in node.base.links.get_incoming(link_type=LinkType.INPUT_WORK).all():
+        namespace, _, key = link.link_label.partition("__")
+        if key in SETTINGS_KEYS.get(namespace, ()):
+            inputs[namespace][key] = link.node.value
+
+    return inputs
+
+
+def node_settings_hash(node) -> str:
+    """Return the settings hash of a verification work chain.
+
+    The hash is read from the extras, for the verifications submitted before the
+    hash was stored it is computed from their inputs, the node is not modified.
+    """
+    value = node.base.extras.get(SETTINGS_HASH_EXTRA, None)
+    if value is not None:
+        return value
+
+    return settings_hash(verification_settings(node))
+
+
+def find_verifications(md5, inputs) -> list:
+    """Return the verifications of the pseudo of the md5 finished ok with the same
+    settings as the json inputs, the newest first"""
+    query = QueryBuilder()
+    query.append(UpfData, filters={"attributes.md5": md5}, tag="pseudo")
+    query.append(
+        WorkflowNode,
+        with_incoming="pseudo",
+        edge_filters={"label": "pseudo"},
+        filters={
+            "attributes.process_label": "VerificationWorkChain",
+            "attributes.process_state": "finished",
+            "attributes.exit_status": 0,
+        },
+        project="*",
+        tag="verification",
+    )
+    query.order_by({"verification": {"ctime": "desc"}})
+
+    value = settings_hash(inputs)
+    return [node for node in query.all(flat=True) if node_settings_hash(node) == value]
+
+
+def verified_properties(node) -> set:
+    """Return the properties with results in the outputs of the verification"""
+    link_labels = node.base.links.get_outgoing(
+        link_type=LinkType.RETURN
+    ).all_link_labels()
+
+    return {
+        prop
+        for prop in DEFAULT_PROPERTIES_LIST
+        if any(
+            label.startswith(f"{prop.replace('.', '__')}__") for label in link_labels
+        )
+    }
+
+
+def missing_properties(nodes, properties_list) -> list:
+    """Return the properties of the list not verified by any of the nodes"""
+    verified = set().union(*(verified_properties(node) for node in nodes))
+
+    return [prop for prop in properties_list if prop not in verified]
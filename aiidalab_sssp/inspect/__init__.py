@@ -2,6 +2,7 @@
 import json
 import os
 import random
+from functools import lru_cache
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -69,6 +70,12 @@ def parse_label(label):
     }
 
 
+@lru_cache(maxsize=None)
+def representive_label(label) -> str:
+    """Return the representive label of the pseudo label, memoised"""
+    return parse_label(label)["representive_label"]
+
+
 def lighten_color(color, amount=0.5):
     """
     Lightens the given color by multiplying (1-luminosity) by the given amount.
@@ -0,0 +1,132 @@
+"""Module contains the cutoff recommendation engine.
+The convergence curves of all pseudos are padded into 2D arrays once, the
+recommended wavefunction and charge density cutoffs of any set of criteria are
+then evaluated with vectorised numpy operations, without new calculations."""
+import numpy as np
+import pandas as pd
+
+from aiidalab_sssp.inspect.dataset import ConvergenceDataset
+
+# The measure the criteria bounds apply to for each property, same as the
+# `_MEASURE_OUT_PROPERTY` the convergence work chain of the property analyses.
+CRITERIA_MEASURES = {
+    "cohesive_energy": "absolute_diff",
+    "phonon_frequencies": "relative_diff",
+    "pressure": "relative_diff",
+    "bands": "eta_c",
+    "delta": "absolute_diff",
+}
+
+RECOMMENDATION_COLUMNS = [
+    "label",
+    "property",
+    "criteria",
+    "wavefunction_cutoff",
+    "chargedensity_cutoff",
+]
+
+
+def convergence_cutoffs(x, y, lower, upper, eps):
+    """Vectorised `convergence_analysis` of aiida-sssp-workflow.
+
+    Walking from the largest cutoff down, the recommended cutoff is the last one
+    before the first value out of bounds. If already the largest cutoff is out of
+    bounds it is recommended.
+
+    :param x: (n_curves, n_points) cutoffs sorted descending, NaN padded at the end.
+    :param y: (n_curves, n_points) values of the curves.
+    :param lower, upper, eps: bounds broadcastable to (..., n_curves, 1), e.g. with
+        a leading axis for multiple criteria.
+    :return: (..., n_curves) recommended cutoffs, NaN for the empty curves.
+    """
+    valid = ~np.isnan(x)
+    with np.errstate(invalid="ignore"):
+        in_bounds = (y > lower - eps) & (y < upper + eps)
+
+    # the padding never breaks the walk but is never recommended
+    converged = np.logical_and.accumulate(in_bounds | ~valid, axis=-1) & valid
+    n_points = x.shape[-1]
+    last = n_points - 1 - np.argmax(converged[..., ::-1], axis=-1)
+
+    cutoffs = np.take_along_axis(
+        np.broadcast_to(x, converged.shape), last[..., np.newaxis], axis=-1
+    )[..., 0]
+
+    return np.where(converged.any(axis=-1), cutoffs, x[..., 0])
+
+
+class CutoffEngine:
+    """Recommended cutoffs of the pseudos for any set of criteria.
+
+    The curves of the dataset are padded into 2D arrays on construction,
+    `recommend` then only evaluates the bounds.
+
+    :param dataset: the `ConvergenceDataset` of the pseudos.
+    :param measures: the measure of each property the bounds apply to.
+    """
+
+    def __init__(self, dataset: ConvergenceDataset, measures=None):
+        measures = measures or CRITERIA_MEASURES
+
+        frames = [
+            dataset.select(prop, measure).assign(property=prop)
+            for prop, measure in measures.items()
+        ]
+        curves = pd.concat(frames, ignore_index=True)
+        curves = curves.dropna(subset=["cutoff"]).sort_values(
+            ["property", "label", "test", "cutoff"], ascending=[True, True, True, False]
+        )
+        curves["point"] = curves.groupby(["property", "label", "test"]).cumcount()
+
+        x = curves.pivot(
+            index=["property", "label", "test"], columns="point", values="cutoff"
+        )
+        y = curves.pivot(
+            index=["property", "label", "test"], columns="point", values="value"
+        )
+
+        self.index = x.index
+        self.x = x.to_numpy(dtype=float)
+        self.y = y.to_numpy(dtype=float)
+        self.properties = np.asarray(self.index.get_level_values("property"))
+
+    def recommend(self, criteria: dict) -> pd.DataFrame:
+        """Return the recommended cutoffs for the criteria.
+
+        :param criteria: dict of criteria name to the criteria of each property,
+            same structure as the criteria protocol, e.g.
+            `{"efficiency": {"cohesive_energy": {"bounds": [0.0, 2.0], "eps": 1e-3}}}`
+        :return: frame with one row per (label, property, criteria).
+        """
+        if not criteria or not len(self.index):
+            return pd.DataFrame(columns=RECOMMENDATION_COLUMNS)
+
+        names = list(criteria.keys())
+        lower = np.full((len(names), len(self.index), 1), np.nan)
+        upper = np.full_like(lower, np.nan)
+        eps = np.zeros_like(lower)
+        for i, name in enumerate(names):
+            for prop, spec in criteria[name].items():
+                if not isinstance(spec, dict) or "bounds" not in spec:
+                    # e.g. the name and description of the protocol
+                    continue
+
+                rows = self.properties == prop
+                lower[i, rows], upper[i, rows] = spec["bounds"]
+                eps[i, rows] = spec.get("eps", 0.0)
+
+        cutoffs = convergence_cutoffs(self.x, self.y, lower, upper, eps)
+        # no recommendation for the property not in the criteria
+        cutoffs[np.isnan(upper[..., 0])] = np.nan
+
+        frame = pd.DataFrame(cutoffs.T, index=self.index, columns=names)
+        frame = frame.rename_axis(columns="criteria").stack(dropna=False)
+        frame = frame.unstack("test")
+
+        return pd.DataFrame(
+            {
+                "wavefunction_cutoff": frame.get("wfc", np.nan),
+                "chargedensity_cutoff": frame.get("rho", np.nan),
+            },
+            index=frame.index,
+        ).reset_index()[RECOMMENDATION_COLUMNS]
@@ -0,0 +1,119 @@
+"""Module contains the tidy columnar dataset of the convergence results.
+The nested convergence results of the selected pseudos are converted once into
+pandas frames, the plots and summaries filter these frames instead of walking
+the nested dicts on every render."""
+from dataclasses import dataclass
+
+import pandas as pd
+
+# The cutoff key of the wavefunction and charge density cutoff tests
+_TESTS = {
+    "wfc": "ecutwfc",
+    "rho": "ecutrho",
+}
+
+CURVES_COLUMNS = ["label", "property", "test", "cutoff", "measure", "value"]
+CUTOFFS_COLUMNS = [
+    "label",
+    "property",
+    "wavefunction_cutoff",
+    "chargedensity_cutoff",
+    "precision_wavefunction_cutoff",
+]
+
+
+@dataclass(frozen=True)
+class ConvergenceDataset:
+    """The convergence results of pseudos as two frames:
+
+    - curves: one row per (label, property, test, cutoff, measure) with its value,
+      the test is `wfc` or `rho`. Indexed by (property, measure) for cheap slicing.
+    - cutoffs: one row per (label, property) with the stored recommended cutoffs.
+    """
+
+    curves: pd.DataFrame
+    cutoffs: pd.DataFrame
+
+    def select(self, property, measure) -> pd.DataFrame:
+        """Return the curves of one property and measure"""
+        try:
+            return self.curves.loc[(property, measure)]
+        except KeyError:
+            return self.curves.iloc[0:0].reset_index(drop=True)
+
+    def cutoff(self, label, property, column="wavefunction_cutoff"):
+        """Return the stored cutoff of a pseudo and property, None if missing"""
+        try:
+            value = self.cutoffs.at[(label, property), column]
+        except KeyError:
+            return None
+
+        return None if pd.isna(value) else value
+
+
+def pseudo_convergence_frames(label, pseudo_out) -> tuple:
+    """Convert the convergence results of one pseudo into (curves, cutoffs)"""
+    curves = {key: [] for key in CURVES_COLUMNS}
+    cutoffs = {key: [] for key in CUTOFFS_COLUMNS}
+
+    for prop, res in pseudo_out.get("convergence", {}).items():
+        if not isinstance(res, dict):
+            continue
+
+        for test, cutoff_key in _TESTS.items():
+            output = res.get(f"output_parameters_{test}_test", {})
+            x = output.get(cutoff_key)
+            if not isinstance(x, list):
+                # usually the convergence test on the property is not finished okay
+                continue
+
+            for measure, y in output.items():
+                if measure == cutoff_key or not isinstance(y, list) or len(y) != len(x):
+                    continue
+
+                curves["label"].extend([label] * len(x))
+                curves["property"].extend([prop] * len(x))
+                curves["test"].extend([test] * len(x))
+                curves["cutoff"].extend(x)
+                curves["measure"].extend([measure] * len(x))
+                curves["value"].extend(y)
+
+        output_parameters = res.get("output_parameters", {})
+        cutoffs["label"].append(label)
+        cutoffs["property"].append(prop)
+        cutoffs["wavefunction_cutoff"].append(
+            output_parameters.get("wavefunction_cutoff")
+        )
+        cutoffs["chargedensity_cutoff"].append(
+            output_parameters.get("chargedensity_cutoff")
+        )
+        cutoffs["precision_wavefunction_cutoff"].append(
+            output_parameters.get("all_criteria_wavefunction_cutoff", {}).get(
+                "precision"
+            )
+        )
+
+    return pd.DataFrame(curves), pd.DataFrame(cutoffs)
+
+
+def build_convergence_dataset(frames) -> ConvergenceDataset:
+    """Concatenate the per pseudo (curves, cutoffs) frames into a dataset"""
+    frames = list(frames)
+    curves = pd.concat(
+        [pd.DataFrame(columns=CURVES_COLUMNS)] + [c for c, _ in frames if len(c)],
+        ignore_index=True,
+    )
+    cutoffs = pd.concat(
+        [pd.DataFrame(columns=CUTOFFS_COLUMNS)] + [c for _, c in frames if len(c)],
+        ignore_index=True,
+    )
+
+    for column in ("cutoff", "value"):
+        curves[column] = pd.to_numeric(curves[column], errors="coerce")
+    for column in CUTOFFS_COLUMNS[2:]:
+        cutoffs[column] = pd.to_numeric(cutoffs[column], errors="coerce")
+
+    return ConvergenceDataset(
+        curves=curves.set_index(["property", "measure"]).sort_index(),
+        cutoffs=cutoffs.set_index(["label", "property"]),
+    )
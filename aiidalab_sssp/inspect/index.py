@@ -0,0 +1,203 @@
+"""Module contains the cross-element index of the verification results.
+One row per pseudo with its accuracy and recommended cutoffs is pre-computed from
+the per-element json files of the DB and stored in `index.json`, so that the
+whole periodic table can be summarised and filtered without loading every
+element."""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aiidalab_sssp.inspect import SSSP_DB, parse_label
+from aiidalab_sssp.inspect.cutoffs import CutoffEngine
+from aiidalab_sssp.inspect.dataset import (
+    build_convergence_dataset,
+    pseudo_convergence_frames,
+)
+from aiidalab_sssp.inspect.metrics import compute_accuracy_metrics
+from aiidalab_sssp.inspect.subwidgets.utils import get_criteria_protocol
+
+INDEX_FILENAME = "index.json"
+INDEX_CRITERIA = ("efficiency", "precision")
+
+INDEX_COLUMNS = [
+    "element",
+    "label",
+    "representive_label",
+    "type",
+    "z",
+    "family",
+    "tool",
+    "version",
+    "nu_max",
+    "nu_mean",
+    "delta_max",
+] + [
+    f"{cutoff}_{criteria}"
+    for criteria in INDEX_CRITERIA
+    for cutoff in ("wavefunction_cutoff", "chargedensity_cutoff")
+]
+
+
+def element_rows(element, pseudos, criteria) -> list:
+    """Return the index rows of the pseudos of an element.
+
+    The recommended cutoff of a pseudo is the maximum over the properties.
+    """
+    if not pseudos:
+        return []
+
+    metrics = compute_accuracy_metrics(pseudos)
+    with np.errstate(all="ignore"):
+        nu_max = np.nanmax(np.where(np.isnan(metrics.nu), -np.inf, metrics.nu), axis=1)
+        nu_mean = np.nanmean(metrics.nu, axis=1)
+        delta_max = np.nanmax(
+            np.where(np.isnan(metrics.delta), -np.inf, metrics.delta), axis=1
+        )
+
+    dataset = build_convergence_dataset(
+        pseudo_convergence_frames(label, out) for label, out in pseudos.items()
+    )
+    cutoffs = (
+        CutoffEngine(dataset)
+        .recommend(criteria)
+        .groupby(["label", "criteria"])[["wavefunction_cutoff", "chargedensity_cutoff"]]
+        .max()
+    )
+
+    rows = []
+    for i, label in enumerate(metrics.labels):
+        pseudo_info = parse_label(label)
+        row = {
+            "element": element,
+            "label": label,
+            "representive_label": pseudo_info["representive_label"],
+            "type": pseudo_info["type"],
+            "z": pseudo_info["z"],
+            "family": pseudo_info["family"],
+            "tool": pseudo_info["tool"],
+            "version": pseudo_info["version"],
+            "nu_max": nu_max[i],
+            "nu_mean": nu_mean[i],
+            "delta_max": delta_max[i],
+        }
+        for name in criteria:
+            for cutoff in ("wavefunction_cutoff", "chargedensity_cutoff"):
+                try:
+                    row[f"{cutoff}_{name}"] = cutoffs.at[(label, name), cutoff]
+                except KeyError:
+                    row[f"{cutoff}_{name}"] = np.nan
+
+        # NaN and inf are not valid json, stored as null
+        rows.append(
+            {
+                key: None
+                if isinstance(value, float) and not np.isfinite(value)
+                else value
+                for key, value in row.items()
+            }
+        )
+
+    return rows
+
+
+def _index_frame(rows) -> pd.DataFrame:
+    frame = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+    # the missing values are stored as null
+    for column in INDEX_COLUMNS[INDEX_COLUMNS.index("nu_max") :]:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+
+    return frame
+
+
+def _element_file_rows(json_path, criteria) -> list:
+    element = os.path.basename(json_path).split(".")[0]
+    with open(json_path, "r") as fh:
+        pseudos = json.load(fh)
+
+    return element_rows(element, pseudos, criteria)
+
+
+def _element_files(db):
+    return sorted(
+        os.path.join(db, fn)
+        for fn in os.listdir(db)
+        if fn.endswith(".json") and fn != INDEX_FILENAME
+    )
+
+
+def build_index(db=SSSP_DB, max_workers=None) -> pd.DataFrame:
+    """Build the index of all elements of the DB in parallel and store it"""
+    protocol = get_criteria_protocol()
+    criteria = {name: protocol[name] for name in INDEX_CRITERIA}
+
+    files = _element_files(db)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            _element_file_rows, files, [criteria] * len(files), chunksize=4
+        )
+        rows = [row for result in results for row in result]
+
+    with open(os.path.join(db, INDEX_FILENAME), "w") as fh:
+        json.dump({"columns": INDEX_COLUMNS, "rows": rows}, fh)
+
+    return _index_frame(rows)
+
+
+def update_index(element, db=SSSP_DB) -> pd.DataFrame:
+    """Replace the rows of one element in the index, e.g. after its file changed"""
+    if not os.path.exists(os.path.join(db, INDEX_FILENAME)):
+        return build_index(db)
+
+    protocol = get_criteria_protocol()
+    criteria = {name: protocol[name] for name in INDEX_CRITERIA}
+
+    with open(os.path.join(db, INDEX_FILENAME), "r") as fh:
+        rows = [row for row in json.load(fh)["rows"] if row["element"] != element]
+    rows += _element_file_rows(os.path.join(db, f"{element}.json"), criteria)
+
+    with open(os.path.join(db, INDEX_FILENAME), "w") as fh:
+        json.dump({"columns": INDEX_COLUMNS, "rows": rows}, fh)
+
+    return _index_frame(rows)
+
+
+# The per-element statistics of the index: (column, aggregation)
+ELEMENT_STATS = {
+    "count": ("label", "count"),
+    "best_nu": ("nu_max", "min"),
+    "lowest_cutoff": ("wavefunction_cutoff_efficiency", "min"),
+}
+
+
+def element_stats(index) -> pd.DataFrame:
+    """Return the statistics of each element of the index, one row per element"""
+    return index.groupby("element").agg(
+        **{
+            name: pd.NamedAgg(column=column, aggfunc=aggfunc)
+            for name, (column, aggfunc) in ELEMENT_STATS.items()
+        }
+    )
+
+
+def index_outdated(db=SSSP_DB) -> bool:
+    """Whether the index is missing or older than an element json file"""
+    index_path = os.path.join(db, INDEX_FILENAME)
+    if not os.path.exists(index_path):
+        return True
+
+    index_mtime = os.path.getmtime(index_path)
+    return any(os.path.getmtime(fn) > index_mtime for fn in _element_files(db))
+
+
+def load_index(db=SSSP_DB, rebuild=False) -> pd.DataFrame:
+    """Return the index of the DB, (re)build it if outdated"""
+    if rebuild or index_outdated(db):
+        return build_index(db)
+
+    with open(os.path.join(db, INDEX_FILENAME), "r") as fh:
+        index = json.load(fh)
+
+    return _index_frame(index["rows"])
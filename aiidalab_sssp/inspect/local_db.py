@@ -0,0 +1,132 @@
+"""Module contains the validation and persistence of the uploaded verification
+results. The uploaded pseudos are validated entry by entry against the schema of
+the result json files, the valid ones are merged into the element files of the
+local DB and its index, so they are available in the next sessions."""
+import json
+import os
+import re
+from functools import lru_cache
+from threading import Lock
+
+from aiidalab_sssp.inspect import SSSP_LOCAL_DB
+from aiidalab_sssp.inspect.index import update_index
+
+# The label of a pseudo
+_LABEL_FORM = "element.type.z_<n>.tool.family.version"
+_LABEL_PATTERN = r"^[A-Z][a-z]?\.(nc|us|paw)\.z_?[0-9]+\.[^.]+\.[^.]+\..+$"
+
+# The schema of the result of one pseudo, only the structure the inspect widgets
+# rely on is checked.
+PSEUDO_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "accuracy": {
+            "type": "object",
+            "properties": {
+                "delta": {
+                    "type": "object",
+                    "additionalProperties": {
+                        "type": "object",
+                        "properties": {
+                            "output_parameters": {"type": "object"},
+                            "eos": {"type": "object"},
+                        },
+                    },
+                },
+                "bands": {
+                    "type": "object",
+                    "properties": {
+                        "bands": {"type": "string"},
+                        "band_structure": {"type": "string"},
+                    },
+                },
+            },
+        },
+        "convergence": {
+            "type": "object",
+            "additionalProperties": {"type": "object"},
+        },
+    },
+    "anyOf": [{"required": ["accuracy"]}, {"required": ["convergence"]}],
+}
+
+# serialise the read-modify-write of the local DB files of this kernel
+_DB_LOCK = Lock()
+
+
+@lru_cache(maxsize=None)
+def _validator():
+    """The validator of the pseudo result schema, compiled once"""
+    from jsonschema import Draft7Validator
+
+    Draft7Validator.check_schema(PSEUDO_RESULT_SCHEMA)
+    return Draft7Validator(PSEUDO_RESULT_SCHEMA)
+
+
+def validate_results(results) -> tuple:
+    """Validate the uploaded results entry by entry.
+
+    :param results: dict of the pseudo label to its result.
+    :return: (valid, errors), the valid results grouped by element as
+        `{element: {label: result}}` and the error message of each invalid label.
+    """
+    if not isinstance(results, dict):
+        return {}, {"": "the json file is not a dict of pseudo label to result."}
+
+    validator = _validator()
+    valid = {}
+    errors = {}
+    for label, result in results.items():
+        if not re.match(_LABEL_PATTERN, label):
+            errors[label] = f"the label is not of the form {_LABEL_FORM}."
+            continue
+
+        error = next(iter(validator.iter_errors(result)), None)
+        if error is not None:
+            path = "/".join(str(p) for p in error.absolute_path)
+            errors[label] = f"{path}: {error.message}" if path else error.message
+            continue
+
+        valid.setdefault(label.split(".")[0], {})[label] = result
+
+    return valid, errors
+
+
+def load_local_pseudos(element, db=SSSP_LOCAL_DB) -> dict:
+    """Return the pseudos of the element in the local DB, empty if there is none"""
+    try:
+        with open(os.path.join(db, f"{element}.json"), "r") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def local_elements(db=SSSP_LOCAL_DB) -> set:
+    """Return the elements with results in the local DB"""
+    if not os.path.isdir(db):
+        return set()
+
+    return {
+        fn.split(".")[0]
+        for fn in os.listdir(db)
+        if re.match(r"^[A-Z][a-z]?\.json$", fn)
+    }
+
+
+def merge_into_local_db(element, pseudos, db=SSSP_LOCAL_DB):
+    """Merge the pseudos into the element file of the local DB and update its index.
+
+    The pseudos with a label already in the file replace the old results.
+    """
+    os.makedirs(db, exist_ok=True)
+    json_fn = os.path.join(db, f"{element}.json")
+    with _DB_LOCK:
+        curated_result = load_local_pseudos(element, db)
+        curated_result.update(pseudos)
+
+        # write to a temporary file first, the file is never seen half written
+        with open(f"{json_fn}.tmp", "w") as fh:
+            json.dump(curated_result, fh, indent=2, sort_keys=True, default=str)
+        os.replace(f"{json_fn}.tmp", json_fn)
+
+        update_index(element, db=db)
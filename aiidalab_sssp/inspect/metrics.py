@@ -0,0 +1,111 @@
+"""Module contains the accuracy metric engine for the inspect widgets.
+The nu and delta measures of all selected pseudos over all configurations are
+gathered into arrays and computed in one numpy pass. Missing entries are NaN."""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+from aiida_sssp_workflow.calculations.calculate_delta import rel_errors_vec_length
+
+from aiidalab_sssp.inspect.subwidgets.utils import CONFIGURATIONS
+
+# The columns of the accuracy matrices when not specified
+ACCURACY_CONFIGURATIONS = [i for i in CONFIGURATIONS if i != "TYPICAL"]
+
+
+@dataclass(frozen=True)
+class AccuracyMetrics:
+    """nu and delta matrices of shape (n_pseudos, n_configs)"""
+
+    labels: List[str]
+    configurations: List[str]
+    nu: np.ndarray
+    delta: np.ndarray
+
+    def get(self, measure_type="nu") -> np.ndarray:
+        """Return the matrix of the given measure type, either nu or delta."""
+        if measure_type == "delta":
+            return self.delta
+
+        return self.nu
+
+    def value(self, label, configuration, measure_type="nu") -> float:
+        """Return the measure of one pseudo in one configuration, NaN if missing."""
+        try:
+            i = self.labels.index(label)
+            j = self.configurations.index(configuration)
+        except ValueError:
+            return np.nan
+
+        return self.get(measure_type)[i, j]
+
+    def select(self, configurations=None) -> "AccuracyMetrics":
+        """Return the metrics restricted to the given configurations (columns)."""
+        if configurations is None:
+            return self
+
+        columns = [self.configurations.index(i) for i in configurations]
+        return AccuracyMetrics(
+            labels=self.labels,
+            configurations=list(configurations),
+            nu=self.nu[:, columns],
+            delta=self.delta[:, columns],
+        )
+
+
+def available_configurations(pseudos: dict) -> list:
+    """Configurations that have delta results for at least one of the pseudos"""
+    available = set()
+    for pseudo_out in pseudos.values():
+        available.update(pseudo_out.get("accuracy", {}).get("delta", {}).keys())
+
+    return [i for i in CONFIGURATIONS if i in available and i != "TYPICAL"]
+
+
+def compute_accuracy_metrics(pseudos: dict, configurations=None) -> AccuracyMetrics:
+    """Compute nu and delta of every pseudo in every configuration.
+
+    :param pseudos: dict of pseudo label to its verification results.
+    :param configurations: the columns of the matrices, default are all configurations
+        available in the pseudos.
+    """
+    if configurations is None:
+        configurations = available_configurations(pseudos)
+
+    labels = list(pseudos.keys())
+    shape = (len(labels), len(configurations))
+
+    # The EOS parameters (V0, B0, B1) of pseudo and of the all-electron reference
+    eos_psp = np.full(shape + (3,), np.nan)
+    eos_ref = np.full(shape + (3,), np.nan)
+    delta = np.full(shape, np.nan)
+
+    for i, pseudo_out in enumerate(pseudos.values()):
+        _data = pseudo_out.get("accuracy", {}).get("delta", {})
+        for j, configuration in enumerate(configurations):
+            output_parameters = _data.get(configuration, {}).get(
+                "output_parameters", {}
+            )
+            try:
+                eos_psp[i, j] = output_parameters["birch_murnaghan_results"]
+                eos_ref[i, j] = output_parameters["reference_wien2k_V0_B0_B1"]
+            except (KeyError, ValueError, TypeError):
+                # there is no nu result for this conf of this pseudo
+                eos_psp[i, j] = np.nan
+                eos_ref[i, j] = np.nan
+
+            if output_parameters.get("delta/natoms") is not None:
+                delta[i, j] = output_parameters["delta/natoms"]
+
+    # one numpy pass over all cells, NaN propagate for missing entries
+    with np.errstate(invalid="ignore", divide="ignore"):
+        nu = rel_errors_vec_length(
+            *np.moveaxis(eos_psp, -1, 0), *np.moveaxis(eos_ref, -1, 0)
+        )
+
+    return AccuracyMetrics(
+        labels=labels,
+        configurations=list(configurations),
+        nu=nu,
+        delta=delta,
+    )
@@ -1,63 +1,78 @@
 import matplotlib.pyplot as plt
+import numpy as np
 
-from aiidalab_sssp.inspect import cmap
+from aiidalab_sssp.inspect import cmap, parse_label
+from aiidalab_sssp.inspect.render import WidgetFigure
 
-CONFIGURATIONS = [
-    "BCC",
-    "FCC",
-    "SC",
-    "Diamond",
-    "XO",
-    "X2O",
-    "XO3",
-    "X2O",
-    "X2O3",
-    "X2O5",
-]
-
-
-def convergence(pseudos: dict, wf_name, measure_name, ylabel, threshold=None):
 
+def convergence_figure() -> WidgetFigure:
+    """The persistent figure of the convergence plot"""
     px = 1 / plt.rcParams["figure.dpi"]
-    fig, (ax1, ax2) = plt.subplots(
+    return WidgetFigure(
         1, 2, gridspec_kw={"width_ratios": [2, 1]}, figsize=(960 * px, 360 * px)
     )
 
-    for label, output in pseudos.items():
-        # Calculate the avg delta measure value
-        lst = []
-        for configuration in CONFIGURATIONS:
-            try:
-                res = output["delta_measure"]["output_parameters"][f"{configuration}"]
-                lst.append(res["nu"])
-            except Exception:
-                pass
-
-        avg_delta = sum(lst) / len(lst)
-
-        try:
-            res = output[wf_name]
-            x_wfc = res["output_parameters_wfc_test"]["ecutwfc"]
-            y_wfc = res["output_parameters_wfc_test"][measure_name]
-
-            x_rho = res["output_parameters_rho_test"]["ecutrho"]
-            y_rho = res["output_parameters_rho_test"][measure_name]
-
-            wfc_cutoff = res["final_output_parameters"]["wfc_cutoff"]
-
-            _, pp_family, pp_z, pp_type, pp_version = label.split("/")[0:5]
-            out_label = f"{pp_z}/{pp_type}(ν={avg_delta:.2f})({pp_family}-{pp_version})"
-
-            ax1.plot(x_wfc, y_wfc, marker="o", color=cmap(label), label=out_label)
-            ax2.plot(
-                x_rho,
-                y_rho,
-                marker="o",
-                color=cmap(label),
-                label=f"cutoff wfc = {wfc_cutoff} Ry",
-            )
-        except Exception:
-            raise
+
+def convergence(
+    pseudos: dict,
+    wf_name,
+    measure_name,
+    ylabel,
+    store,
+    threshold=None,
+    figure=None,
+):
+    """Plot the convergence of pseudos.
+
+    :param store: the `MetricsStore` of the convergence dataset and nu values.
+    :param figure: the `WidgetFigure` to redraw, if not set a new one is created
+        which is closed once evicted from the pool of figures.
+    """
+    if figure is None:
+        figure = convergence_figure()
+    fig, (ax1, ax2) = figure.axes()
+
+    # the workflow name of the property, e.g. `convergence_cohesive_energy`
+    prop = (
+        wf_name[len("convergence_") :]
+        if wf_name.startswith("convergence_")
+        else wf_name
+    )
+    dataset = store.convergence(pseudos)
+    curves = {
+        key: group
+        for key, group in dataset.select(prop, measure_name).groupby(
+            ["label", "test"], sort=False
+        )
+    }
+    # the avg nu measure over the configurations
+    metrics = store.accuracy(pseudos)
+    with np.errstate(all="ignore"):
+        avg_nus = np.nanmean(metrics.nu, axis=1) if metrics.nu.size else []
+
+    for label, avg_nu in zip(metrics.labels, avg_nus):
+        if (label, "wfc") not in curves or (label, "rho") not in curves:
+            continue
+
+        pseudo_info = parse_label(label)
+        wfc_cutoff = dataset.cutoff(label, prop)
+        out_label = f"{pseudo_info['z']}/{pseudo_info['type']}(ν={avg_nu:.2f})({pseudo_info['family']}-{pseudo_info['version']})"
+
+        wfc, rho = curves[(label, "wfc")], curves[(label, "rho")]
+        ax1.plot(
+            wfc["cutoff"],
+            wfc["value"],
+            marker="o",
+            color=cmap(pseudo_info),
+            label=out_label,
+        )
+        ax2.plot(
+            rho["cutoff"],
+            rho["value"],
+            marker="o",
+            color=cmap(pseudo_info),
+            label=f"cutoff wfc = {wfc_cutoff} Ry",
+        )
 
     ax1.set_ylabel(ylabel)
     ax1.set_xlabel("Wavefuntion cutoff (Ry)")
@@ -79,6 +94,6 @@ def convergence(pseudos: dict, wf_name, measure_name, ylabel, threshold=None):
         ax1.set_ylim(-0.5 * threshold, 10 * threshold)
         ax2.set_ylim(-0.5 * threshold, 10 * threshold)
 
-    plt.tight_layout()
+    fig.tight_layout()
 
     return fig
@@ -0,0 +1,83 @@
+"""Module contains the immutable set of pseudos passed between the inspect widgets.
+A PseudoSet is a read-only mapping of the pseudo label to its verification result.
+Every set gets a new version on creation, two sets are equal only if they are the
+same version. Traitlets compare the old and new value to decide whether to notify,
+with the PseudoSet this is O(1) instead of a deep comparison of the results."""
+import itertools
+from collections.abc import Mapping
+
+import traitlets
+
+_VERSIONS = itertools.count(1)
+
+
+class PseudoSet(Mapping):
+    """Immutable, versioned mapping of the pseudo label to its result.
+
+    :param pseudos: mapping of label to result, the mapping is copied, the
+        results are shared and must not be mutated.
+    """
+
+    __slots__ = ("_pseudos", "version")
+
+    def __init__(self, pseudos=None):
+        self._pseudos = dict(pseudos or {})
+        self.version = next(_VERSIONS)
+
+    def __getitem__(self, label):
+        return self._pseudos[label]
+
+    def __iter__(self):
+        return iter(self._pseudos)
+
+    def __len__(self):
+        return len(self._pseudos)
+
+    def __contains__(self, label):
+        return label in self._pseudos
+
+    def __eq__(self, other):
+        if isinstance(other, PseudoSet):
+            return self.version == other.version
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def __repr__(self):
+        return f"PseudoSet(version={self.version}, labels={list(self._pseudos)})"
+
+    def select(self, labels) -> "PseudoSet":
+        """Return a new set of the labels, in the given order"""
+        return PseudoSet({label: self._pseudos[label] for label in labels})
+
+    def merge(self, pseudos) -> "PseudoSet":
+        """Return a new set with the pseudos added or replaced"""
+        return PseudoSet({**self._pseudos, **pseudos})
+
+    def to_dict(self) -> dict:
+        """Return a shallow copy as dict"""
+        return dict(self._pseudos)
+
+
+# The empty set, default of the traits
+EMPTY = PseudoSet()
+
+
+class PseudoSetTrait(traitlets.TraitType):
+    """Trait of a `PseudoSet`, a plain mapping is converted to a new set."""
+
+    default_value = EMPTY
+    info_text = "a PseudoSet or a mapping of pseudo label to result"
+
+    def validate(self, obj, value):
+        if value is None and self.allow_none:
+            return value
+
+        if isinstance(value, PseudoSet):
+            return value
+
+        if isinstance(value, Mapping):
+            return PseudoSet(value)
+
+        self.error(obj, value)
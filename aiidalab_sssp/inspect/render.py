@@ -0,0 +1,242 @@
+"""Module contains helpers for rendering the inspect widgets.
+The RenderScheduler coalesces the render requests fired by a chain of trait
+changes into one render. The LazyRenderMixin defers the render of a widget until
+it is visible. The WidgetFigure is the persistent matplotlib figure of a widget,
+redrawn in place and kept in a bounded pool of open figures."""
+import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import ipywidgets as ipw
+import matplotlib.pyplot as plt
+import numpy as np
+import traitlets
+from IPython.display import clear_output, display
+
+
+def running_loop():
+    """Return the running event loop of the kernel, None if there is not."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class RenderScheduler:
+    """Coalesce the render requests within a short window into one render.
+
+    Every `schedule` call restarts the window, the render function is called
+    once the widget stay quiet for `delay` seconds. Outside of a running event
+    loop (e.g. in plain python) the render happens synchronously.
+
+    :param render: callable without arguments that does the actual render.
+    :param delay: the debounce window in seconds.
+    """
+
+    def __init__(self, render, delay=0.05):
+        self._render = render
+        self.delay = delay
+
+        self._handle = None
+        self._pending = False
+        self._hold = 0
+
+    def schedule(self):
+        """Request a render"""
+        self._pending = True
+        if self._hold:
+            # render after the outermost hold block
+            return
+
+        self._cancel()
+        loop = running_loop()
+        if loop is None or self.delay <= 0:
+            self.flush()
+        else:
+            self._handle = loop.call_later(self.delay, self.flush)
+
+    def flush(self):
+        """Render now if there is a pending request"""
+        self._cancel()
+        if self._pending:
+            self._pending = False
+            self._render()
+
+    def cancel(self):
+        """Drop the pending request"""
+        self._cancel()
+        self._pending = False
+
+    def _cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    @contextmanager
+    def hold(self):
+        """Collect the render requests in the block and schedule at most one."""
+        self._hold += 1
+        try:
+            yield
+        finally:
+            self._hold -= 1
+            if not self._hold and self._pending:
+                self.schedule()
+
+
+class LazyRenderMixin(traitlets.HasTraits):
+    """Mixin for the widgets that only render when they are visible.
+
+    The widget calls `invalidate` when its input changed, it is marked dirty and
+    only rendered when `visible` is set or when `request_render` is called.
+    The renders are coalesced by a `RenderScheduler`.
+    The widget overrides `_render` which does the actual render.
+    """
+
+    # Whether the widget is shown to the user, e.g. linked to the accordion it is in
+    visible = traitlets.Bool(default_value=True)
+
+    render_delay = 0.05
+    _dirty = True
+    _render_scheduler = None
+
+    @property
+    def scheduler(self) -> RenderScheduler:
+        """The render scheduler of the widget"""
+        if self._render_scheduler is None:
+            self._render_scheduler = RenderScheduler(
+                self._render_if_dirty, delay=self.render_delay
+            )
+        return self._render_scheduler
+
+    def invalidate(self):
+        """Mark the widget dirty, render it if it is visible"""
+        self._dirty = True
+        if self.visible:
+            self.scheduler.schedule()
+
+    def request_render(self):
+        """Render the widget even if it is not visible"""
+        self._dirty = True
+        self.scheduler.schedule()
+
+    @traitlets.observe("visible")
+    def _on_visible_change(self, change):
+        if change["new"] and self._dirty:
+            self.scheduler.schedule()
+
+    def _render_if_dirty(self):
+        if self._dirty:
+            self._dirty = False
+            self._render()
+
+    def _render(self):
+        """Do the actual render, nothing to render by default"""
+
+
+def lazy_accordion(widget, title, open=False):
+    """Wrap the lazy widget in an accordion, the widget is visible when it is open"""
+    accordion = ipw.Accordion(children=[widget], selected_index=0 if open else None)
+    accordion.set_title(0, title)
+    ipw.dlink(
+        (accordion, "selected_index"),
+        (widget, "visible"),
+        transform=lambda index: index == 0,
+    )
+
+    return accordion
+
+
+class FigurePool:
+    """Bounded pool of open matplotlib figures.
+
+    When the pool is full the least recently used figure is closed, so the
+    figures, canvases and comms do not pile up in a long session.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+
+    def __len__(self):
+        return len(self._figures)
+
+    def add(self, fig, on_evict=None):
+        """Add figure to the pool, `on_evict` is called after it is closed."""
+        self._figures[id(fig)] = (fig, on_evict)
+        while len(self._figures) > self.maxsize:
+            _, (old_fig, callback) = self._figures.popitem(last=False)
+            plt.close(old_fig)
+            if callback is not None:
+                callback()
+
+    def touch(self, fig):
+        """Mark figure as recently used"""
+        if id(fig) in self._figures:
+            self._figures.move_to_end(id(fig))
+
+    def close(self, fig):
+        """Close figure and remove it from the pool"""
+        self._figures.pop(id(fig), None)
+        plt.close(fig)
+
+
+# The pool of all figures of the inspect widgets
+FIGURE_POOL = FigurePool()
+
+
+class WidgetFigure:
+    """The persistent figure owned by a widget.
+
+    The figure is created on first use with `plt.subplots(*args, **kwargs)`.
+    Afterwards its axes are cleared and redrawn in place, the canvas is only
+    displayed once. If the figure is evicted from the pool it is re-created on
+    the next render.
+    """
+
+    def __init__(self, *args, pool=None, **kwargs):
+        self._args = args
+        self._kwargs = kwargs
+        self._pool = FIGURE_POOL if pool is None else pool
+
+        self.fig = None
+        self._axes = None
+        self._output = None  # the output widget where the canvas is displayed
+
+    def axes(self):
+        """Return the figure and its cleared axes, same as `plt.subplots`."""
+        if self.fig is None:
+            self.fig, self._axes = plt.subplots(*self._args, **self._kwargs)
+            self.fig.canvas.header_visible = False
+            self._output = None
+            self._pool.add(self.fig, on_evict=self._on_evict)
+        else:
+            for ax in np.ravel(self._axes):
+                ax.cla()
+            self._pool.touch(self.fig)
+
+        return self.fig, self._axes
+
+    def show(self, output):
+        """Display the canvas in output once, afterwards only redraw it."""
+        if self.fig is None:
+            return
+
+        if self._output is output:
+            self.fig.canvas.draw_idle()
+        else:
+            with output:
+                clear_output(wait=True)
+                display(self.fig.canvas)
+            self._output = output
+
+    def close(self):
+        """Close the figure"""
+        if self.fig is not None:
+            self._pool.close(self.fig)
+            self._on_evict()
+
+    def _on_evict(self):
+        self.fig = None
+        self._axes = None
+        self._output = None
@@ -0,0 +1,65 @@
+"""Module contains the selection bus between the pseudo selection and the inspect
+widgets. The edits of the selection are debounced for a short idle window and
+published as one snapshot, so that a burst of clicks gives one round of updates."""
+import traitlets
+
+from aiidalab_sssp.inspect.pseudo_set import EMPTY, PseudoSetTrait
+from aiidalab_sssp.inspect.render import RenderScheduler
+
+
+def selection_diff(old, new) -> tuple:
+    """Return the (added, removed, changed) labels from the old to the new selection.
+
+    A pseudo is changed if its result is another object under the same label.
+    """
+    old = old or {}
+    new = new or {}
+    added = [label for label in new if label not in old]
+    removed = [label for label in old if label not in new]
+    changed = [label for label in new if label in old and new[label] is not old[label]]
+
+    return added, removed, changed
+
+
+class SelectionBus(traitlets.HasTraits):
+    """Debounce the selection edits and publish one snapshot of the selection.
+
+    The snapshot is the immutable `PseudoSet` of the selection, only published if
+    the labels, their order or the results differ from the last snapshot. The
+    consumers get the whole snapshot, the metrics store memoises its quantities by
+    label and content, so only the added or changed pseudos are computed.
+
+    :param delay: the idle window in seconds.
+    """
+
+    # (input) the selected pseudos, as edited
+    selection = PseudoSetTrait(allow_none=True)
+
+    # (output) the last published selection
+    snapshot = PseudoSetTrait(allow_none=True)
+
+    def __init__(self, delay=0.15, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = RenderScheduler(self._publish, delay=delay)
+
+    @traitlets.observe("selection")
+    def _on_selection_change(self, _):
+        self.scheduler.schedule()
+
+    def flush(self):
+        """Publish the pending edits now"""
+        self.scheduler.flush()
+
+    def _publish(self):
+        selection = self.selection or EMPTY
+        if self.snapshot is not None and list(selection) == list(self.snapshot):
+            _, _, changed = selection_diff(self.snapshot, selection)
+            if not changed:
+                return
+
+        self.snapshot = selection
+
+    def subscribe(self, *consumers, name="pseudos"):
+        """Link the published snapshot to the consumers, e.g. the metrics store"""
+        for consumer in consumers:
+            traitlets.dlink((self, "snapshot"), (consumer, name))
@@ -0,0 +1,159 @@
+"""Module contains the shared store of derived quantities of the pseudos.
+The inspect widgets subscribe to the store for the selected pseudos and ask it for
+derived quantities. Each quantity is memoised by the pseudo label and the hash of
+the pseudo content, so a selection change computes each of them only once."""
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+import traitlets
+
+from aiidalab_sssp.inspect.cutoffs import CutoffEngine
+from aiidalab_sssp.inspect.dataset import (
+    ConvergenceDataset,
+    build_convergence_dataset,
+    pseudo_convergence_frames,
+)
+from aiidalab_sssp.inspect.metrics import (
+    ACCURACY_CONFIGURATIONS,
+    AccuracyMetrics,
+    compute_accuracy_metrics,
+)
+from aiidalab_sssp.inspect.pseudo_set import PseudoSetTrait
+from aiidalab_sssp.inspect.subwidgets.utils import CONFIGURATIONS
+
+
+class MetricsStore(traitlets.HasTraits):
+    """Memoised derived quantities of the selected pseudos"""
+
+    # (input) selected pseudos, propagated to all subscribed widgets
+    pseudos = PseudoSetTrait(allow_none=True)
+
+    def __init__(self, maxsize=1024, **kwargs):
+        super().__init__(**kwargs)
+        self._maxsize = maxsize
+
+        # id of pseudo result dict -> (dict, content hash), the dict is kept so
+        # that its id is not reused while it is in the cache.
+        self._hashes = OrderedDict()
+        self._cache = OrderedDict()
+
+    def subscribe(self, *widgets, name="pseudos"):
+        """Link the selected pseudos of the store to the widgets"""
+        for widget in widgets:
+            traitlets.dlink((self, "pseudos"), (widget, name))
+
+    def content_hash(self, pseudo_out) -> str:
+        """Return the hash of the pseudo result, computed once per dict."""
+        try:
+            _, digest = self._hashes[id(pseudo_out)]
+        except KeyError:
+            content = json.dumps(pseudo_out, sort_keys=True, default=str)
+            digest = hashlib.md5(content.encode("utf-8")).hexdigest()
+            self._hashes[id(pseudo_out)] = (pseudo_out, digest)
+            if len(self._hashes) > self._maxsize:
+                self._hashes.popitem(last=False)
+        else:
+            self._hashes.move_to_end(id(pseudo_out))
+
+        return digest
+
+    def key(self, label, pseudo_out) -> tuple:
+        """The cache key of one pseudo"""
+        return (label, self.content_hash(pseudo_out))
+
+    def get(self, name, key, compute):
+        """Return the memoised quantity `name` for the key, compute it if missing.
+
+        :param compute: callable without arguments to compute the quantity.
+        """
+        cache_key = (name, key)
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+
+        value = compute()
+        self._set(cache_key, value)
+
+        return value
+
+    def _set(self, cache_key, value):
+        self._cache[cache_key] = value
+        if len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
+
+    def accuracy(self, pseudos=None, configurations=None) -> AccuracyMetrics:
+        """Return the nu and delta matrices of the pseudos.
+
+        The rows are cached per pseudo over all configurations, only the pseudos
+        not seen before are computed, in one vectorised pass.
+
+        :param configurations: the columns of the matrices, default are the
+            configurations of the accuracy measures, i.e. all but TYPICAL.
+        """
+        pseudos = self.pseudos if pseudos is None else pseudos
+        keys = [self.key(label, out) for label, out in pseudos.items()]
+
+        rows = {}
+        missing = {}
+        for (_, out), key in zip(pseudos.items(), keys):
+            if ("accuracy", key) in self._cache:
+                rows[key] = self.get("accuracy", key, None)
+            else:
+                missing[key] = out
+
+        if missing:
+            metrics = compute_accuracy_metrics(
+                {label: out for (label, _), out in missing.items()},
+                CONFIGURATIONS,
+            )
+            for key, nu, delta in zip(missing.keys(), metrics.nu, metrics.delta):
+                rows[key] = (nu, delta)
+                self._set(("accuracy", key), rows[key])
+
+        shape = (len(keys), len(CONFIGURATIONS))
+        metrics = AccuracyMetrics(
+            labels=list(pseudos.keys()),
+            configurations=CONFIGURATIONS,
+            nu=np.array([rows[key][0] for key in keys]).reshape(shape),
+            delta=np.array([rows[key][1] for key in keys]).reshape(shape),
+        )
+
+        return metrics.select(
+            ACCURACY_CONFIGURATIONS if configurations is None else configurations
+        )
+
+    def convergence(self, pseudos=None) -> ConvergenceDataset:
+        """Return the tidy convergence dataset of the pseudos.
+
+        The frames are built once per pseudo and the dataset once per selection.
+        """
+        pseudos = self.pseudos if pseudos is None else pseudos
+        keys = tuple(self.key(label, out) for label, out in pseudos.items())
+
+        def _build():
+            return build_convergence_dataset(
+                self.get(
+                    "convergence_frames",
+                    key,
+                    lambda label=label, out=out: pseudo_convergence_frames(label, out),
+                )
+                for key, (label, out) in zip(keys, pseudos.items())
+            )
+
+        return self.get("convergence", keys, _build)
+
+    def cutoff_engine(self, pseudos=None) -> CutoffEngine:
+        """Return the cutoff recommendation engine of the pseudos, built once per
+        selection so that any criteria can be evaluated instantly."""
+        pseudos = self.pseudos if pseudos is None else pseudos
+        keys = tuple(self.key(label, out) for label, out in pseudos.items())
+
+        return self.get(
+            "cutoff_engine", keys, lambda: CutoffEngine(self.convergence(pseudos))
+        )
+
+
+# The store shared by all inspect widgets
+METRICS_STORE = MetricsStore()
@@ -13,6 +13,9 @@ from IPython.display import clear_output, display
 from widget_bandsplot import BandsPlotWidget
 
 from aiidalab_sssp.inspect import SSSP_DB, _px, extract_element, parse_label
+from aiidalab_sssp.inspect.pseudo_set import PseudoSetTrait
+from aiidalab_sssp.inspect.render import LazyRenderMixin, WidgetFigure
+from aiidalab_sssp.inspect.store import METRICS_STORE
 
 # from aiidalab_sssp.inspect.band_util import get_bands_distance
 
@@ -39,7 +42,7 @@ def _bandview(json_path):
     return data
 
 
-class BandStructureWidget(ipw.VBox):
+class BandStructureWidget(LazyRenderMixin, ipw.VBox):
     """
     widget for band structure representation. When pseudos set the dropdown enabled
     for choosing pseudos for compare in one frame.
@@ -47,9 +50,10 @@ class BandStructureWidget(ipw.VBox):
     raise warning using StatusHTML ask to select new one.
     """
 
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
 
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store or METRICS_STORE
         self.band_structure = ipw.Output()
         self.pseudo1_select = ipw.Dropdown()
         self.pseudo2_select = ipw.Dropdown()
@@ -57,6 +61,9 @@ class BandStructureWidget(ipw.VBox):
         self.pseudo1_select.observe(self._on_pseudo_select)
         self.pseudo2_select.observe(self._on_pseudo_select)
 
+        # The dropdowns fire for options, index and value, they are
+        # coalesced into one render by the scheduler.
+
         super().__init__(
             children=[
                 ipw.HTML("<h2> Band Structure </h2>"),
@@ -69,39 +76,43 @@ class BandStructureWidget(ipw.VBox):
     def _on_pseeudos_change(self, change):
         if change["new"]:
             self.layout.visibility = "visible"
-            self.pseudo1_select.options = ["None"] + list(self.pseudos.keys())
-            self.pseudo2_select.options = ["None"] + list(self.pseudos.keys())
-            # The first bands default select the first pseudo
-            self.pseudo1_select.value = list(self.pseudos.keys())[0]
+            with self.scheduler.hold():
+                self.pseudo1_select.options = ["None"] + list(self.pseudos.keys())
+                self.pseudo2_select.options = ["None"] + list(self.pseudos.keys())
+                # The first bands default select the first pseudo
+                self.pseudo1_select.value = list(self.pseudos.keys())[0]
         else:
             self.layout.visibility = "hidden"
 
     def _on_pseudo_select(self, _):
+        self.invalidate()
+
+    def _render(self):
         pseudo1_label = self.pseudo1_select.value
         pseudo1 = self.pseudos.get(pseudo1_label, None)
         pseudo2_label = self.pseudo2_select.value
         pseudo2 = self.pseudos.get(pseudo2_label, None)
 
         bands = []
-        if pseudo1:
-            try:
-                path = pseudo1["accuracy"]["bands"]["band_structure"]
-                json_path = Path.joinpath(SSSP_DB, path)
-            except Exception:
-                return
-
-            bandsdata_a = self.bands_align_to_fermi(_bandview(json_path))
-            bands.append(bandsdata_a)
+        for label, pseudo in [(pseudo1_label, pseudo1), (pseudo2_label, pseudo2)]:
+            if not pseudo:
+                continue
 
-        if pseudo2:
             try:
-                path = pseudo2["accuracy"]["bands"]["band_structure"]
+                path = pseudo["accuracy"]["bands"]["band_structure"]
                 json_path = Path.joinpath(SSSP_DB, path)
             except Exception:
                 return
 
-            bandsdata_b = self.bands_align_to_fermi(_bandview(json_path))
-            bands.append(bandsdata_b)
+            bands.append(
+                self.store.get(
+                    "band_structure",
+                    self.store.key(label, pseudo),
+                    lambda json_path=json_path: self.bands_align_to_fermi(
+                        _bandview(json_path)
+                    ),
+                )
+            )
 
         _band_structure_preview = BandsPlotWidget(
             bands=bands,
@@ -129,16 +140,20 @@ class BandStructureWidget(ipw.VBox):
         return bandsdata
 
 
-class BandChessboard(ipw.VBox):
+class BandChessboard(LazyRenderMixin, ipw.VBox):
     """Band distance compare in chess board"""
 
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
 
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store or METRICS_STORE
         self.chessboard = ipw.Output()
-
-        # for caching
-        self.__cache_bands = {}
+        self._figure = WidgetFigure(
+            1,
+            2,
+            gridspec_kw={"wspace": 0.02, "hspace": 0},
+            figsize=(1020 * _px, 680 * _px),
+        )
 
         super().__init__(
             children=[
@@ -151,7 +166,7 @@ class BandChessboard(ipw.VBox):
     def _on_pseudos_change(self, change):
         if change["new"]:
             self.layout.visibility = "visible"
-            self._render()
+            self.invalidate()
         else:
             self.layout.visibility = "hidden"
 
@@ -167,18 +182,9 @@ class BandChessboard(ipw.VBox):
 
         output = self.chessboard
         labels, arr_v, arr_c = self._bands_distance(pseudos)
-        fig, (ax_v, ax_c) = plt.subplots(
-            1,
-            2,
-            gridspec_kw={"wspace": 0.02, "hspace": 0},
-            figsize=(1020 * _px, 680 * _px),
-        )
-        fig.canvas.header_visible = False
+        _, (ax_v, ax_c) = self._figure.axes()
         self._render_plot(ax_v, ax_c, arr_v=arr_v, arr_c=arr_c, labels=labels)
-
-        with output:
-            clear_output(wait=True)
-            display(fig.canvas)
+        self._figure.show(output)
 
     @staticmethod
     def _render_plot(ax_v, ax_c, arr_v, arr_c, labels):
@@ -239,30 +245,22 @@ class BandChessboard(ipw.VBox):
         for (idx1, label1), (idx2, label2) in itertools.combinations(
             enumerate(labels), 2
         ):
-            # load cache if exist.
+            # The distance is memoised in the store for the pair of pseudos.
             # the pseudos passed in the function is in order, keys are sorted when created
             # Therefore, can always be '(label1)(label2)'
-            cache_key = f"({label1})({label2})"
-            if cache_key in self.__cache_bands:
-                distance = self.__cache_bands.get(cache_key)
-            else:
-                try:
-                    bandsdata1 = _bandview(
-                        os.path.join(
-                            SSSP_DB, pseudos[label1]["accuracy"]["bands"]["bands"]
-                        )
-                    )
-                    bandsdata2 = _bandview(
-                        os.path.join(
-                            SSSP_DB, pseudos[label2]["accuracy"]["bands"]["bands"]
-                        )
-                    )
-                except KeyError:
-                    continue
+            try:
+                path1 = pseudos[label1]["accuracy"]["bands"]["bands"]
+                path2 = pseudos[label2]["accuracy"]["bands"]["bands"]
+            except KeyError:
+                continue
+
+            def _compute(path1=path1, path2=path2):
+                bandsdata1 = _bandview(os.path.join(SSSP_DB, path1))
+                bandsdata2 = _bandview(os.path.join(SSSP_DB, path2))
 
                 spin = element is not None and element in MAGNETIC_ELEMENTS
 
-                distance = get_bands_distance(
+                return get_bands_distance(
                     bandsdata_a=bandsdata1,
                     bandsdata_b=bandsdata2,
                     smearing=_SMEARING_WIDTH,
@@ -270,7 +268,15 @@ class BandChessboard(ipw.VBox):
                     do_smearing=do_smearing,
                     spin=spin,
                 )
-                self.__cache_bands[cache_key] = distance
+
+            distance = self.store.get(
+                "bands_distance",
+                (
+                    self.store.key(label1, pseudos[label1]),
+                    self.store.key(label2, pseudos[label2]),
+                ),
+                _compute,
+            )
 
             eta_v = distance["eta_v"]
             max_diff_v = distance["max_diff_v"]
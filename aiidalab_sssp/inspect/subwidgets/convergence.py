@@ -1,32 +1,19 @@
 import ipywidgets as ipw
 import traitlets
-from aiida_sssp_workflow.utils import get_protocol
-from IPython.display import clear_output, display
-from matplotlib import pyplot as plt
 
 from aiidalab_sssp.inspect import _px, cmap, extract_element, parse_label
+from aiidalab_sssp.inspect.pseudo_set import PseudoSetTrait
+from aiidalab_sssp.inspect.render import LazyRenderMixin, WidgetFigure, lazy_accordion
+from aiidalab_sssp.inspect.store import METRICS_STORE
 from aiidalab_sssp.inspect.subwidgets.summary import SummaryWidget
-
-
-def get_threshold(property_name) -> dict:
-    """Get threshold for plot from protocol
-
-    return a dict of upper bound of criteria
-    """
-    protocol = get_protocol("criteria")
-    threshold = {}
-    for key, value in protocol.items():
-        threshold[key] = max(value[property_name]["bounds"])
-
-    return threshold
-
+from aiidalab_sssp.inspect.webgl import ConvergencePlotGL, check_backend
 
 property_map = {
     "Cohesive energy (Absolute Error, meV/atom)": {
         "name": "cohesive_energy",
         "measure": "absolute_diff",
         "ylabel": "Absolute error per atom (meV/atom)",
-        "threshold": get_threshold("cohesive_energy"),
+        "show_threshold": True,
     },
     "Cohesive energy (Raw Energy, meV/atom)": {
         "name": "cohesive_energy",
@@ -37,7 +24,7 @@ property_map = {
         "name": "phonon_frequencies",
         "measure": "relative_diff",
         "ylabel": "Relative error (%)",
-        "threshold": get_threshold("phonon_frequencies"),
+        "show_threshold": True,
     },
     "Phonon frequencies (Max freq error, cm-1)": {
         "name": "phonon_frequencies",
@@ -53,13 +40,13 @@ property_map = {
         "name": "pressure",
         "measure": "relative_diff",
         "ylabel": "Relative error (%)",
-        "threshold": get_threshold("pressure"),
+        "show_threshold": True,
     },
     "Bands distance (Avg. error meV)": {
         "name": "bands",
         "measure": "eta_c",
         "ylabel": r"$Avg. Error of \eta_c (meV)$",
-        "threshold": get_threshold("bands"),
+        "show_threshold": True,
     },
     "Bands distance (Max. error meV)": {
         "name": "bands",
@@ -70,7 +57,7 @@ property_map = {
         "name": "delta",
         "measure": "relative_diff",
         "ylabel": "Relative error (%)",
-        "threshold": get_threshold("delta"),
+        "show_threshold": True,
     },
     "Delta (Raw value, meV/cell)": {
         "name": "delta",
@@ -80,11 +67,18 @@ property_map = {
 }
 
 
-class ConvergenceWidget(ipw.VBox):
+class ConvergenceWidget(LazyRenderMixin, ipw.VBox):
+    """Convergence curves of the pseudos for the selected property.
 
-    pseudos = traitlets.Dict(allow_none=True)
+    :param backend: `matplotlib` or `webgl`, the later needs plotly installed and
+        falls back to matplotlib otherwise.
+    """
 
-    def __init__(self):
+    pseudos = PseudoSetTrait(allow_none=True)
+
+    def __init__(self, store=None, backend="matplotlib"):
+        self.store = store or METRICS_STORE
+        self.backend = check_backend(backend)
 
         # using raido button widget so user only choose one proper to check
         # at one time. It can be more, but pollute the UX and not useful.
@@ -93,13 +87,22 @@ class ConvergenceWidget(ipw.VBox):
             value=list(property_map.keys())[0],
         )
         self.property_select.observe(self._on_property_select_change, names="value")
-        self.summary = SummaryWidget()
-        self.summary.observe(
-            self._on_summary_criteria_change, names="selected_criteria"
-        )
+        # the summary shares the store, nothing is computed twice
+        self.summary = SummaryWidget(store=self.store)
+        self.summary.observe(self._on_summary_criteria_change, names="criteria")
         ipw.dlink((self, "pseudos"), (self.summary, "pseudos"))
 
         self.out = ipw.Output()  # out figure
+        self._figure = WidgetFigure(
+            2,
+            1,
+            gridspec_kw={"wspace": 0.00, "hspace": 0.40},
+            figsize=(1024 * _px, 600 * _px),
+        )
+        # label -> (wfc line, rho line), and the two threshold lines
+        self._lines = None
+        self._thresholds = ()
+        self._plot_gl = ConvergencePlotGL() if self.backend == "webgl" else None
         self.convergence = ipw.VBox(
             children=[
                 self.property_select,
@@ -107,11 +110,9 @@ class ConvergenceWidget(ipw.VBox):
             ],
         )
 
-        self.summary_accordion = ipw.Accordion(
-            children=[self.summary], selected_index=None
-        )
-        self.summary_accordion.set_title(
-            0, "Toggle to show the summary of verification results."
+        # the summary and convergence plot only render when the accordion open up
+        self.summary_accordion = lazy_accordion(
+            self.summary, "Toggle to show the summary of verification results."
         )
         self.convergence_accordion = ipw.Accordion(
             children=[self.convergence], selected_index=None
@@ -119,9 +120,6 @@ class ConvergenceWidget(ipw.VBox):
         self.convergence_accordion.set_title(
             0, "Toggle to show the detailed convergence verification results."
         )
-        self.convergence_accordion.observe(
-            self._on_convergence_accordion_change, names="selected_index"
-        )
         self.accordions = ipw.VBox(
             children=[
                 self.summary_accordion,
@@ -139,109 +137,156 @@ class ConvergenceWidget(ipw.VBox):
                 self.accordions,
             ]
         )
+        ipw.dlink(
+            (self.convergence_accordion, "selected_index"),
+            (self, "visible"),
+            transform=lambda index: index == 0,
+        )
 
     def _on_summary_criteria_change(self, change):
-        """When select new criteria on summary widget"""
-        if change["new"]:
-            self._render()
+        """When select new criteria or custom bounds on summary widget"""
+        # the criteria are first loaded by a render, no need to render again
+        if change["old"]:
+            self.invalidate()
 
     @traitlets.observe("pseudos")
     def _on_pseudos_change(self, change):
         """only update plot when accordion open"""
+        # the lines are re-created for the new pseudos on next render
+        self._lines = None
         if change["new"]:
             self.accordions.layout.visibility = "visible"
             self.help_message.layout.visibility = "visible"
             self.convergence_accordion.selected_index = None
+            self.invalidate()
         else:
             self.accordions.layout.visibility = "hidden"
             self.help_message.layout.visibility = "hidden"
 
-    def _on_convergence_accordion_change(self, change):
-        # only render when accordion open up
-        if change["new"] == 0:
-            self._render()
-
     def _on_property_select_change(self, change):
         if change["new"]:
-            self._render()
+            self.invalidate()
 
     def _render(self):
-        """render the plot"""
-        property_selected = self.property_select.value
+        """render the plot, only the data of the existing artists is swapped
+        when the property or criteria changed."""
+        if not self.pseudos:
+            return
+
+        if self._plot_gl is not None:
+            property = property_map[self.property_select.value]
+            self._plot_gl.render(
+                self.store.convergence(self.pseudos),
+                list(self.pseudos),
+                property["name"],
+                property["measure"],
+                property["ylabel"],
+                threshold=self._threshold(self.property_select.value),
+            )
+            self._plot_gl.show(self.out)
+            return
 
-        fig, (ax_wfc, ax_rho) = plt.subplots(
-            2,
-            1,
-            gridspec_kw={"wspace": 0.00, "hspace": 0.40},
-            figsize=(1024 * _px, 600 * _px),
-        )
-        fig.canvas.header_visible = False
-        self._render_plot(ax_wfc, ax_rho, property_selected)
+        if self._lines is None or self._figure.fig is None:
+            self._draw_artists()
 
-        with self.out:
-            clear_output(wait=True)
-            display(fig.canvas)
+        self._update_artists(self.property_select.value)
+        self._figure.show(self.out)
 
-    def _render_plot(self, ax_wfc, ax_rho, property):
-        """Actual render of plot"""
-        wfname = property_map[property]["name"]
-        measure = property_map[property]["measure"]
+    def _draw_artists(self):
+        """Create one line per pseudo per axis and the threshold lines"""
+        _, (ax_wfc, ax_rho) = self._figure.axes()
         element = extract_element(self.pseudos)
 
-        for label, pseudo_out in self.pseudos.items():
-            # TODO: Calculate the one delta measure and attach to label value
-            try:
-                res = pseudo_out["convergence"][wfname]
-                x_wfc = res["output_parameters_wfc_test"]["ecutwfc"]
-                y_wfc = res["output_parameters_wfc_test"][measure]
-
-                x_rho = res["output_parameters_rho_test"]["ecutrho"]
-                y_rho = res["output_parameters_rho_test"][measure]
-
-                wavefunction_cutoff = res["output_parameters"]["wavefunction_cutoff"]
-            except KeyError:
-                # usually the convergence test on the property is not finished okay
-                continue  # TODO give more detailed messages
-
-            # plot
+        self._lines = {}
+        for label in self.pseudos:
             pseudo_info = parse_label(label)
-
-            # TODO label include delta info
-            ax_wfc.plot(
-                x_wfc,
-                y_wfc,
-                marker="^",
-                markersize=2,
-                color=cmap(pseudo_info),
-                label=pseudo_info["representive_label"],
-            )
-            ax_rho.plot(
-                x_rho,
-                y_rho,
-                marker="^",
-                markersize=2,
-                color=cmap(pseudo_info),
-                label=f"{wavefunction_cutoff} Ry",
+            self._lines[label] = tuple(
+                ax.plot(
+                    [],
+                    [],
+                    marker="^",
+                    markersize=2,
+                    color=cmap(pseudo_info),
+                    label=pseudo_info["representive_label"],
+                )[0]
+                for ax in (ax_wfc, ax_rho)
             )
 
+        self._thresholds = tuple(
+            ax.axhline(y=0.0, color="r", linestyle="--", visible=False)
+            for ax in (ax_wfc, ax_rho)
+        )
+
         # ax_wfc.set_ylabel(property_map[property]['ylabel'])
         ax_wfc.set_xlabel("Wavefuntion cutoff (Ry)")
         ax_wfc.set_title(
             f"Convergence verification on element {element} (dual=4 for NC and dual=8 for non-NC)"
         )
-        ax_wfc.legend(loc="upper right", prop={"size": 6})
 
-        ax_rho.set_ylabel(property_map[property]["ylabel"])
         ax_rho.yaxis.set_label_coords(-0.05, 0.9)
         ax_rho.set_xlabel("Charge density cudoff (Ry)")
         ax_rho.set_title("Convergence test at fixed wavefunction cutoff")
-        ax_rho.legend(loc="upper right", prop={"size": 6})
 
-        _criteria = str.lower(self.summary.selected_criteria)
-        threshold = property_map[property].get("threshold", {}).get(_criteria, None)
-        if threshold:
-            ax_wfc.axhline(y=threshold, color="r", linestyle="--")
-            ax_rho.axhline(y=threshold, color="r", linestyle="--")
+    def _threshold(self, property):
+        """The upper bound of the selected criteria if shown for the property"""
+        if not property_map[property].get("show_threshold", False):
+            return None
+
+        wfname = property_map[property]["name"]
+        bounds = self.summary.get_criteria().get(wfname, {}).get("bounds")
+
+        return max(bounds) if bounds else None
+
+    def _update_artists(self, property):
+        """Swap the data, threshold and labels of the artists for the property"""
+        wfname = property_map[property]["name"]
+        measure = property_map[property]["measure"]
+        ax_wfc, ax_rho = self._figure.fig.axes
+
+        dataset = self.store.convergence(self.pseudos)
+        curves = {
+            key: group
+            for key, group in dataset.select(wfname, measure).groupby(
+                ["label", "test"], sort=False
+            )
+        }
+        for label, (line_wfc, line_rho) in self._lines.items():
+            # TODO: Calculate the one delta measure and attach to label value
+            wavefunction_cutoff = dataset.cutoff(label, wfname)
+            if (
+                (label, "wfc") not in curves
+                or (label, "rho") not in curves
+                or wavefunction_cutoff is None
+            ):
+                # usually the convergence test on the property is not finished okay
+                # TODO give more detailed messages
+                line_wfc.set_visible(False)
+                line_rho.set_visible(False)
+                continue
+
+            wfc, rho = curves[(label, "wfc")], curves[(label, "rho")]
+            line_wfc.set_data(wfc["cutoff"].to_numpy(), wfc["value"].to_numpy())
+            line_rho.set_data(rho["cutoff"].to_numpy(), rho["value"].to_numpy())
+            line_rho.set_label(f"{wavefunction_cutoff} Ry")
+            line_wfc.set_visible(True)
+            line_rho.set_visible(True)
+
+        threshold = self._threshold(property)
+        for line in self._thresholds:
+            if threshold:
+                line.set_ydata([threshold, threshold])
+            line.set_visible(bool(threshold))
+
+        ax_rho.set_ylabel(property_map[property]["ylabel"])
+        for ax in (ax_wfc, ax_rho):
+            visible_lines = [
+                line
+                for line in ax.get_lines()
+                if line.get_visible() and line not in self._thresholds
+            ]
+            ax.legend(handles=visible_lines, loc="upper right", prop={"size": 6})
+            ax.relim(visible_only=True)
+            ax.autoscale_view()
 
         #     ax_wfc.set_ylim(-0.5 * threshold, 10 * threshold)
         #     ax_rho.set_ylim(-0.5 * threshold, 10 * threshold)
@@ -2,14 +2,17 @@
 The widget EosComparisonWidget for compare Eos fit line of a given pseudos in the given configuration.
 The widget AccuracyMeritWidget showing Nicola's Nu measure of all pseudos in all configurations"""
 import ipywidgets as ipw
-import matplotlib.pyplot as plt
 import numpy as np
 import traitlets
 from aiida_sssp_workflow.calculations.calculate_delta import rel_errors_vec_length
-from IPython.display import clear_output, display
 
 from aiidalab_sssp.inspect import _px, cmap, extract_element, parse_label
+from aiidalab_sssp.inspect.metrics import AccuracyMetrics, available_configurations
+from aiidalab_sssp.inspect.pseudo_set import PseudoSetTrait
+from aiidalab_sssp.inspect.render import LazyRenderMixin, WidgetFigure
+from aiidalab_sssp.inspect.store import METRICS_STORE
 from aiidalab_sssp.inspect.subwidgets.utils import CONFIGURATIONS
+from aiidalab_sssp.inspect.webgl import AccuracyMeritPlotGL, check_backend
 
 
 def birch_murnaghan(V, E0, V0, B0, B01):
@@ -23,16 +26,23 @@ def birch_murnaghan(V, E0, V0, B0, B01):
     )
 
 
-class AccuracyMeritWidget(ipw.VBox):
+class AccuracyMeritWidget(LazyRenderMixin, ipw.VBox):
     """Widget for showing accuracy merit of a given pseudo over all configuration.
     The merit can be either nu or delta.
+
+    :param backend: `matplotlib` or `webgl`, the later needs plotly installed and
+        falls back to matplotlib otherwise.
     """
 
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
     merit_type = traitlets.Unicode(default_value="nu")
 
-    def __init__(self):
+    def __init__(self, store=None, backend="matplotlib"):
+        self.store = store or METRICS_STORE
+        self.backend = check_backend(backend)
         self.out_plot = ipw.Output()
+        self._figure = WidgetFigure(1, 1, figsize=(1024 * _px, 360 * _px))
+        self._plot_gl = AccuracyMeritPlotGL() if self.backend == "webgl" else None
 
         super().__init__(
             children=[
@@ -43,66 +53,51 @@ class AccuracyMeritWidget(ipw.VBox):
     @traitlets.observe("merit_type")
     def _on_merit_type_change(self, change):
         if change["new"]:
-            self.update_plot()
+            self.invalidate()
 
     @traitlets.observe("pseudos")
     def _on_pseudos_change(self, change):
         """Update the plot when pseudos are changed."""
         if change["new"]:
             self.layout.display = "block"
-            self.update_plot()
+            self.invalidate()
         else:
             self.layout.display = "none"
 
     def update_plot(self):
         """Update the plot with the current pseudos and measure type."""
-        with self.out_plot:
-            clear_output()
-            fig = self._render_plot(self.pseudos, self.merit_type)
-            fig.canvas.header_visible = False
-            display(fig.canvas)
+        self.request_render()
+
+    def _render(self):
+        metrics = self.store.accuracy(
+            self.pseudos, available_configurations(self.pseudos)
+        )
+        element = extract_element(self.pseudos)
+
+        if self._plot_gl is not None:
+            self._plot_gl.render(metrics, self.merit_type, element=element)
+            self._plot_gl.show(self.out_plot)
+            return
+
+        _, ax = self._figure.axes()
+        self._render_plot(ax, metrics, self.merit_type, element=element)
+        self._figure.show(self.out_plot)
 
     @staticmethod
-    def _render_plot(pseudos: dict, measure_type):
-        """Render the plot for the given pseudos and measure type."""
-        fig, ax = plt.subplots(1, 1, figsize=(1024 * _px, 360 * _px))
-        # conf_list store configuration list of every pseudo
-        conf_list = {}
-        for label, data in pseudos.items():
-            _data = data["accuracy"]["delta"]
-            conf_list[label] = [
-                i for i in CONFIGURATIONS if i in _data.keys() and i != "TYPICAL"
-            ]
-
-        # element
-        element = extract_element(pseudos)
+    def _render_plot(ax, metrics: AccuracyMetrics, measure_type, element=None):
+        """Render the plot on ax for the given accuracy metrics and measure type.
+        The configuration not run for a pseudo is NaN and not drawn."""
+        values = metrics.get(measure_type)
 
         if measure_type == "delta":
             ylabel = "Δ -factor"
         elif measure_type == "nu":
             ylabel = "ν -factor"
 
-        xticklabels = []
-
-        for i, (label, output) in enumerate(pseudos.items()):
-            # update xticklabel to include all configurations in output
-            if len(xticklabels) < len(conf_list[label]):
-                xticklabels = conf_list[label]
-
-            width = 0.6 / len(pseudos)
+        x = np.arange(len(metrics.configurations))
+        width = 0.6 / max(len(metrics.labels), 1)
 
-            y_delta = []
-            for configuration in conf_list[label]:
-                res = output["accuracy"]["delta"][configuration]["output_parameters"]
-                if measure_type == "delta":
-                    y_delta.append(res["delta/natoms"])
-                if measure_type == "nu":
-                    v0w, b0w, b1w = res["birch_murnaghan_results"]
-                    v0f, b0f, b1f = res["reference_wien2k_V0_B0_B1"]
-                    nu = rel_errors_vec_length(v0w, b0w, b1w, v0f, b0f, b1f)
-                    y_delta.append(nu)
-
-            x = np.arange(len(conf_list[label]))
+        for i, (label, y_delta) in enumerate(zip(metrics.labels, values)):
             pseudo_info = parse_label(label)
 
             ax.bar(
@@ -116,8 +111,9 @@ class AccuracyMeritWidget(ipw.VBox):
             )
             ax.set_title(f"X={element}")
 
-        if max(y_delta) < 8.0:
-            y_max = 10 / 8.0 * max(y_delta)
+        y_max = np.nanmax(values, initial=0.0)
+        if y_max < 8.0:
+            y_max = 10 / 8.0 * y_max
         else:
             y_max = 10.0
 
@@ -125,22 +121,21 @@ class AccuracyMeritWidget(ipw.VBox):
         ax.axhline(y=1.0, linestyle="--", color="gray")
         ax.set_ylabel(ylabel)
         ax.set_ylim([0, y_max])
-        ax.set_xticks(range(len(xticklabels)))
-        ax.set_xticklabels(xticklabels)
-
-        return fig
+        ax.set_xticks(range(len(metrics.configurations)))
+        ax.set_xticklabels(metrics.configurations)
 
 
-class EosComparisonWidget(ipw.VBox):
+class EosComparisonWidget(LazyRenderMixin, ipw.VBox):
     """This widget is used to compare the equation of state of two different
     pseudopotentials.
     Two subplots are shown for two different pseudopotentials. The drowdown menu
     allows user to select the pseudopotential and configuration.
     """
 
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
 
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store or METRICS_STORE
         self.select_pseudo_ref = ipw.Dropdown()
         self.select_pseudo_comp = ipw.Dropdown()
 
@@ -151,6 +146,10 @@ class EosComparisonWidget(ipw.VBox):
 
         self.eos_preview = ipw.Output()  # empty plot with a instruction ask for select
 
+        # A pseudo or configuration change fires a chain of trait changes,
+        # they are coalesced into one render by the scheduler.
+        self._figure = WidgetFigure(1, 2, figsize=(1024 * _px, 440 * _px))
+
         super().__init__(
             children=[
                 ipw.HBox(
@@ -176,7 +175,7 @@ class EosComparisonWidget(ipw.VBox):
     def _on_pseudos_change(self, change):
         if change["new"] is not None and len(change["new"]) > 0:
             self.layout.display = "block"
-            with self.hold_trait_notifications():
+            with self.scheduler.hold(), self.hold_trait_notifications():
                 pseudo_list = list(self.pseudos.keys())
 
                 # remove the observer before update the dropdown menu
@@ -194,7 +193,7 @@ class EosComparisonWidget(ipw.VBox):
                 # add the observer back
                 self._observer_on_for_pseudos_dropdown()
 
-            self.update_plot()
+                self.invalidate()
         else:
             self.layout.display = "none"
 
@@ -206,8 +205,9 @@ class EosComparisonWidget(ipw.VBox):
         if label_ref is None or label_comp is None:
             return
 
-        self._update_configuration(label_ref, label_comp)
-        self.update_plot()
+        with self.scheduler.hold():
+            self._update_configuration(label_ref, label_comp)
+            self.invalidate()
 
     def _update_configuration(self, ref, comp):
         """Update configuration dropdown options"""
@@ -221,47 +221,67 @@ class EosComparisonWidget(ipw.VBox):
             if i in _data_ref.keys() and i in _data_comp.keys()
         ]
 
-        self.update_plot()
-
     def update_plot(self):
-        """Trigger plot update"""
+        """Trigger plot update, the requests in a short window render once."""
+        self.request_render()
+
+    def _render(self):
+        """Render the EOS comparison of the selected pseudos and configuration"""
         label_ref = self.select_pseudo_ref.value
         label_comp = self.select_pseudo_comp.value
         configuration = self.select_configuration.value
 
+        if label_ref is None or label_comp is None or configuration is None:
+            return
+
         data_ref = self.pseudos[label_ref]["accuracy"]["delta"].get(configuration, None)
         data_comp = self.pseudos[label_comp]["accuracy"]["delta"].get(
             configuration, None
         )
-
-        with self.eos_preview:
-            clear_output(wait=True)
-            fig = self._render_plot(
-                data_ref, data_comp, configuration, titles=(label_ref, label_comp)
-            )
-            fig.canvas.header_visible = False
-            display(fig.canvas)
+        metrics = self.store.accuracy(self.pseudos, [configuration])
+
+        _, axes = self._figure.axes()
+        self._render_plot(
+            axes,
+            data_ref,
+            data_comp,
+            configuration,
+            titles=(label_ref, label_comp),
+            nus=(
+                metrics.value(label_ref, configuration),
+                metrics.value(label_comp, configuration),
+            ),
+        )
+        self._figure.show(self.eos_preview)
 
     def _on_configuration_change(self, change):
         """Update eos preview"""
         if change["new"] is not None:
-            self.update_plot()
+            self.invalidate()
 
     @staticmethod
-    def _render_plot(data_ref, data_comp, configuration, titles=("EOS", "EOS")):
-        """render preview of EOS comparison result."""
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(1024 * _px, 440 * _px))
+    def _render_plot(
+        axes,
+        data_ref,
+        data_comp,
+        configuration,
+        titles=("EOS", "EOS"),
+        nus=(None, None),
+    ):
+        """render preview of EOS comparison result on the two axes."""
+        ax1, ax2 = axes
 
         # plot to ax1
-        plot_eos(ax1, data_ref, configuration, title=titles[0])
+        plot_eos(ax1, data_ref, configuration, title=titles[0], nu=nus[0])
         # plot to ax2
-        plot_eos(ax2, data_comp, configuration, title=titles[1])
+        plot_eos(ax2, data_comp, configuration, title=titles[1], nu=nus[1])
 
-        return fig
 
+def plot_eos(ax, data, configuration, title="EOS", nu=None):
+    """plot EOS result on ax
 
-def plot_eos(ax, data, configuration, title="EOS"):
-    """plot EOS result on ax"""
+    :param nu: the precomputed nu value, computed from data if not provided.
+    """
     volumes = data["eos"]["output_volume_energy"]["volumes"]
     energies = data["eos"]["output_volume_energy"]["energies"]
 
@@ -309,8 +329,9 @@ def plot_eos(ax, data, configuration, title="EOS"):
     center_y = (max(energies) + min(energies)) / 2
 
     # write text of nu value in close middle
-    nu = rel_errors_vec_length(ref_V0, ref_B0, ref_B01, V0, B0, B01)
-    nu = round(nu, 3)
+    if nu is None:
+        nu = rel_errors_vec_length(ref_V0, ref_B0, ref_B01, V0, B0, B01)
+    nu = round(float(nu), 3)
     delta = round(data["output_parameters"]["delta/natoms"], 3)
     ax.text(center_x, center_y, f"$\\nu$={nu}\n$\\Delta$={delta} meV/atom")
 
@@ -0,0 +1,163 @@
+import ipywidgets as ipw
+import numpy as np
+from IPython.display import clear_output, display
+
+from aiidalab_sssp.inspect import SSSP_DB
+from aiidalab_sssp.inspect.index import INDEX_CRITERIA, load_index
+from aiidalab_sssp.inspect.render import LazyRenderMixin
+
+# The columns of the index shown in the table and their titles
+_COLUMN_TITLES = {
+    "element": "Element",
+    "representive_label": "Pseudopotential label",
+    "nu_max": "ν max",
+    "nu_mean": "ν mean",
+    "delta_max": "Δ max",
+    "wavefunction_cutoff": "ψ cutoff (Ry)",
+    "chargedensity_cutoff": "ρ cutoff (Ry)",
+}
+
+
+class OverviewWidget(LazyRenderMixin, ipw.VBox):
+    """Summary of the verification of all elements of the DB in one table.
+
+    The table is built from the index of the DB, the filters and the sorting
+    are pandas masks on the index."""
+
+    def __init__(self, db=SSSP_DB):
+        self.db = db
+        self._index = None
+
+        self.element_filter = ipw.Text(
+            placeholder="e.g. Si, O",
+            description="Elements:",
+            layout=ipw.Layout(width="250px"),
+        )
+        self.type_filter = ipw.Dropdown(
+            options=[("All", ""), ("NC", "nc"), ("Ultrasoft", "us"), ("PAW", "paw")],
+            value="",
+            description="Type:",
+            layout=ipw.Layout(width="200px"),
+        )
+        self.nu_filter = ipw.BoundedFloatText(
+            value=100.0,
+            min=0.0,
+            max=100.0,
+            step=0.1,
+            description="ν max ≤",
+            layout=ipw.Layout(width="200px"),
+        )
+        self.cutoff_filter = ipw.BoundedFloatText(
+            value=1000.0,
+            min=0.0,
+            max=1000.0,
+            step=5.0,
+            description="ψ cutoff ≤",
+            style={"description_width": "initial"},
+            layout=ipw.Layout(width="200px"),
+        )
+        self.criteria = ipw.ToggleButtons(
+            options=[(name.capitalize(), name) for name in INDEX_CRITERIA],
+            value=INDEX_CRITERIA[0],
+            tooltip="Toggle to switch criteria of the recommended cutoffs.",
+        )
+        self.sort_by = ipw.Dropdown(
+            options=[(title, column) for column, title in _COLUMN_TITLES.items()],
+            value="element",
+            description="Sort by:",
+            layout=ipw.Layout(width="250px"),
+        )
+        self.ascending = ipw.Checkbox(value=True, description="Ascending")
+
+        for widget in (
+            self.element_filter,
+            self.type_filter,
+            self.nu_filter,
+            self.cutoff_filter,
+            self.criteria,
+            self.sort_by,
+            self.ascending,
+        ):
+            widget.observe(self._on_filter_change, names="value")
+
+        self.reload = ipw.Button(
+            description="Rebuild index",
+            tooltip="Rebuild the index from the element files of the DB.",
+        )
+        self.reload.on_click(self._on_reload)
+
+        self.message = ipw.HTML()
+        self.table = ipw.Output()
+
+        super().__init__(
+            children=[
+                ipw.HBox(
+                    children=[self.element_filter, self.type_filter, self.nu_filter]
+                ),
+                ipw.HBox(children=[self.cutoff_filter, self.criteria]),
+                ipw.HBox(children=[self.sort_by, self.ascending, self.reload]),
+                self.message,
+                self.table,
+            ],
+        )
+
+    @property
+    def index(self):
+        """The index of the DB, loaded on first use"""
+        if self._index is None:
+            self._index = load_index(self.db)
+
+        return self._index
+
+    def _on_filter_change(self, _):
+        self.invalidate()
+
+    def _on_reload(self, _):
+        self._index = load_index(self.db, rebuild=True)
+        self.invalidate()
+
+    def filtered(self):
+        """Return the rows of the index passing the filters, sorted"""
+        index = self.index
+        criteria = self.criteria.value
+        wfc = index[f"wavefunction_cutoff_{criteria}"].astype(float)
+
+        mask = np.ones(len(index), dtype=bool)
+        elements = [e.strip() for e in self.element_filter.value.split(",")]
+        elements = [e for e in elements if e]
+        if elements:
+            mask &= index["element"].isin(elements).to_numpy()
+        if self.type_filter.value:
+            mask &= (index["type"] == self.type_filter.value).to_numpy()
+        if self.nu_filter.value < self.nu_filter.max:
+            mask &= (index["nu_max"].astype(float) <= self.nu_filter.value).to_numpy()
+        if self.cutoff_filter.value < self.cutoff_filter.max:
+            mask &= (wfc <= self.cutoff_filter.value).to_numpy()
+
+        df = index.loc[mask].rename(
+            columns={
+                f"wavefunction_cutoff_{criteria}": "wavefunction_cutoff",
+                f"chargedensity_cutoff_{criteria}": "chargedensity_cutoff",
+            }
+        )
+        df = df[list(_COLUMN_TITLES)].sort_values(
+            self.sort_by.value,
+            ascending=self.ascending.value,
+            kind="stable",
+            na_position="last",
+        )
+
+        return df
+
+    def _render(self):
+        df = self.filtered()
+        self.message.value = (
+            f"<p> {len(df)} of {len(self.index)} pseudopotentials "
+            f"from {df['element'].nunique()} elements </p>"
+        )
+
+        df = df.round({"nu_max": 3, "nu_mean": 3, "delta_max": 3})
+        df.columns = [_COLUMN_TITLES[column] for column in df.columns]
+        with self.table:
+            clear_output(wait=True)
+            display(df.reset_index(drop=True))
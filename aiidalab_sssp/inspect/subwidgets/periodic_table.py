@@ -1,20 +1,77 @@
+import html
 import json
 import os
 import shutil
 import tarfile
+from collections import OrderedDict, deque
+from threading import Event, Lock, Thread
 from urllib import request
 
 import ipywidgets as ipw
-import traitlets
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.colors import Normalize, to_hex
 from widget_periodictable import PTableWidget
 
 from aiidalab_sssp.inspect import SSSP_DB
+from aiidalab_sssp.inspect.index import INDEX_FILENAME, element_stats, load_index
+from aiidalab_sssp.inspect.local_db import (
+    local_elements,
+    merge_into_local_db,
+    validate_results,
+)
+from aiidalab_sssp.inspect.pseudo_set import EMPTY, PseudoSet, PseudoSetTrait
+from aiidalab_sssp.inspect.render import running_loop
 
 __all__ = ("PeriodicTable",)
 
 
 _DB_URL = "https://github.com/unkcpz/sssp-verify-scripts/raw/main/sssp_db.tar.gz"
 _DB_FOLDER = "sssp_db"
+_LOCAL_DB_FOLDER = "sssp_local_db"
+_RECENT_FILENAME = "recent_elements.json"
+
+# The layout of the periodic table, "." for the empty cells. The lanthanides and
+# actinides are the last two rows.
+_PTABLE_ROWS = [
+    "H  .  .  .  .  .  .  .  .  .  .  .  .  .  .  .  .  He",
+    "Li Be .  .  .  .  .  .  .  .  .  .  B  C  N  O  F  Ne",
+    "Na Mg .  .  .  .  .  .  .  .  .  .  Al Si P  S  Cl Ar",
+    "K  Ca Sc Ti V  Cr Mn Fe Co Ni Cu Zn Ga Ge As Se Br Kr",
+    "Rb Sr Y  Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I  Xe",
+    "Cs Ba .  Hf Ta W  Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn",
+    "Fr Ra .  Rf Db Sg Bh Hs Mt Ds Rg Cn Nh Fl Mc Lv Ts Og",
+    ".  .  La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu .",
+    ".  .  Ac Th Pa U  Np Pu Am Cm Bk Cf Es Fm Md No Lr .",
+]
+_PTABLE_POSITIONS = {
+    element: (row, col)
+    for row, line in enumerate(_PTABLE_ROWS)
+    for col, element in enumerate(line.split())
+    if element != "."
+}
+
+
+def ptable_neighbours(element) -> list:
+    """Return the elements around the element in the periodic table"""
+    try:
+        row, col = _PTABLE_POSITIONS[element]
+    except KeyError:
+        return []
+
+    positions = {pos: e for e, pos in _PTABLE_POSITIONS.items()}
+    # the direct neighbours first, then the diagonal ones
+    offsets = [(0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+    # the lanthanides and actinides rows are apart from the main table
+    block = row >= 7
+
+    return [
+        positions[(row + dr, col + dc)]
+        for dr, dc in offsets
+        if (row + dr, col + dc) in positions and (row + dr >= 7) == block
+    ]
 
 
 def _load_pseudos(element, db=SSSP_DB) -> dict:
@@ -29,11 +86,212 @@ def _load_pseudos(element, db=SSSP_DB) -> dict:
     return dict()
 
 
+class ElementPrefetcher:
+    """Bounded cache of the parsed element files, warmed in a background thread.
+
+    The least recently used element is dropped when the cache is full. An entry is
+    reloaded if its file changed since it was parsed.
+
+    :param db: the folder of the element json files.
+    :param maxsize: the maximum number of elements kept in memory.
+    """
+
+    def __init__(self, db=SSSP_DB, maxsize=16):
+        self.db = db
+        self.maxsize = maxsize
+
+        self._cache = OrderedDict()  # element -> (mtime, pseudos)
+        self._lock = Lock()
+        self._queue = deque()
+        self._wake = Event()
+        self._thread = None
+
+    def _mtime(self, element):
+        try:
+            return os.path.getmtime(os.path.join(self.db, f"{element}.json"))
+        except OSError:
+            return None
+
+    def _cached(self, element):
+        """Return the cached pseudos if still up to date, None otherwise"""
+        with self._lock:
+            entry = self._cache.get(element)
+            if entry is None:
+                return None
+            self._cache.move_to_end(element)
+
+        mtime, pseudos = entry
+        return pseudos if mtime == self._mtime(element) else None
+
+    def _load(self, element):
+        mtime = self._mtime(element)
+        pseudos = _load_pseudos(element, db=self.db)
+        with self._lock:
+            self._cache[element] = (mtime, pseudos)
+            self._cache.move_to_end(element)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+        return pseudos
+
+    def get(self, element) -> dict:
+        """Return the pseudos of the element, from memory if prefetched.
+
+        The returned dict is shared, it must not be mutated.
+        """
+        pseudos = self._cached(element)
+        if pseudos is None:
+            pseudos = self._load(element)
+
+        return pseudos
+
+    def prefetch(self, elements):
+        """Queue the elements to be loaded in the background, in the given order"""
+        with self._lock:
+            self._queue.clear()
+            self._queue.extend(elements)
+        self._wake.set()
+
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._prefetch_loop, daemon=True)
+            self._thread.start()
+
+    def _prefetch_loop(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                if not self._queue:
+                    self._wake.clear()
+                    continue
+                element = self._queue.popleft()
+
+            if self._cached(element) is None:
+                try:
+                    self._load(element)
+                except (OSError, ValueError):
+                    # e.g. the file is being replaced, loaded again when selected
+                    pass
+
+    def clear(self):
+        """Drop all the cached elements, e.g. after the DB is updated"""
+        with self._lock:
+            self._cache.clear()
+            self._queue.clear()
+
+
+class ElementHeatmap(ipw.VBox):
+    """The periodic table coloured by a statistic of each element from the index.
+
+    Clicking an element calls `on_select` with the element.
+
+    :param dbs: the folders of the DBs, the index of each is loaded.
+    """
+
+    # The statistics to colour by: (name, colormap, title of the value)
+    STATS = {
+        "count": ("Greens", "number of pseudopotentials"),
+        "best_nu": ("RdYlGn_r", "best ν"),
+        "lowest_cutoff": ("RdYlGn_r", "lowest ψ cutoff (Ry), efficiency"),
+    }
+    _NO_DATA_COLOR = "#eeeeee"
+
+    def __init__(self, dbs, on_select=None):
+        self.dbs = dbs
+        self.on_select = on_select
+        self._stats = None
+
+        self.stat = ipw.Dropdown(
+            options=[
+                ("Number of pseudopotentials", "count"),
+                ("Best ν", "best_nu"),
+                ("Lowest ψ cutoff", "lowest_cutoff"),
+            ],
+            value="count",
+            description="Color by:",
+        )
+        self.stat.observe(lambda _: self.render(), names="value")
+
+        self.buttons = {}
+        cells = []
+        for line in _PTABLE_ROWS:
+            for element in line.split():
+                if element == ".":
+                    cells.append(ipw.Box())
+                    continue
+
+                button = ipw.Button(
+                    description=element,
+                    layout=ipw.Layout(width="38px", height="30px", padding="0px"),
+                )
+                button.on_click(lambda _, e=element: self._on_click(e))
+                self.buttons[element] = button
+                cells.append(button)
+
+        self.grid = ipw.GridBox(
+            children=cells,
+            layout=ipw.Layout(grid_template_columns="repeat(18, 40px)"),
+        )
+        self.legend = ipw.HTML()
+
+        super().__init__(children=[self.stat, self.grid, self.legend])
+
+    @property
+    def stats(self) -> pd.DataFrame:
+        """The statistics of each element, loaded from the indices on first use"""
+        if self._stats is None:
+            indices = [load_index(db) for db in self.dbs if os.path.isdir(db)]
+            self._stats = element_stats(pd.concat(indices, ignore_index=True))
+
+        return self._stats
+
+    def invalidate(self):
+        """Drop the statistics, e.g. after the DB is updated, reloaded on next render"""
+        self._stats = None
+
+    def _on_click(self, element):
+        if self.on_select is not None:
+            self.on_select(element)
+
+    def render(self):
+        """Colour the elements by the selected statistic"""
+        cmap_name, title = self.STATS[self.stat.value]
+        values = self.stats[self.stat.value].astype(float)
+        values = values[np.isfinite(values)]
+
+        cmap = plt.get_cmap(cmap_name)
+        if len(values):
+            norm = Normalize(vmin=values.min(), vmax=values.max())
+            colors = {e: to_hex(cmap(0.15 + 0.7 * norm(v))) for e, v in values.items()}
+        else:
+            colors = {}
+
+        for element, button in self.buttons.items():
+            if element in colors:
+                button.style.button_color = colors[element]
+                button.tooltip = f"{element}: {title} {values[element]:.3g}"
+                button.disabled = False
+            else:
+                button.style.button_color = self._NO_DATA_COLOR
+                button.tooltip = f"{element}: no verification results"
+                button.disabled = True
+
+        if len(values):
+            self.legend.value = (
+                f"<p> {title}: from {values.min():.3g} "
+                f"<span style='background:{to_hex(cmap(0.15))}'>&nbsp;&nbsp;&nbsp;</span>"
+                f" to {values.max():.3g} "
+                f"<span style='background:{to_hex(cmap(0.85))}'>&nbsp;&nbsp;&nbsp;</span>"
+                f"</p>"
+            )
+        else:
+            self.legend.value = "<p> No verification results. </p>"
+
+
 class PeriodicTable(ipw.VBox):
     """Wrapper-widget for PTableWidget, select the element and update the dict of pseudos"""
 
     # (output) dict of pseudos for selected element
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
 
     def __init__(self, cache_folder, **kwargs):
         self._disabled = kwargs.get("disabled", False)
@@ -44,7 +302,25 @@ class PeriodicTable(ipw.VBox):
         self.ptable.observe(self._on_element_select)
         self._element = None  # selected element, for record the last selected element
 
-        self.elements = set()  # elements that have json file in the db folder
+        self.elements = set()  # elements that have json file in the db folders
+        self._db_elements = set()  # elements that have json file in the SSSP db
+
+        # parsed element files, prefetched around the selected element
+        self.prefetcher = ElementPrefetcher(db=os.path.join(cache_folder, _DB_FOLDER))
+        # the uploaded and locally verified results
+        self._local_db = os.path.join(cache_folder, _LOCAL_DB_FOLDER)
+        self.local_prefetcher = ElementPrefetcher(db=self._local_db)
+
+        # the overview of all elements, coloured from the index of the DBs
+        self.heatmap = ElementHeatmap(
+            dbs=[os.path.join(cache_folder, _DB_FOLDER), self._local_db],
+            on_select=self.select_element,
+        )
+        self.heatmap_accordion = ipw.Accordion(
+            children=[self.heatmap], selected_index=None
+        )
+        self.heatmap_accordion.set_title(0, "Overview of the database")
+        self.heatmap_accordion.observe(self._on_heatmap_open, names="selected_index")
 
         # if cache empty run update: first time
         self.db_version = None
@@ -53,6 +329,9 @@ class PeriodicTable(ipw.VBox):
         else:
             self._update_db(download=True)
 
+        # warm the cache with the elements opened in the last sessions
+        self.prefetcher.prefetch(self._recent_elements())
+
         disable_elements = [
             e for e in self.ptable.allElements if e not in self.elements
         ]
@@ -66,6 +345,7 @@ class PeriodicTable(ipw.VBox):
             accept=".json", multiple=False, description="Upload json file"
         )
         self.json_upload.observe(self._on_json_upload, names="value")
+        self.upload_message = ipw.HTML()
 
         super().__init__(
             children=(
@@ -77,35 +357,112 @@ class PeriodicTable(ipw.VBox):
                     ]
                 ),
                 self.json_upload,
+                self.upload_message,
+                self.heatmap_accordion,
             ),
             layout=kwargs.get("layout", {}),
         )
 
+    def _on_heatmap_open(self, change):
+        if change["new"] == 0:
+            self.heatmap.render()
+
+    def select_element(self, element):
+        """Select the element in the table and update the pseudos"""
+        self._element = element
+        self.ptable.selected_elements = {element: 0}
+        self._last_selected = self.ptable.selected_elements
+        self.update_pseudos(element)
+
     def _on_json_upload(self, change):
         if change["name"] == "value" and change["type"] == "change":
             if change["new"]:
                 # get the first file
                 file_name = list(change["new"].keys())[0]
                 content = change["new"][file_name]["content"]
-                pseudos = json.loads(content.decode("utf-8"))
-
-                # check if the pseudos are valid by check the element name from the key of pseudos
-                for key in pseudos:
-                    if self._element is not None and self._element not in key:
-                        raise ValueError(
-                            f"The element name in the json file is not {self._element}, please check the json file."
-                        )
 
-                # if self.pseudos is None or len(self.pseudos) == 0:
-                #     self.pseudos = pseudos
-                # else:
-                #     self.pseudos = self.pseudos.update(pseudos)
-                self.update_pseudos(element=self._element, pseudos=pseudos)
+                self.upload_message.value = f"Validating {file_name} ..."
+                loop = running_loop()
+                if loop is None:
+                    self._process_upload(file_name, content, self._show_upload)
+                else:
+                    # parse, validate and store in the background so large uploads
+                    # do not block, the widgets are only updated in the kernel loop
+                    Thread(
+                        target=self._process_upload,
+                        args=(
+                            file_name,
+                            content,
+                            lambda *args: loop.call_soon_threadsafe(
+                                self._show_upload, *args
+                            ),
+                        ),
+                        daemon=True,
+                    ).start()
 
                 # reset the upload widget to empty so that the same file can be uploaded again
                 # self.json_upload.value = {}
                 self.json_upload._counter = 0
 
+    def _process_upload(self, file_name, content, done):
+        """Validate the uploaded results and merge the valid ones into the local DB.
+
+        No widget is touched, `done` is called with the file name, the valid results,
+        the errors and the error message if the upload failed as a whole.
+        """
+        try:
+            results = json.loads(content.decode("utf-8"))
+        except ValueError as exc:
+            done(file_name, {}, {}, f"it is not a valid json file: {exc}")
+            return
+
+        try:
+            valid, errors = validate_results(results)
+            for element, pseudos in valid.items():
+                merge_into_local_db(element, pseudos, db=self._local_db)
+        except Exception as exc:
+            done(file_name, {}, {}, f"{type(exc).__name__}: {exc}")
+            return
+
+        done(file_name, valid, errors, None)
+
+    def _show_upload(self, file_name, valid, errors, failure):
+        """Show the result of the upload and the pseudos added to the local DB"""
+        if failure is not None:
+            self.upload_message.value = (
+                f"<p style='color:red'>{html.escape(file_name)} is not uploaded: "
+                f"{html.escape(failure)}</p>"
+            )
+            return
+
+        if valid:
+            self.elements |= set(valid)
+            self.ptable.disabled_elements = [
+                e for e in self.ptable.allElements if e not in self.elements
+            ]
+            self.heatmap.invalidate()
+            if self.heatmap_accordion.selected_index == 0:
+                self.heatmap.render()
+
+        n_valid = sum(len(pseudos) for pseudos in valid.values())
+        message = (
+            f"<p>{html.escape(file_name)}: {n_valid} pseudopotentials of "
+            f"{', '.join(sorted(valid)) or 'no element'} are added to the local database.</p>"
+        )
+        if errors:
+            message += (
+                f"<p style='color:red'>{len(errors)} entries are skipped:</p><ul>"
+            )
+            message += "".join(
+                f"<li>{html.escape(label)}: {html.escape(error)}</li>"
+                for label, error in errors.items()
+            )
+            message += "</ul>"
+        self.upload_message.value = message
+
+        if self._element in valid:
+            self.update_pseudos(self._element)
+
     def _on_element_select(self, event):
         if event["name"] == "selected_elements" and event["type"] == "change":
             if tuple(event["new"].keys()) == ("Du",):
@@ -131,19 +488,57 @@ class PeriodicTable(ipw.VBox):
                     self.update_pseudos(self._element)
 
     def update_pseudos(self, element=None, pseudos=None):
-        pseudos = {} if pseudos is None else pseudos
-        if element is not None:
-            pseudos.update(_load_pseudos(element))
+        if element is None and not pseudos:
+            self.pseudos = EMPTY
+            return
+
+        loaded = {}
+        if element in self._db_elements:
+            loaded.update(self.prefetcher.get(element))
+        if element is not None and os.path.exists(
+            os.path.join(self._local_db, f"{element}.json")
+        ):
+            # the local results of a pseudo also in the SSSP db are shown next to it
+            for label, result in self.local_prefetcher.get(element).items():
+                loaded[f"{label}(local)" if label in loaded else label] = result
+        self.pseudos = PseudoSet({**(pseudos or {}), **loaded})
 
-        self.pseudos = pseudos
+        if element is not None:
+            self._record_recent(element)
+            # the recently opened elements first, then the neighbours
+            self.prefetcher.prefetch(
+                self._recent_elements()
+                + [e for e in ptable_neighbours(element) if e in self.elements]
+            )
+
+    def _recent_elements(self) -> list:
+        """The recently opened elements, the most recent first"""
+        try:
+            with open(os.path.join(self._cache_folder, _RECENT_FILENAME), "r") as fh:
+                recent = json.load(fh)
+        except (OSError, ValueError):
+            return []
+
+        return [e for e in recent if e in self.elements]
+
+    def _record_recent(self, element, maxlen=8):
+        recent = [element] + [e for e in self._recent_elements() if e != element]
+        try:
+            with open(os.path.join(self._cache_folder, _RECENT_FILENAME), "w") as fh:
+                json.dump(recent[:maxlen], fh)
+        except OSError:
+            pass
 
     def _update_db(self, _=None, download=True):
         """update cached db fetch from remote. and update ptable"""
         # download from remote
         if download:
             self._download(self._cache_folder)
+            self.prefetcher.clear()
+            self.heatmap.invalidate()
 
-        self.elements = self._get_enabled_elements(self._cache_folder)
+        self._db_elements = self._get_enabled_elements(self._cache_folder)
+        self.elements = self._db_elements | local_elements(self._local_db)
         disable_elements = [
             e for e in self.ptable.allElements if e not in self.elements
         ]
@@ -156,7 +551,7 @@ class PeriodicTable(ipw.VBox):
     def _get_enabled_elements(cache_folder):
         elements = set()
         for fn in os.listdir(os.path.join(cache_folder, _DB_FOLDER)):
-            if "band" not in fn:
+            if "band" not in fn and fn != INDEX_FILENAME:
                 elements.add(fn.split(".")[0])
 
         return elements
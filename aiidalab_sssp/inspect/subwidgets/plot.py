@@ -1,22 +1,26 @@
 import ipywidgets as ipw
 import traitlets
-from IPython.display import clear_output, display
 
-from aiidalab_sssp.inspect.plot_utils import convergence
+from aiidalab_sssp.inspect.plot_utils import convergence, convergence_figure
+from aiidalab_sssp.inspect.pseudo_set import PseudoSetTrait
+from aiidalab_sssp.inspect.store import METRICS_STORE
 
 
 class _PlotConvergenBaseWidget(ipw.VBox):
 
-    selected_pseudos = traitlets.Dict(allow_none=True)
+    selected_pseudos = PseudoSetTrait(allow_none=True)
 
     _WF = "Not implement"
     _MEASURE = "Not implement"
     _YLABEL = "Not implement"
     _THRESHOLD = None
 
-    def __init__(self):
+    def __init__(self, store=None):
+        self.store = store or METRICS_STORE
+
         # output widget
         self.output = ipw.Output()
+        self._figure = convergence_figure()
 
         super().__init__(
             children=[
@@ -28,17 +32,16 @@ class _PlotConvergenBaseWidget(ipw.VBox):
     def _on_pseudos_change(self, change):
 
         if change["new"]:
-            with self.output:
-                clear_output(wait=True)
-                fig = convergence(
-                    change["new"],
-                    wf_name=self._WF,
-                    measure_name=self._MEASURE,
-                    ylabel=self._YLABEL,
-                    threshold=self._THRESHOLD,
-                )
-                fig.canvas.header_visible = False
-                display(fig.canvas)
+            convergence(
+                change["new"],
+                wf_name=self._WF,
+                measure_name=self._MEASURE,
+                ylabel=self._YLABEL,
+                store=self.store,
+                threshold=self._THRESHOLD,
+                figure=self._figure,
+            )
+            self._figure.show(self.output)
 
 
 class PlotCohesiveEnergyConvergeWidget(_PlotConvergenBaseWidget):
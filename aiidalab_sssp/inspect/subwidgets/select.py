@@ -2,27 +2,104 @@ import ipywidgets as ipw
 import traitlets
 
 from aiidalab_sssp.inspect import parse_label
+from aiidalab_sssp.inspect.pseudo_set import EMPTY, PseudoSetTrait
 
 BASE_DOWNLOAD_URL = (
     "https://raw.githubusercontent.com/unkcpz/sssp-verify-scripts/main/libraries-pbe"
 )
 
 
+# The fields of the pseudo label to filter on
+FACETS = ("type", "family", "z", "tool", "version")
+
+
+class FacetIndex:
+    """Inverted index from each facet value to the labels of the pseudos.
+
+    :param labels: the pseudo labels, parsed once with `parse_label`.
+    """
+
+    def __init__(self, labels):
+        self.labels = list(labels)
+        self.facets = {facet: {} for facet in FACETS}
+        self._text = {}
+
+        for label in self.labels:
+            try:
+                pseudo_info = parse_label(label)
+            except ValueError:
+                # not a label of the SSSP naming, only found by the text search
+                pseudo_info = {}
+
+            for facet in FACETS:
+                if facet in pseudo_info:
+                    self.facets[facet].setdefault(pseudo_info[facet], set()).add(label)
+            self._text[label] = " ".join(
+                [label] + [str(v) for v in pseudo_info.values()]
+            ).lower()
+
+    def values(self, facet) -> list:
+        """Return the values of the facet with the number of labels of each"""
+        return sorted(
+            (value, len(labels)) for value, labels in self.facets[facet].items()
+        )
+
+    def query(self, filters=None, text="") -> list:
+        """Return the labels matching all the facet filters and the text.
+
+        :param filters: dict of facet to the value, None for any value.
+        :param text: the words that must all be in the label or its fields.
+        """
+        matched = set(self.labels)
+        for facet, value in (filters or {}).items():
+            if value is not None:
+                matched &= self.facets[facet].get(value, set())
+
+        words = text.lower().split()
+        if words:
+            matched = {
+                label
+                for label in matched
+                if all(word in self._text[label] for word in words)
+            }
+
+        return [label for label in self.labels if label in matched]
+
+
 class SelectMultipleCheckbox(ipw.VBox):
-    """Widget with a search field and lots of checkboxes of pseudopotentials"""
+    """Widget with lots of checkboxes of pseudopotentials.
+
+    The selection is kept as a set of labels, only the rows of the current page
+    have widgets. The rows are reused when the options or the page change, and
+    the selection changes are batched into one update of `selected_labels`.
+    """
 
     options = traitlets.List()  # options for all labels
     selected_labels = traitlets.List()  # labels selected
 
-    def __init__(self, tick_all=True, **kwargs):
+    def __init__(self, tick_all=True, page_size=20, **kwargs):
         self.tick_all = tick_all
-        self.checkbox_dict = {}
-        self._update_checkbox_group()
-
-        super().__init__(**kwargs)
-
-    def dw_btn(self, label):
-        """From label generate a redirect button to upf source"""
+        self.page_size = page_size
+        self.page = 0
+        self._selected = set()
+
+        self._rows = []  # the pool of (checkbox, link, row box) widgets of the page
+        self._row_labels = []  # label shown on each row of the pool
+        self._syncing = False  # set while the checkboxes are set from the selection
+
+        self.rows = ipw.VBox()
+        self.prev_page = ipw.Button(icon="chevron-left", layout={"width": "40px"})
+        self.prev_page.on_click(lambda _: self.show_page(self.page - 1))
+        self.next_page = ipw.Button(icon="chevron-right", layout={"width": "40px"})
+        self.next_page.on_click(lambda _: self.show_page(self.page + 1))
+        self.page_info = ipw.HTML()
+        self.pager = ipw.HBox(children=[self.prev_page, self.page_info, self.next_page])
+        self.pager.layout.display = "none"
+
+        super().__init__(children=[self.rows, self.pager], **kwargs)
+
+    def dw_url(self, label):
+        """From label generate the url of the upf source"""
         if "dojo.v4-std" in label:
             lib_folder = "NC-DOJOv4-standard"
         elif "dojo.v4-str" in label:
@@ -54,71 +131,111 @@ class SelectMultipleCheckbox(ipw.VBox):
         else:
             lib_folder = "UNCATOGRIZED"
 
-        btn = ipw.HTML(
-            f"""<a href="{BASE_DOWNLOAD_URL}/{lib_folder}/{label}.upf" target="_blank">➥</a>"""
-        )
+        return f"{BASE_DOWNLOAD_URL}/{lib_folder}/{label}.upf"
 
-        return btn
+    def _dw_link(self, label):
+        return f"""<a href="{self.dw_url(label)}" target="_blank">➥</a>"""
 
-    def _update_checkbox_group(self):
-        # Update the checkbox widgets view
-        self.children = [
-            ipw.HBox(children=[v, self.dw_btn(k)], layout=ipw.Layout(width="55%"))
-            for k, v in self.checkbox_dict.items()
-        ]
+    def _new_row(self):
+        checkbox = ipw.Checkbox(
+            style={"description_width": "initial"},
+            layout=ipw.Layout(width="50%", height="50%"),
+        )
+        index = len(self._rows)
+        checkbox.observe(
+            lambda change: self._on_any_checkbox_change(index, change), names="value"
+        )
+        link = ipw.HTML()
+        box = ipw.HBox(children=[checkbox, link], layout=ipw.Layout(width="55%"))
 
-        # Since all checkboxes are recreated set the observe for all of them
-        for checkbox in self.checkbox_dict.values():
-            checkbox.observe(self._on_any_checkbox_change, names="value")
+        return checkbox, link, box
 
-        # reset the outpput values
-        self._update_selected_labels()
+    @property
+    def n_pages(self) -> int:
+        return max(1, -(-len(self.options) // self.page_size))
+
+    def show_page(self, page):
+        """Show the rows of the page, the row widgets of the pool are reused"""
+        self.page = min(max(page, 0), self.n_pages - 1)
+        labels = self.options[
+            self.page * self.page_size : (self.page + 1) * self.page_size
+        ]
 
-    def _on_any_checkbox_change(self, change):
-        # Any time any checkbox ticked or unticked reset
+        while len(self._rows) < len(labels):
+            self._rows.append(self._new_row())
+            self._row_labels.append(None)
+
+        self._syncing = True
+        try:
+            for i, label in enumerate(labels):
+                checkbox, link, _ = self._rows[i]
+                if self._row_labels[i] != label:
+                    checkbox.description = parse_label(label)["representive_label"]
+                    link.value = self._dw_link(label)
+                    self._row_labels[i] = label
+                checkbox.value = label in self._selected
+        finally:
+            self._syncing = False
+
+        # only the changed values of the reused rows are sent to the frontend
+        children = tuple(box for _, _, box in self._rows[: len(labels)])
+        if children != self.rows.children:
+            self.rows.children = children
+
+        self.page_info.value = f"<p> page {self.page + 1} of {self.n_pages} </p>"
+        self.pager.layout.display = "flex" if self.n_pages > 1 else "none"
+        self.prev_page.disabled = self.page == 0
+        self.next_page.disabled = self.page == self.n_pages - 1
+
+    def _on_any_checkbox_change(self, index, change):
+        # the checkbox of a row is ticked or unticked by the user
+        if self._syncing:
+            return
+
+        label = self._row_labels[index]
+        if change["new"]:
+            self._selected.add(label)
+        else:
+            self._selected.discard(label)
         self._update_selected_labels()
 
     def _update_selected_labels(self):
         self.selected_labels = [
-            label for label, checkbox in self.checkbox_dict.items() if checkbox.value
+            label for label in self.options if label in self._selected
         ]
 
-    def unselecet_all(self):
-        with self.hold_trait_notifications():
-            for key in self.checkbox_dict.keys():
-                self.checkbox_dict[key].value = False
-
+    def select(self, labels):
+        """Set the selected labels at once, the labels not in options are ignored"""
+        self._selected = set(labels).intersection(self.options)
+        self.show_page(self.page)
         self._update_selected_labels()
 
-    def selecet_all(self):
-        with self.hold_trait_notifications():
-            for key in self.checkbox_dict.keys():
-                self.checkbox_dict[key].value = True
+    def unselecet_all(self):
+        self.select([])
 
-        self._update_selected_labels()
+    def selecet_all(self):
+        self.select(self.options)
 
     @traitlets.observe("options")
     def _observe_options_change(self, change):
-        # when options list (element rechoose) change update all checkboxes
-        self.checkbox_dict = {
-            f"{desc}": ipw.Checkbox(
-                description=parse_label(desc)["representive_label"],
-                value=self.tick_all,
-                style={"description_width": "initial"},
-                layout=ipw.Layout(width="50%", height="50%"),
-            )
-            for desc in self.options
+        # when options list (element rechoose) change, keep the selection of the
+        # labels still there and tick the new ones if tick_all
+        old = set(change["old"]) if isinstance(change["old"], list) else set()
+        self._selected = {
+            label
+            for label in change["new"]
+            if (label in self._selected if label in old else self.tick_all)
         }
-
-        self._update_checkbox_group()
+        self.show_page(0)
+        self._update_selected_labels()
 
 
 class PseudoSelectWidget(ipw.VBox):
     # (input) all pseudos of a element, the whole dict from json fixed once element choosen
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
 
     # (output) selected pseudos of a element, the whole dict once pseudos selected
-    selected_pseudos = traitlets.Dict(allow_none=True)
+    selected_pseudos = PseudoSetTrait(allow_none=True)
 
     def __init__(self):
         self.NO_PSEUDOS_FOR_SELECT_INFO = "No pseudopotentials available for compare, please select an element or upload a verification file."
@@ -138,6 +255,32 @@ class PseudoSelectWidget(ipw.VBox):
         self.select_buttons = ipw.HBox(children=[self.unselect_all, self.select_all])
         self.select_buttons.layout.visibility = "hidden"
 
+        # Filters of the selection on the fields of the label
+        self.facet_index = FacetIndex([])
+        self.facet_filters = {
+            facet: ipw.Dropdown(
+                options=[("All", None)],
+                value=None,
+                description=f"{facet}:",
+                layout=ipw.Layout(width="180px"),
+                style={"description_width": "initial"},
+            )
+            for facet in FACETS
+        }
+        self.search = ipw.Text(
+            placeholder="Search, e.g. psl paw",
+            layout=ipw.Layout(width="250px"),
+        )
+        for widget in list(self.facet_filters.values()) + [self.search]:
+            widget.observe(self._on_filter_change, names="value")
+        self._resetting_filters = False
+
+        self.filters = ipw.HBox(
+            children=list(self.facet_filters.values()) + [self.search],
+            layout=ipw.Layout(flex_flow="row wrap"),
+        )
+        self.filters.layout.display = "none"
+
         self.multiple_selection = SelectMultipleCheckbox(
             disabled=False, layout=ipw.Layout(width="98%")
         )
@@ -149,6 +292,7 @@ class PseudoSelectWidget(ipw.VBox):
             children=[
                 self.help_info,
                 self.select_buttons,
+                self.filters,
                 self.multiple_selection,
             ]
         )
@@ -163,34 +307,61 @@ class PseudoSelectWidget(ipw.VBox):
         # self.selected_pseudos = _load_pseudos(self.element)
         self.multiple_selection.selecet_all()
 
+    def _on_filter_change(self, _):
+        """Select the pseudos matching the filters, in one change of the selection"""
+        if self._resetting_filters:
+            return
+
+        filters = {facet: widget.value for facet, widget in self.facet_filters.items()}
+        self.multiple_selection.select(
+            self.facet_index.query(filters, self.search.value)
+        )
+
+    def _reset_filters(self):
+        """Set the facet options of the loaded pseudos and clear the filters"""
+        self._resetting_filters = True
+        try:
+            for facet, widget in self.facet_filters.items():
+                widget.value = None
+                widget.options = [("All", None)] + [
+                    (f"{value} ({count})", value)
+                    for value, count in self.facet_index.values(facet)
+                ]
+            self.search.value = ""
+        finally:
+            self._resetting_filters = False
+
     @traitlets.observe("pseudos")
     def _observe_pseudos(self, change):
-        if change["new"] is not None and change["new"] != {}:  # pseudos is not empty
+        if change["new"] is not None and len(change["new"]) > 0:  # pseudos is not empty
             with self.hold_trait_notifications():
                 self.select_buttons.layout.visibility = "visible"
                 # if select/unselect new element update prompt help info
                 self.help_info.value = "Please choose pseudopotentials to inspect:"
 
                 # self.pseudos store all dict for the element the initial parsed from element json
-                # select all pseudos of element as default
+                # select all new pseudos of element as default, keep the selection of the others
                 self.multiple_selection.options = list(self.pseudos.keys())
-                self.selected_pseudos = (
-                    self.pseudos.copy()
-                )  # the traitlets need to be a copy of the dict otherwise it will not trigger the change event
+                self._update_selected_pseudos(self.multiple_selection.selected_labels)
+
+                self.facet_index = FacetIndex(self.pseudos.keys())
+                self._reset_filters()
+                self.filters.layout.display = "flex"
         else:
             # if empty dict passed (by unseleted the element) reset multiple select widget
             self.reset()
 
     def _on_multiple_selection_change(self, change):
-        with self.hold_trait_notifications():
-            self.selected_pseudos = {
-                k: self.pseudos[k] for k in sorted(change["new"], key=str.lower)
-            }
+        self._update_selected_pseudos(change["new"])
+
+    def _update_selected_pseudos(self, labels):
+        self.selected_pseudos = self.pseudos.select(sorted(labels, key=str.lower))
 
     def reset(self):
         """Reset the widget to initial state, no checkbox widget at all"""
         with self.hold_trait_notifications():
             self.select_buttons.layout.visibility = "hidden"
             self.help_info.value = self.NO_PSEUDOS_FOR_SELECT_INFO
+            self.filters.layout.display = "none"
             self.multiple_selection.options = list()
-            self.selected_pseudos = {}
+            self.selected_pseudos = EMPTY
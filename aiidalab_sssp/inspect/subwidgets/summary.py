@@ -1,35 +1,70 @@
+import json
+
 import ipywidgets as ipw
+import numpy as np
 import pandas as pd
 import traitlets
-from aiida_sssp_workflow.calculations.calculate_delta import rel_errors_vec_length
 from aiida_sssp_workflow.workflows.verifications import (
     DEFAULT_CONVERGENCE_PROPERTIES_LIST,
 )
 from IPython.display import clear_output, display
 
-from aiidalab_sssp.inspect import extract_element, get_conf_list, parse_label
-from aiidalab_sssp.inspect.subwidgets.utils import CONFIGURATIONS
+from aiidalab_sssp.inspect import (
+    extract_element,
+    get_conf_list,
+    representive_label,
+)
+from aiidalab_sssp.inspect.pseudo_set import PseudoSetTrait
+from aiidalab_sssp.inspect.render import LazyRenderMixin
+from aiidalab_sssp.inspect.store import METRICS_STORE
+from aiidalab_sssp.inspect.subwidgets.utils import (
+    CONFIGURATIONS,
+    get_criteria_protocol,
+)
 
 
-class SummaryWidget(ipw.VBox):
+class SummaryWidget(LazyRenderMixin, ipw.VBox):
     """Summary of verification"""
 
-    pseudos = traitlets.Dict(allow_none=True)
+    pseudos = PseudoSetTrait(allow_none=True)
     selected_criteria = traitlets.Unicode()
+    # (output) the bounds of each property of the selected criteria
+    criteria = traitlets.Dict()
+
+    def __init__(self, store=None):
+        self.store = store or METRICS_STORE
 
-    def __init__(self):
         # Delta mesure
         self.accuracy_summary = ipw.Output()
         self.convergence_summary = ipw.Output()
 
         self.toggle_criteria = ipw.ToggleButtons(
-            options=["Efficiency", "Precision"],
+            options=["Efficiency", "Precision", "Custom"],
             value="Efficiency",
             tooltip="Toggle to switch criteria.",
         )
-        self.toggle_criteria.observe(self._on_toggle_criteria_change)
+        self.toggle_criteria.observe(self._on_toggle_criteria_change, names="value")
         ipw.dlink((self.toggle_criteria, "value"), (self, "selected_criteria"))
 
+        # The upper bounds of the custom criteria, initialized from the
+        # precision criteria when first shown.
+        self.custom_bounds = {}
+        for prop in DEFAULT_CONVERGENCE_PROPERTIES_LIST:
+            prop = prop.split(".")[1]
+            self.custom_bounds[prop] = ipw.BoundedFloatText(
+                min=0.0,
+                max=1000.0,
+                step=0.1,
+                description=prop.replace("_", " "),
+                style={"description_width": "initial"},
+                layout=ipw.Layout(width="200px"),
+            )
+            self.custom_bounds[prop].observe(
+                self._on_custom_bounds_change, names="value"
+            )
+        self.custom_criteria = ipw.HBox(children=list(self.custom_bounds.values()))
+        self.custom_criteria.layout.display = "none"
+
         self._show_rho = False
         self._show_dual = False
         self.toggle_show_dual_or_rho = ipw.ToggleButtons(
@@ -62,6 +97,7 @@ class SummaryWidget(ipw.VBox):
                 self.convergence_summary,
                 ipw.HTML("<p> Switch criteria to: </p>"),
                 self.toggle_criteria,
+                self.custom_criteria,
                 ipw.HTML("<p> Show ρ or dual </p>"),
                 self.toggle_show_dual_or_rho,
             ],
@@ -89,11 +125,14 @@ class SummaryWidget(ipw.VBox):
     def _on_pseudos_change(self, change):
         if change["new"] is not None and len(change["new"]) > 0:
             self.layout.display = "block"
-            self.update_accuracy_summary()
-            self.update_convergence_summary()
+            self.invalidate()
         else:
             self.layout.display = "none"
 
+    def _render(self):
+        self.update_accuracy_summary(self.toggle_measure_type.value)
+        self.update_convergence_summary()
+
     def _on_toggle_show_dual_or_rho_change(self, change):
         if change["new"] == "Show ρ cutoff":
             self._show_dual = False
@@ -107,109 +146,151 @@ class SummaryWidget(ipw.VBox):
 
         self.update_convergence_summary()
 
-    def _on_toggle_criteria_change(self, _):
+    def _on_toggle_criteria_change(self, change):
+        if change["new"] == "Custom":
+            self.custom_criteria.layout.display = "flex"
+        else:
+            self.custom_criteria.layout.display = "none"
+
+        self.update_criteria()
         self.update_convergence_summary()
 
+    def _on_custom_bounds_change(self, _):
+        if self.toggle_criteria.value == "Custom":
+            self.update_criteria()
+            self.update_convergence_summary()
+
+    def get_criteria(self) -> dict:
+        """Return the bounds of each property of the selected criteria"""
+        if not self.criteria:
+            self.update_criteria()
+
+        return self.criteria
+
+    def update_criteria(self):
+        """Update the criteria from the protocol or from the custom bounds"""
+        protocol = get_criteria_protocol()
+        precision = protocol["precision"]
+
+        if self.toggle_criteria.value != "Custom":
+            criteria = protocol[self.toggle_criteria.value.lower()]
+            self.criteria = {
+                prop: spec for prop, spec in criteria.items() if isinstance(spec, dict)
+            }
+            return
+
+        if not any(widget.value for widget in self.custom_bounds.values()):
+            # first time shown, start from the precision criteria
+            for prop, widget in self.custom_bounds.items():
+                widget.unobserve(self._on_custom_bounds_change, names="value")
+                widget.value = max(precision[prop]["bounds"])
+                widget.observe(self._on_custom_bounds_change, names="value")
+
+        self.criteria = {
+            prop: {
+                "mode": 0,
+                "bounds": [0.0, widget.value],
+                "eps": precision[prop]["eps"],
+            }
+            for prop, widget in self.custom_bounds.items()
+        }
+
+    def _selection_key(self) -> tuple:
+        return tuple(self.store.key(label, out) for label, out in self.pseudos.items())
+
+    def _accuracy_table(self) -> pd.DataFrame:
+        """The rounded nu and delta of the selection with columns of
+        (measure type, configuration), built once per selection."""
+
+        def _build():
+            element = extract_element(self.pseudos)
+            conf_list = [
+                i
+                for i in CONFIGURATIONS
+                if i in get_conf_list(element) and i != "TYPICAL"
+            ]
+            # there is no delta/nu result for missing conf of the pseudo,
+            # it will show in summary table as 'NaN'
+            metrics = self.store.accuracy(self.pseudos, conf_list)
+            index = pd.Index(
+                [representive_label(label) for label in metrics.labels],
+                name="Pseudopotential label",
+            )
+            return pd.concat(
+                {
+                    measure_type: pd.DataFrame(
+                        np.round(metrics.get(measure_type), 3),
+                        index=index,
+                        columns=conf_list,
+                    )
+                    for measure_type in ("nu", "delta")
+                },
+                axis=1,
+            )
+
+        return self.store.get("summary_accuracy", self._selection_key(), _build)
+
+    def _convergence_table(self) -> pd.DataFrame:
+        """The recommended cutoffs of the selection for the selected criteria with
+        columns of (cutoff, property), built once per selection and criteria."""
+        name = self.toggle_criteria.value
+        criteria = self.get_criteria()
+
+        def _build():
+            prop_list = [i.split(".")[1] for i in DEFAULT_CONVERGENCE_PROPERTIES_LIST]
+            # The cutoffs are re-evaluated from the convergence curves for the criteria.
+            # The rho cutoff is from the charge density test run at the wavefunction
+            # cutoff of the criteria the verification was run with.
+            recommendation = (
+                self.store.cutoff_engine(self.pseudos)
+                .recommend({name: criteria})
+                .pivot(
+                    index="label",
+                    columns="property",
+                    values=["wavefunction_cutoff", "chargedensity_cutoff"],
+                )
+            )
+            table = recommendation.reindex(
+                index=list(self.pseudos),
+                columns=pd.MultiIndex.from_product(
+                    [["wavefunction_cutoff", "chargedensity_cutoff"], prop_list]
+                ),
+            )
+            table.index = pd.Index(
+                [representive_label(label) for label in table.index],
+                name="Pseudopotential label",
+            )
+            return table
+
+        key = (
+            self._selection_key(),
+            name,
+            json.dumps(criteria, sort_keys=True),
+        )
+        return self.store.get("summary_convergence", key, _build)
+
     def _render_accuracy(self, measure_type="nu"):
-        rows = []
-        element = extract_element(self.pseudos)
-        conf_list = [
-            i for i in CONFIGURATIONS if i in get_conf_list(element) and i != "TYPICAL"
-        ]
-        columns = ["Pseudopotential label"] + conf_list
-        for label, pseudo_out in self.pseudos.items():
-            _data = pseudo_out["accuracy"]["delta"]
-            y_list = []
-            for i in conf_list:
-                output_parameters = _data.get(i, {}).get("output_parameters", {})
-                try:
-                    if measure_type == "delta":
-                        y = output_parameters["delta/natoms"]
-                    else:
-                        v0w, b0w, b1w = output_parameters["birch_murnaghan_results"]
-                        v0f, b0f, b1f = output_parameters["reference_wien2k_V0_B0_B1"]
-                        y = rel_errors_vec_length(v0w, b0w, b1w, v0f, b0f, b1f)
-                except KeyError:
-                    # there is no delta/nu result for this conf of this pseudo
-                    y = None
-
-                if y:
-                    y_list.append(round(y, 3))
-                else:
-                    # there is no delta/nu result for this conf of this pseudo
-                    # print("Cannot find nu value of pseudo={label}, conf={i}")
-                    # it will show in summary table as 'nan'
-                    y_list.append("nan")
-
-            output_label = parse_label(label)["representive_label"]
-            rows.append([output_label, *y_list])
-
-        df = pd.DataFrame(rows, columns=columns)
-        df.style.hide_index()
-        return df
+        return self._accuracy_table()[measure_type].reset_index()
 
     def _render_convergence(self):
-        rows = []
-        prop_list = [i.split(".")[1] for i in DEFAULT_CONVERGENCE_PROPERTIES_LIST]
-        columns = ["Pseudopotential label"] + [i.replace("_", " ") for i in prop_list]
-        for label, pseudo_out in self.pseudos.items():
-            _data = pseudo_out["convergence"]
-            cutoffs = []
-            for prop in prop_list:
-                # We didn't not relly run the convergence on rho at precision criteria
-                # The trick here is the wft cutoff of rho cutoff is write and used,
-                # The dual is from wfccut/rhocut of efficiency criteria, and also applied to
-                # precision results display. The rhocut is derived then from rhocut=wfccut * dual.
-                wfc_cutoff = (
-                    _data.get(prop, {})
-                    .get("output_parameters", {})
-                    .get("wavefunction_cutoff", None)
-                )
-                rho_cutoff = (
-                    _data.get(prop, {})
-                    .get("output_parameters", {})
-                    .get("chargedensity_cutoff", None)
-                )
-                wfc_cutoff_str = f"{int(wfc_cutoff)} Ry" if wfc_cutoff else "nan"
-                rho_cutoff_str = f"{int(rho_cutoff)} Ry" if rho_cutoff else "nan"
-                # compute dual. The dual is same for both precision and efficiency
-                try:
-                    dual = round(rho_cutoff / wfc_cutoff, 1)
-                except Exception:
-                    dual = "nan"
-
-                # if checking precision, update cutoff pair first
-                if self.toggle_criteria.value == "Precision":
-                    wfc_cutoff = (
-                        _data.get(prop, {})
-                        .get("output_parameters", {})
-                        .get("all_criteria_wavefunction_cutoff", {})
-                        .get("precision", None)
-                    )
-                    wfc_cutoff_str = f"{int(wfc_cutoff)} Ry" if wfc_cutoff else "nan"
-                    try:
-                        rho_cutoff = int(wfc_cutoff * dual)
-                    except Exception:
-                        rho_cutoff_str = "nan"
-                    else:
-                        rho_cutoff_str = f"{rho_cutoff} Ry"
-
-                    if not wfc_cutoff:
-                        cutoffs.append(str("nan"))
-                        continue
-
-                # not allow to show at the same time
-                assert not (self._show_dual and self._show_rho)
-                if self._show_rho:
-                    cutoffs.append(f"{wfc_cutoff_str} ({rho_cutoff_str})")
-                elif self._show_dual:
-                    cutoffs.append(f"{wfc_cutoff_str} ({dual})")
-                else:
-                    cutoffs.append(f"{wfc_cutoff_str}")
-
-            output_label = parse_label(label)["representive_label"]
-            rows.append([output_label, *cutoffs])
-
-        df = pd.DataFrame(rows, columns=columns)
-        df.style.hide_index()
-        return df
+        """Format the cached cutoffs, the toggles only change the formatting"""
+        table = self._convergence_table()
+        wfc = table["wavefunction_cutoff"].astype(float)
+        rho = table["chargedensity_cutoff"].astype(float)
+
+        def _ry(cutoffs):
+            return cutoffs.apply(
+                lambda col: col.map(lambda x: "nan" if np.isnan(x) else f"{int(x)} Ry")
+            )
+
+        # not allow to show at the same time
+        assert not (self._show_dual and self._show_rho)
+        df = _ry(wfc)
+        if self._show_rho:
+            df = df + " (" + _ry(rho) + ")"
+        elif self._show_dual:
+            df = df + " (" + (rho / wfc).round(1).astype(str) + ")"
+        df = df.mask(wfc.isna(), "nan")
+
+        df.columns = [i.replace("_", " ") for i in df.columns]
+        return df.reset_index()
@@ -1,3 +1,16 @@
-from aiida_sssp_workflow.utils import OXIDE_CONFIGURATIONS, UNARIE_CONFIGURATIONS
+from functools import lru_cache
+
+from aiida_sssp_workflow.utils import (
+    OXIDE_CONFIGURATIONS,
+    UNARIE_CONFIGURATIONS,
+    get_protocol,
+)
 
 CONFIGURATIONS = OXIDE_CONFIGURATIONS + UNARIE_CONFIGURATIONS + ["RE", "TYPICAL"]
+
+
+@lru_cache(maxsize=None)
+def get_criteria_protocol() -> dict:
+    """Return the criteria protocol, the YAML is parsed once per process.
+    The returned dict is shared, do not modify it."""
+    return get_protocol("criteria")
@@ -0,0 +1,227 @@
+"""Module contains the WebGL plots of the inspect widgets, an optional backend
+based on plotly. The data is sent to the browser once per render, hover, zoom and
+toggling the legend happen client-side without a round-trip to the kernel."""
+import warnings
+
+import numpy as np
+from IPython.display import clear_output, display
+from matplotlib.colors import to_hex
+
+from aiidalab_sssp.inspect import cmap, parse_label
+
+BACKENDS = ("matplotlib", "webgl")
+
+
+def webgl_available() -> bool:
+    """Whether plotly is installed for the webgl backend"""
+    try:
+        import plotly  # noqa: F401
+    except ImportError:
+        return False
+
+    return True
+
+
+def check_backend(backend) -> str:
+    """Return the plotting backend, fall back to matplotlib if webgl is not available"""
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+
+    if backend == "webgl" and not webgl_available():
+        warnings.warn("plotly is not installed, fall back to the matplotlib backend.")
+        return "matplotlib"
+
+    return backend
+
+
+def _color(pseudo_info) -> str:
+    return to_hex(cmap(pseudo_info))
+
+
+def _hline(y, yref):
+    """The dashed threshold line spanning the x axis"""
+    return dict(
+        type="line",
+        xref=f"{yref.replace('y', 'x')} domain",
+        x0=0,
+        x1=1,
+        yref=yref,
+        y0=y,
+        y1=y,
+        line=dict(color="red", dash="dash", width=1),
+    )
+
+
+class _PlotGL:
+    """Base of the WebGL plots, the figure widget is displayed once."""
+
+    def __init__(self, fig):
+        self.fig = fig
+        self._labels = None
+        self._output = None
+
+    def show(self, output):
+        """Display the figure in output once, afterwards it updates in place."""
+        if self._output is output:
+            return
+
+        with output:
+            clear_output(wait=True)
+            display(self.fig)
+        self._output = output
+
+
+class ConvergencePlotGL(_PlotGL):
+    """Convergence curves of the wavefunction and charge density cutoff tests,
+    one Scattergl trace per pseudo per test. A legend entry toggles both traces
+    of the pseudo."""
+
+    def __init__(self, width=1024, height=600):
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        fig = make_subplots(
+            rows=2,
+            cols=1,
+            vertical_spacing=0.15,
+            subplot_titles=(
+                "Convergence verification (dual=4 for NC and dual=8 for non-NC)",
+                "Convergence test at fixed wavefunction cutoff",
+            ),
+        )
+        fig.update_layout(
+            width=width,
+            height=height,
+            margin=dict(l=60, r=20, t=40, b=40),
+            legend=dict(font=dict(size=10)),
+        )
+        fig.update_xaxes(title_text="Wavefuntion cutoff (Ry)", row=1, col=1)
+        fig.update_xaxes(title_text="Charge density cudoff (Ry)", row=2, col=1)
+        super().__init__(go.FigureWidget(fig))
+
+    def _draw_traces(self, labels):
+        import plotly.graph_objects as go
+
+        self.fig.data = ()
+        for label in labels:
+            pseudo_info = parse_label(label)
+            for row, test in ((1, "wfc"), (2, "rho")):
+                self.fig.add_trace(
+                    go.Scattergl(
+                        x=[],
+                        y=[],
+                        mode="lines+markers",
+                        marker=dict(symbol="triangle-up", size=5),
+                        line=dict(color=_color(pseudo_info), width=1),
+                        name=pseudo_info["representive_label"],
+                        legendgroup=label,
+                        showlegend=test == "wfc",
+                    ),
+                    row=row,
+                    col=1,
+                )
+        self._labels = list(labels)
+
+    def render(self, dataset, labels, wfname, measure, ylabel, threshold=None):
+        """Update the traces to the curves of the property and measure
+
+        :param dataset: the `ConvergenceDataset` of the pseudos.
+        """
+        curves = {
+            key: group
+            for key, group in dataset.select(wfname, measure).groupby(
+                ["label", "test"], sort=False
+            )
+        }
+
+        with self.fig.batch_update():
+            if self._labels != list(labels):
+                self._draw_traces(labels)
+
+            for i, label in enumerate(self._labels):
+                wavefunction_cutoff = dataset.cutoff(label, wfname)
+                for trace, test in zip(
+                    self.fig.data[2 * i : 2 * i + 2], ("wfc", "rho")
+                ):
+                    group = curves.get((label, test))
+                    if group is None or wavefunction_cutoff is None:
+                        trace.visible = False
+                        continue
+
+                    trace.x = group["cutoff"].to_numpy()
+                    trace.y = group["value"].to_numpy()
+                    trace.visible = True
+                    if test == "rho":
+                        trace.hovertext = f"wfc cutoff {wavefunction_cutoff} Ry"
+
+            self.fig.layout.shapes = (
+                [_hline(threshold, "y"), _hline(threshold, "y2")] if threshold else []
+            )
+            self.fig.update_yaxes(title_text=ylabel, row=2, col=1)
+
+
+class AccuracyMeritPlotGL(_PlotGL):
+    """Grouped bars of the nu or delta of the pseudos over the configurations"""
+
+    def __init__(self, width=1024, height=360):
+        import plotly.graph_objects as go
+
+        fig = go.Figure()
+        fig.update_layout(
+            width=width,
+            height=height,
+            barmode="group",
+            margin=dict(l=60, r=20, t=40, b=40),
+            legend=dict(x=0.0, y=1.0, font=dict(size=10)),
+            shapes=[
+                dict(
+                    type="line",
+                    xref="x domain",
+                    x0=0,
+                    x1=1,
+                    yref="y",
+                    y0=1.0,
+                    y1=1.0,
+                    line=dict(color="gray", dash="dash", width=1),
+                )
+            ],
+        )
+        super().__init__(go.FigureWidget(fig))
+
+    def render(self, metrics, measure_type, element=None):
+        """Update the bars to the measure of the accuracy metrics"""
+        import plotly.graph_objects as go
+
+        values = metrics.get(measure_type)
+        # NaN is not JSON, the missing configurations are empty bars
+        values = np.where(np.isnan(values), None, values)
+
+        with self.fig.batch_update():
+            if self._labels != list(metrics.labels):
+                self.fig.data = ()
+                for label in metrics.labels:
+                    pseudo_info = parse_label(label)
+                    self.fig.add_trace(
+                        go.Bar(
+                            name=pseudo_info["representive_label"],
+                            marker=dict(
+                                color=_color(pseudo_info),
+                                line=dict(color="black", width=1),
+                            ),
+                        )
+                    )
+                self._labels = list(metrics.labels)
+
+            for trace, row in zip(self.fig.data, values):
+                trace.x = list(metrics.configurations)
+                trace.y = list(row)
+
+            y_max = np.nanmax(metrics.get(measure_type), initial=0.0)
+            y_max = 10 / 8.0 * y_max if y_max < 8.0 else 10.0
+            self.fig.update_layout(
+                title_text=f"X={element}",
+                yaxis=dict(
+                    title_text="Δ -factor" if measure_type == "delta" else "ν -factor",
+                    range=[0, y_max],
+                ),
+            )
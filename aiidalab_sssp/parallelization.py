@@ -0,0 +1,75 @@
+"""Module contains the automatic sizing of the parallelization of the verification.
+The number of k-point pools is derived from the MPI processes allocated and the
+number of k-points of the structure of the element, so the processes are spread
+over the k-points instead of idling on a too small plane wave distribution."""
+import math
+import warnings
+from functools import lru_cache
+
+# The default protocol of the convergence tests, the bulk of the calculations
+_PROTOCOL = "acwf"
+
+
+def estimate_num_kpoints(element, protocol=_PROTOCOL) -> int:
+    """Estimate the number of k-points of the convergence structure of the element.
+
+    The mesh is the one of the `kpoints_distance` of the protocol, halved for the
+    time reversal symmetry, the other symmetries of the structure are not counted.
+
+    :raises KeyError: if the workflow has no structure of the element.
+    """
+    import numpy as np
+    from aiida.orm import KpointsData
+    from aiida_sssp_workflow.utils import get_protocol, get_standard_structure
+
+    distance = get_protocol("converge", protocol)["base"]["kpoints_distance"]
+    structure = get_standard_structure(element, prop="convergence")
+
+    kpoints = KpointsData()
+    kpoints.set_cell_from_structure(structure)
+    kpoints.set_kpoints_mesh_from_density(distance)
+    mesh, _ = kpoints.get_kpoints_mesh()
+
+    return max(1, math.ceil(np.prod(mesh) / 2))
+
+
+def auto_npool(num_mpiprocs, num_kpoints=None) -> int:
+    """Return the number of k-point pools for the MPI processes.
+
+    It is the largest divisor of the number of processes not exceeding the number
+    of k-points, so every pool has the same number of processes and k-points.
+    Without the number of k-points one pool is used.
+    """
+    if not num_kpoints or num_mpiprocs < 1:
+        return 1
+
+    return max(
+        npool
+        for npool in range(1, min(num_mpiprocs, num_kpoints) + 1)
+        if num_mpiprocs % npool == 0
+    )
+
+
+@lru_cache(maxsize=None)
+def _element_num_kpoints(element, protocol):
+    """The estimated k-points of the element, None if it can not be estimated.
+    The failures are cached as well, so the structure is read at most once."""
+    try:
+        return estimate_num_kpoints(element, protocol)
+    except KeyError:
+        # no structure of the element
+        return None
+    except Exception as exc:
+        warnings.warn(
+            f"The k-points of {element} can not be estimated, the k-point pools "
+            f"are not derived from them: {exc!r}"
+        )
+        return None
+
+
+def min_num_kpoints(elements, protocol=_PROTOCOL) -> int:
+    """Return the fewest estimated k-points of the elements with the convergence
+    protocol, None if none of them can be estimated"""
+    num_kpoints = [_element_num_kpoints(element, protocol) for element in set(elements)]
+
+    return min((n for n in num_kpoints if n is not None), default=None)
@@ -0,0 +1,392 @@
+"""Module contains the runtime model of the verifications built from the finished
+verifications of the profile. The calculations of every property run are summed
+to its core-hours, the prediction of a new verification is the median of the
+runs of the most similar pseudos: same element, pseudo type and cutoff control,
+relaxed step by step when there are no such runs."""
+import math
+from functools import lru_cache
+
+import ipywidgets as ipw
+import pandas as pd
+from aiida.common.links import LinkType
+from aiida.orm import CalcJobNode, QueryBuilder, Str, WorkflowNode
+from aiida.plugins import WorkflowFactory
+from aiida_sssp_workflow.workflows.verifications import DEFAULT_PROPERTIES_LIST
+
+RECORD_COLUMNS = [
+    "element",
+    "pp_type",
+    "cutoff_control",
+    "property",
+    "num_mpiprocs",
+    "wallclock",
+    "core_hours",
+]
+
+# The keys the runs are matched by, from the most to the least similar
+MATCH_LEVELS = (
+    ("element", "pp_type", "cutoff_control"),
+    ("pp_type", "cutoff_control"),
+    ("cutoff_control",),
+    (),
+)
+
+
+@lru_cache(maxsize=None)
+def _property_of_process_label() -> dict:
+    return {
+        WorkflowFactory(f"sssp_workflow.{prop}").__name__: prop
+        for prop in DEFAULT_PROPERTIES_LIST
+    }
+
+
+def _calcjob_cores(resources) -> int:
+    resources = resources or {}
+    if "tot_num_mpiprocs" in resources:
+        return resources["tot_num_mpiprocs"]
+
+    return resources.get("num_machines", 1) * resources.get(
+        "num_mpiprocs_per_machine", 1
+    )
+
+
+def _calcjob_seconds(last_job_info, ctime, mtime) -> float:
+    """The walltime of the scheduler, the lifetime of the node if not known"""
+    seconds = (last_job_info or {}).get("wallclock_time_seconds")
+    if seconds is None:
+        seconds = (mtime - ctime).total_seconds()
+
+    return float(seconds)
+
+
+def _root_of_called(links, roots) -> dict:
+    """Map the nodes called at any depth by the roots to their root.
+
+    :param links: the (caller, callee) pks of the call links.
+    """
+    called = {}
+    for caller, callee in links:
+        called.setdefault(caller, []).append(callee)
+
+    root_of = {}
+    for root in roots:
+        stack = [root]
+        while stack:
+            for callee in called.get(stack.pop(), ()):
+                if callee not in root_of:
+                    root_of[callee] = root
+                    stack.append(callee)
+
+    return root_of
+
+
+def _called_by_workflows(node_class, link_type, since, project) -> list:
+    """The (caller pk, *projections) of the nodes of the class called by the
+    workflows created since"""
+    query = QueryBuilder()
+    query.append(
+        WorkflowNode, filters={"ctime": {">=": since}}, tag="caller", project="id"
+    )
+    query.append(
+        node_class,
+        with_incoming="caller",
+        edge_filters={"type": link_type.value},
+        project=project,
+    )
+
+    return query.all()
+
+
+def runtime_records() -> pd.DataFrame:
+    """Return one row per property run of the verifications finished ok.
+
+    The wallclock is the lifetime of the property work chain in hours, the
+    core-hours are summed over its calculations. The calculations are called at
+    any depth, which a query can not follow, so their call tree is rebuilt from
+    the call links of all the calculations queried at once.
+    """
+    process_labels = _property_of_process_label()
+
+    query = QueryBuilder()
+    query.append(
+        WorkflowNode,
+        filters={
+            "attributes.process_label": "VerificationWorkChain",
+            "attributes.process_state": "finished",
+            "attributes.exit_status": 0,
+        },
+        tag="verification",
+        project=["extras.element", "extras.pp_type"],
+    )
+    query.append(
+        Str,
+        with_outgoing="verification",
+        edge_filters={"label": "accuracy__cutoff_control"},
+        project="attributes.value",
+    )
+    query.append(
+        WorkflowNode,
+        with_incoming="verification",
+        edge_filters={"type": LinkType.CALL_WORK.value},
+        filters={
+            "attributes.process_label": {"in": list(process_labels)},
+            "attributes.exit_status": 0,
+        },
+        tag="property",
+        project=["id", "attributes.process_label", "ctime", "mtime"],
+    )
+    properties = query.all()
+    if not properties:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+
+    # the nodes called by a property are created after it
+    since = min(row[5] for row in properties)
+    workflow_links = _called_by_workflows(WorkflowNode, LinkType.CALL_WORK, since, "id")
+    calcjobs = _called_by_workflows(
+        CalcJobNode,
+        LinkType.CALL_CALC,
+        since,
+        ["id", "attributes.resources", "attributes.last_job_info", "ctime", "mtime"],
+    )
+
+    property_of = _root_of_called(
+        workflow_links + [(caller, pk) for caller, pk, *_ in calcjobs],
+        [row[3] for row in properties],
+    )
+    num_mpiprocs = {}
+    core_hours = {}
+    for _, pk, resources, last_job_info, ctime, mtime in calcjobs:
+        property_pk = property_of.get(pk)
+        if property_pk is None:
+            continue
+
+        cores = _calcjob_cores(resources)
+        seconds = _calcjob_seconds(last_job_info, ctime, mtime)
+        num_mpiprocs[property_pk] = max(num_mpiprocs.get(property_pk, 0), cores)
+        core_hours[property_pk] = core_hours.get(property_pk, 0.0) + (
+            cores * seconds / 3600
+        )
+
+    runs = [
+        {
+            "element": element,
+            "pp_type": pp_type,
+            "cutoff_control": cutoff_control,
+            "property": process_labels[process_label],
+            "num_mpiprocs": num_mpiprocs.get(property_pk, 0),
+            "wallclock": (property_mtime - property_ctime).total_seconds() / 3600,
+            "core_hours": core_hours.get(property_pk, 0.0),
+        }
+        for (
+            element,
+            pp_type,
+            cutoff_control,
+            property_pk,
+            process_label,
+            property_ctime,
+            property_mtime,
+        ) in properties
+    ]
+
+    return pd.DataFrame(runs, columns=RECORD_COLUMNS)
+
+
+def predict_runtime(records, pseudo, cutoff_control, properties, num_mpiprocs):
+    """Predict the wallclock and core-hours of every property of a verification.
+
+    The core-hours are the median of the matching runs, the wallclock is scaled
+    from the cores of the runs to `num_mpiprocs` assuming ideal scaling.
+
+    :param pseudo: dict of the element and pp_type of the pseudo.
+    :return: dataframe indexed by property with the wallclock (h), core-hours,
+        number of runs and the keys they are matched by.
+    """
+    query = {**pseudo, "cutoff_control": cutoff_control}
+
+    rows = []
+    for prop in properties:
+        runs = records[records["property"] == prop]
+        for keys in MATCH_LEVELS:
+            matched = runs
+            for key in keys:
+                matched = matched[matched[key] == query[key]]
+            if len(matched):
+                break
+
+        if not len(matched):
+            rows.append((prop, None, None, 0, ""))
+            continue
+
+        rows.append(
+            (
+                prop,
+                (matched["wallclock"] * matched["num_mpiprocs"]).median()
+                / max(num_mpiprocs, 1),
+                matched["core_hours"].median(),
+                len(matched),
+                ", ".join(str(query[key]) for key in keys) or "all pseudos",
+            )
+        )
+
+    return pd.DataFrame(
+        rows, columns=["property", "wallclock", "core_hours", "runs", "matched_by"]
+    ).set_index("property")
+
+
+def suggest_num_nodes(core_hours, mpiprocs_per_machine, max_wallclock) -> int:
+    """The number of nodes to finish the core-hours within the wallclock (h)"""
+    if not core_hours or mpiprocs_per_machine < 1 or max_wallclock <= 0:
+        return 1
+
+    return max(1, math.ceil(core_hours / (mpiprocs_per_machine * max_wallclock)))
+
+
+class RuntimeEstimateWidget(ipw.VBox):
+    """The predicted wallclock and core-hours of the verifications to submit,
+    and the nodes suggested to finish them within a wallclock limit.
+
+    :param on_apply: called with the suggested number of nodes to apply it.
+    """
+
+    def __init__(self, on_apply=None, **kwargs):
+        self.on_apply = on_apply
+        self._records = None
+        self._request = None
+        self._suggested_nodes = None
+
+        self.max_wallclock = ipw.BoundedFloatText(
+            value=24.0,
+            min=0.5,
+            max=1000.0,
+            step=0.5,
+            description="Finish within (h):",
+            style={"description_width": "initial"},
+            layout=ipw.Layout(width="220px"),
+        )
+        self.max_wallclock.observe(lambda _: self.refresh(), "value")
+        self.apply_button = ipw.Button(
+            description="Apply suggested nodes",
+            tooltip="Set the number of nodes to the suggested one.",
+            disabled=True,
+            layout=ipw.Layout(width="auto"),
+        )
+        self.refresh_button = ipw.Button(
+            description="Refresh",
+            tooltip="Rebuild the runtime model from the verifications of the profile.",
+            layout=ipw.Layout(width="auto"),
+        )
+        self.refresh_button.on_click(self._on_refresh)
+        self.table = ipw.HTML()
+        self.apply_button.on_click(self._on_apply)
+
+        super().__init__(
+            children=[
+                ipw.HTML("<h4>Runtime estimate</h4>"),
+                ipw.HBox(
+                    children=[
+                        self.max_wallclock,
+                        self.apply_button,
+                        self.refresh_button,
+                    ]
+                ),
+                self.table,
+            ],
+            **kwargs,
+        )
+
+    @property
+    def records(self) -> pd.DataFrame:
+        """The runs of the profile, queried on first use"""
+        if self._records is None:
+            self._records = runtime_records()
+
+        return self._records
+
+    def _on_refresh(self, _):
+        self._records = None
+        self.refresh()
+
+    def _on_apply(self, _):
+        if self.on_apply is not None and self._suggested_nodes is not None:
+            self.on_apply(self._suggested_nodes)
+
+    def estimate(
+        self,
+        pseudos,
+        cutoff_control,
+        properties,
+        num_machines,
+        mpiprocs_per_machine,
+    ):
+        """Show the estimate of the verifications of the pseudos.
+
+        :param pseudos: list of dict of the element and pp_type of every pseudo.
+        """
+        self._request = (
+            pseudos,
+            cutoff_control,
+            properties,
+            num_machines,
+            mpiprocs_per_machine,
+        )
+        self.refresh()
+
+    def refresh(self):
+        request = self._request
+        if not request or not request[0] or not request[2]:
+            self.table.value = "<p>No verification to estimate.</p>"
+            self.apply_button.disabled = True
+            return
+
+        (
+            pseudos,
+            cutoff_control,
+            properties,
+            num_machines,
+            mpiprocs_per_machine,
+        ) = request
+        num_mpiprocs = num_machines * mpiprocs_per_machine
+
+        predictions = [
+            predict_runtime(
+                self.records, pseudo, cutoff_control, properties, num_mpiprocs
+            )
+            for pseudo in pseudos
+        ]
+        # per property the longest verification and the core-hours of all of them
+        combined = (
+            pd.concat(predictions)
+            .groupby(level=0, sort=False)
+            .agg(
+                wallclock=("wallclock", "max"),
+                core_hours=("core_hours", lambda hours: hours.sum(min_count=1)),
+                runs=("runs", "min"),
+                matched_by=("matched_by", "first"),
+            )
+        )
+        rows = "".join(
+            f"""<tr><td>{prop}</td>
+            <td>{_format_hours(row.wallclock)}</td>
+            <td>{_format_hours(row.core_hours)}</td>
+            <td>{row.runs}{f" ({row.matched_by})" if row.runs else ""}</td></tr>"""
+            for prop, row in combined.iterrows()
+        )
+        total_core_hours = combined["core_hours"].sum()
+        unknown = sum(int(p["runs"].eq(0).sum()) for p in predictions)
+
+        self._suggested_nodes = suggest_num_nodes(
+            total_core_hours, mpiprocs_per_machine, self.max_wallclock.value
+        )
+        self.apply_button.disabled = not total_core_hours
+
+        self.table.value = f"""
+            <table><tr><th>Property</th><th>Wallclock per verification (h)</th>
+            <th>Core-hours of all</th><th>Runs</th></tr>{rows}</table>
+            <p>{len(pseudos)} verification(s): {total_core_hours:.1f} core-hours in
+            total{f", {unknown} property run(s) without history" if unknown else ""}.
+            Suggested nodes to finish within {self.max_wallclock.value:g} h:
+            {self._suggested_nodes}.</p>"""
+
+
+def _format_hours(hours) -> str:
+    return "n/a" if hours is None or pd.isna(hours) else f"{hours:.2f}"
@@ -1,14 +1,16 @@
 """widget for pseudo inmport"""
+import html
 import io
 import os
+import tarfile
+import zipfile
 
 import ipywidgets as ipw
 import traitlets
-from aiida import orm
 from aiida.common import NotExistent
 from aiida.engine import ProcessState
 from aiida.orm import Node, load_code, load_node
-from aiida.plugins import DataFactory, WorkflowFactory
+from aiida.plugins import DataFactory
 from aiida_sssp_workflow.workflows.verifications import DEFAULT_PROPERTIES_LIST
 from aiidalab_widgets_base import (
     ComputationalResourcesWidget,
@@ -19,10 +21,87 @@ from aiidalab_widgets_base import (
 )
 from IPython.display import clear_output, display
 
+from aiidalab_sssp.duplicates import REUSED, find_verifications, missing_properties
+from aiidalab_sssp.parallelization import auto_npool, min_num_kpoints
 from aiidalab_sssp.parameters import DEFAULT_PARAMETERS
+from aiidalab_sssp.runtime import RuntimeEstimateWidget
+from aiidalab_sssp.submission_queue import FAILED, QUEUED, SubmissionQueueWidget
+from aiidalab_sssp.upf_header import pseudo_header
 
 UpfData = DataFactory("pseudo.upf")
-VerificationWorkChain = WorkflowFactory("sssp_workflow.verification")
+
+
+def _is_upf(filename) -> bool:
+    return filename.lower().endswith(".upf")
+
+
+def iter_upf_files(filename, content):
+    """Yield the (filename, content) of the UPF files of an uploaded file.
+
+    The upload is either a UPF file, a tarball or a zip archive of UPF files,
+    the archives are read in memory and the other members are skipped.
+    """
+    if zipfile.is_zipfile(io.BytesIO(content)):
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_upf(info.filename):
+                    yield os.path.basename(info.filename), archive.read(info)
+        return
+
+    try:
+        archive = tarfile.open(fileobj=io.BytesIO(content), mode="r:*")
+    except tarfile.TarError:
+        # not an archive, a single pseudo file
+        yield filename, content
+        return
+
+    with archive:
+        for member in archive.getmembers():
+            if member.isfile() and _is_upf(member.name):
+                yield os.path.basename(member.name), archive.extractfile(member).read()
+
+
+def pseudo_metadata(filename, pseudo, family="", tool="", version="") -> dict:
+    """Return the metadata for the label of a pseudo.
+
+    The metadata is read from the filename if it is a standard label, otherwise the
+    element, type and z_valence are parsed from the header of the `UpfData` and
+    the family, tool and version given are used.
+    """
+    from aiidalab_sssp.inspect import parse_label
+
+    try:
+        # when upload a standard named input
+        label_dict = parse_label(".".join(filename.split(".")[:-1]))
+    except Exception:
+        # when upload a non-standard named input upf
+        pseudo_info = pseudo_header(pseudo)
+
+        return {
+            "element": pseudo_info["element"],
+            "type": pseudo_info["pp_type"],
+            "z_valence": pseudo_info["z_valence"],
+            "family": family,
+            "tool": tool,
+            "version": version,
+        }
+
+    return {
+        "element": label_dict["element"],
+        "type": label_dict["type"],
+        "z_valence": label_dict["z"],
+        "family": label_dict["family"],
+        "tool": label_dict["tool"],
+        "version": label_dict["version"],
+    }
+
+
+def metadata_label(metadata) -> str:
+    """Return the standard label of the pseudo from its metadata.
+
+    :raises KeyError: if a field of the metadata is not set.
+    """
+    return "{element}.{type}.{z_valence}.{tool}.{family}.{version}".format(**metadata)
 
 
 class PseudoUploadWidget(ipw.VBox):
@@ -62,17 +141,78 @@ Supported pseudo formats (Now only support UPF type)
             )
 
 
+class BatchPseudoUploadWidget(ipw.VBox):
+    """Class that allows to upload many pseudopotentials at once, as UPF files,
+    a tarball or a zip archive of UPF files."""
+
+    # list of (filename, UpfData)
+    pseudos = traitlets.List()
+    error_message = traitlets.Unicode()
+
+    def __init__(self, description="Upload Pseudopotentials"):
+        self.file_upload = ipw.FileUpload(
+            description=description,
+            multiple=True,
+            accept=".upf,.UPF,.tar,.gz,.tgz,.bz2,.xz,.zip",
+            layout={"width": "initial"},
+        )
+        supported_formats = ipw.HTML(
+            """<p>UPF files, or a tarball or zip archive of UPF files.</p>"""
+        )
+        self.file_upload.observe(self._on_file_upload, names="value")
+        self.error_message = ""
+        super().__init__(children=[self.file_upload, supported_formats])
+
+    def _on_file_upload(self, change=None):
+        """When file upload button is pressed."""
+        pseudos = []
+        failed = []
+        for fname, item in change["new"].items():
+            try:
+                for upf_name, content in iter_upf_files(fname, item["content"]):
+                    try:
+                        pseudos.append(
+                            (upf_name, UpfData(io.BytesIO(content), filename=upf_name))
+                        )
+                    except ValueError:
+                        failed.append(upf_name)
+            except (tarfile.TarError, zipfile.BadZipFile):
+                failed.append(fname)
+
+        with self.hold_trait_notifications():
+            self.error_message = (
+                f"wrong pseudopotential file type, skipped: {', '.join(failed)}"
+                if failed
+                else ""
+            )
+            self.pseudos = pseudos
+
+
 class PseudoSelectionStep(ipw.VBox, WizardAppWidgetStep):
     """
     Upload a pesudopotential and store it as UpfData in database
     """
 
     confirmed_pseudo = traitlets.Tuple(allow_none=True)
+    # list of (filename, UpfData) confirmed in batch mode
+    confirmed_pseudos = traitlets.List()
 
     def __init__(self, **kwargs):
         self.pseudo_upload = PseudoUploadWidget()
         self.pseudo_upload.observe(self._observe_pseudo_upload, "pseudo")
 
+        self.batch_upload = BatchPseudoUploadWidget()
+        self.batch_upload.observe(self._observe_batch_upload, "pseudos")
+
+        self.batch_mode = ipw.Checkbox(
+            value=False,
+            description="Batch: verify many pseudopotentials with the same settings",
+            indent=False,
+            layout=ipw.Layout(width="auto"),
+        )
+        self.batch_mode.observe(self._observe_batch_mode, "value")
+        self.upload_box = ipw.VBox(children=[self.pseudo_upload])
+
         self.description = ipw.HTML(
             """
             <p>Select a pseudopotential from one of the following sources and then
@@ -103,7 +243,8 @@ class PseudoSelectionStep(ipw.VBox, WizardAppWidgetStep):
         super().__init__(
             children=[
                 self.description,
-                self.pseudo_upload,
+                self.batch_mode,
+                self.upload_box,
                 self.pseudo_text,
                 self.message_area,
                 self.confirm_button,
@@ -119,7 +260,7 @@ class PseudoSelectionStep(ipw.VBox, WizardAppWidgetStep):
         if self.pseudo_text is None:
             self.state = self.State.READY
         else:
-            if self.confirmed_pseudo:
+            if self.confirmed_pseudo or self.confirmed_pseudos:
                 self.state = self.State.SUCCESS
                 self.confirm_button.disabled = True
             else:
@@ -139,21 +280,43 @@ class PseudoSelectionStep(ipw.VBox, WizardAppWidgetStep):
 
             self._update_state()
 
-    @traitlets.observe("confirmed_pseudo")
+    def _observe_batch_upload(self, _):
+        with self.hold_trait_notifications():
+            self.message_area.value = self.batch_upload.error_message
+            self.pseudo_text.value = ", ".join(
+                fname for fname, _ in self.batch_upload.pseudos
+            )
+
+            self._update_state()
+
+    def _observe_batch_mode(self, change):
+        upload = self.batch_upload if change["new"] else self.pseudo_upload
+        self.upload_box.children = [upload]
+        self.pseudo_text.value = ""
+        self.message_area.value = ""
+
+    @traitlets.observe("confirmed_pseudo", "confirmed_pseudos")
     def _observe_confirmed_pseudo(self, _):
         with self.hold_trait_notifications():
             self._update_state()
 
     def can_reset(self):
-        return self.confirmed_pseudo is not None
+        return self.confirmed_pseudo is not None or bool(self.confirmed_pseudos)
 
     def confirm(self, _=None):
-        self.confirmed_pseudo = self.pseudo_upload.pseudo
+        with self.hold_trait_notifications():
+            if self.batch_mode.value:
+                self.confirmed_pseudo = None
+                self.confirmed_pseudos = self.batch_upload.pseudos
+            else:
+                self.confirmed_pseudo = self.pseudo_upload.pseudo
+                self.confirmed_pseudos = []
 
         self._update_state()
 
     def reset(self):  # unconfirm
         self.confirmed_pseudo = None
+        self.confirmed_pseudos = []
 
         self._update_state()
 
@@ -521,43 +684,29 @@ class MetadataSettings(ipw.VBox):
         self.output_metadata["tool"] = self.gen_tool.value
         self.output_metadata["version"] = self.version.value
 
+    def metadata_of(self, filename, pseudo) -> dict:
+        """The metadata of a pseudo, the family, tool and version set in the
+        widget are used if the filename is not a standard label."""
+        return pseudo_metadata(
+            filename,
+            pseudo,
+            family=self.family.value,
+            tool=self.gen_tool.value,
+            version=self.version.value,
+        )
+
     @traitlets.observe("pseudo")
     def _observe_pseudo(self, _):
-        from pseudo_parser.upf_parser import parse
-
-        from aiidalab_sssp.inspect import parse_label
-
-        try:
-            # when upload a standard named input
-            label = ".".join(self.pseudo[0].split(".")[:-1])
-            label_dict = parse_label(label)
-        except IndexError:
-            # tuple index out of range. Pseudo not upload yet.
+        if not self.pseudo:
+            # Pseudo not upload yet.
             self.output_metadata = {}
-        except Exception:
-            # when upload a non-standard named input upf
-            pseudo_info = parse(self.pseudo[1].get_content())
-
-            self.output_metadata = {
-                "element": pseudo_info["element"],
-                "type": pseudo_info["pp_type"],
-                "z_valence": pseudo_info["z_valence"],
-                "family": self.family.value,
-                "tool": self.gen_tool.value,
-                "version": self.version.value,
-            }
-        else:
-            self.output_metadata = {
-                "element": label_dict["element"],
-                "type": label_dict["type"],
-                "z_valence": label_dict["z"],
-                "family": label_dict["family"],
-                "tool": label_dict["tool"],
-                "version": label_dict["version"],
-            }
-            self.family.value = label_dict["family"]
-            self.gen_tool.value = label_dict["tool"]
-            self.version.value = label_dict["version"]
+            return
+
+        metadata = self.metadata_of(self.pseudo[0], self.pseudo[1])
+        self.output_metadata = metadata
+        self.family.value = metadata["family"]
+        self.gen_tool.value = metadata["tool"]
+        self.version.value = metadata["version"]
 
 
 class SettingPseudoMetadataStep(ipw.VBox, WizardAppWidgetStep):
@@ -568,6 +717,10 @@ class SettingPseudoMetadataStep(ipw.VBox, WizardAppWidgetStep):
     confirmed = traitlets.Bool()
     output_label = traitlets.Unicode()
 
+    # batch mode: list of (filename, UpfData) and their labels
+    pseudos = traitlets.List()
+    output_labels = traitlets.List()
+
     metadata_help = ipw.HTML(
         """<div style="line-height:120%; padding-top:10px;">
         <p>There is no general rule of thumb on how to name the extra metadata. </p>
@@ -590,6 +743,15 @@ class SettingPseudoMetadataStep(ipw.VBox, WizardAppWidgetStep):
 
         self.metadata_settings = MetadataSettings()
         self.metadata_settings.observe(self._on_metadata_settings_change)
+        for tag in (
+            self.metadata_settings.family,
+            self.metadata_settings.gen_tool,
+            self.metadata_settings.version,
+        ):
+            tag.observe(self._on_tag_change, "value")
+
+        # metadata of the batch pseudos, the same order as pseudos
+        self._batch_metadata = []
 
         self._submission_blocker_messages = ipw.HTML()
 
@@ -622,32 +784,76 @@ class SettingPseudoMetadataStep(ipw.VBox, WizardAppWidgetStep):
         self.metadata_settings.pseudo = self.pseudo
         self._update_title()
 
+    @traitlets.observe("pseudos")
+    def _on_pseudos_change(self, _):
+        self._update_batch_metadata()
+        self._update_title()
+
     def _on_metadata_settings_change(self, _):
         # FIXME: not triggered.???
         self._update_title()
 
+    def _on_tag_change(self, _):
+        if self.pseudos:
+            self._update_batch_metadata()
+            self._update_title()
+
+    def _update_batch_metadata(self):
+        """Derive the metadata of every batch pseudo, a pseudo can not be parsed
+        is kept as None"""
+        batch_metadata = []
+        for fname, pseudo in self.pseudos:
+            try:
+                metadata = self.metadata_settings.metadata_of(fname, pseudo)
+            except Exception:
+                metadata = None
+            batch_metadata.append(metadata)
+
+        self._batch_metadata = batch_metadata
+
     def _update_title(self):
-        label = self._get_label_from_metadata()
-        self.title.value = f"<p>The standard label of psedopotential is: {label}</p>"
+        if not self.pseudos:
+            label = self._get_label_from_metadata()
+            self.title.value = (
+                f"<p>The standard label of psedopotential is: {label}</p>"
+            )
+            return
 
-    def _get_label_from_metadata(self):
-        metadata = self.metadata_settings.output_metadata
+        rows = "".join(
+            f"<tr><td>{html.escape(fname)}</td><td>{html.escape(label)}</td></tr>"
+            for (fname, _), label in zip(self.pseudos, self._batch_labels())
+        )
+        self.title.value = f"""<p>The standard labels of the pseudopotentials are:</p>
+            <table><tr><th>File</th><th>Label</th></tr>{rows}</table>"""
+
+    def _get_label_from_metadata(self, metadata=None):
+        if metadata is None:
+            metadata = self.metadata_settings.output_metadata
 
         try:
-            element = metadata["element"]
-            psp_type = metadata["type"]
-            z_valence = metadata["z_valence"]
-            family = metadata["family"]
-            tool = metadata["tool"]
-            version = metadata["version"]
-
-            output_label = f"{element}.{psp_type}.{z_valence}.{tool}.{family}.{version}"
+            output_label = metadata_label(metadata)
         except KeyError:
             # the metadata not set
             output_label = "Not set."
 
         return output_label
 
+    def _batch_labels(self):
+        return [
+            self._get_label_from_metadata(metadata) if metadata else "Not parsable."
+            for metadata in self._batch_metadata
+        ]
+
+    def _batch_blockers(self):
+        """The pseudos of the batch that can not be labelled"""
+        for (fname, _), metadata in zip(self.pseudos, self._batch_metadata):
+            if metadata is None:
+                yield f"{fname} can not be parsed."
+            else:
+                for key in ["family", "tool", "version"]:
+                    if not metadata[key]:
+                        yield f"{key} is not set for labelling {fname}."
+
     def _update_state(self, _=None):
         if self.previous_step_state == self.State.SUCCESS:
             self.confirm_button.disabled = False
@@ -661,6 +867,10 @@ class SettingPseudoMetadataStep(ipw.VBox, WizardAppWidgetStep):
         self._update_state()
 
     def confirm(self, _):
+        if self.pseudos:
+            self._confirm_batch()
+            return
+
         for key in ["element", "type", "family", "z_valence", "tool", "version"]:
             if key not in self.metadata_settings.output_metadata:
                 self.state = self.State.READY
@@ -673,6 +883,19 @@ class SettingPseudoMetadataStep(ipw.VBox, WizardAppWidgetStep):
             self.confirm_button.disabled = True
             self.state = self.State.SUCCESS
 
+    def _confirm_batch(self):
+        blockers = list(self._batch_blockers())
+        if blockers:
+            self.state = self.State.READY
+            fmt_list = "".join(f"<li>{html.escape(item)}</li>" for item in blockers)
+            self._submission_blocker_messages.value = f"""
+                <div class="alert alert-info"><ul>{fmt_list}</ul></div>"""
+        else:
+            self._submission_blocker_messages.value = ""
+            self.output_labels = self._batch_labels()
+            self.confirm_button.disabled = True
+            self.state = self.State.SUCCESS
+
     @traitlets.default("state")
     def _default_state(self):
         return self.State.INIT
@@ -741,19 +964,47 @@ class ParallelizationSettings(ipw.VBox):
             "layout": {"min_width": "180px"},
         }
         self.npools = ipw.BoundedIntText(
-            value=1, step=1, min=1, max=128, description="Number of k-pools", **extra
+            value=1,
+            step=1,
+            min=1,
+            max=128,
+            description="Number of k-pools",
+            disabled=True,
+            **extra,
         )
+        self.override = ipw.Checkbox(
+            value=False,
+            description="Override",
+            tooltip="Set the number of k-pools instead of deriving it from the "
+            "resources and the k-points of the structures.",
+            indent=False,
+        )
+        self.override.observe(self._on_override_change, "value")
         super().__init__(
             children=[
                 self.title,
                 ipw.HBox(
-                    children=[self.prompt, self.npools],
+                    children=[
+                        self.prompt,
+                        ipw.HBox(children=[self.npools, self.override]),
+                    ],
                     layout=ipw.Layout(justify_content="space-between"),
                 ),
             ]
         )
 
+    def _on_override_change(self, change):
+        self.npools.disabled = not change["new"]
+
+    def set_auto_npools(self, num_mpiprocs, num_kpoints=None):
+        """Set the number of k-pools for the resources, unless overridden"""
+        if not self.override.value:
+            self.npools.value = min(
+                auto_npool(num_mpiprocs, num_kpoints), self.npools.max
+            )
+
     def reset(self):
+        self.override.value = False
         self.npools.value = 1
 
 
@@ -766,6 +1017,10 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
     pseudo_label = traitlets.Unicode()
     workchain_settings = traitlets.Instance(WorkChainSettings, allow_none=True)
 
+    # batch mode: list of (filename, UpfData) and their labels
+    pseudos = traitlets.List()
+    pseudo_labels = traitlets.List()
+
     _submission_blockers = traitlets.List(traitlets.Unicode)
 
     # Since for production it is now the only protocol
@@ -803,6 +1058,13 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
 
         self.resources_config = ResourceSelectionWidget()
         self.parallelization = ParallelizationSettings()
+        self.resources_config.num_nodes.observe(self._update_parallelization, "value")
+        self.resources_config.num_cpus.observe(self._update_parallelization, "value")
+        self.parallelization.override.observe(self._update_parallelization, "value")
+
+        self.runtime_estimate = RuntimeEstimateWidget(on_apply=self._apply_num_nodes)
+        self.resources_config.num_nodes.observe(self._update_runtime_estimate, "value")
+        self.resources_config.num_cpus.observe(self._update_runtime_estimate, "value")
 
         self.submit_button = ipw.Button(
             description="Submit",
@@ -814,6 +1076,36 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
         )
 
         self.submit_button.on_click(self._on_submit_button_clicked)
+        self.submission_report = ipw.HTML()
+
+        self.duplicates_message = ipw.HTML()
+        self.reuse_button = ipw.Button(
+            description="Reuse finished results",
+            tooltip="Reuse the finished verifications and run only the missing properties.",
+            button_style="success",
+            layout=ipw.Layout(width="auto"),
+        )
+        self.resubmit_button = ipw.Button(
+            description="Submit anyway",
+            tooltip="Verify all properties again.",
+            button_style="warning",
+            layout=ipw.Layout(width="auto"),
+        )
+        self.reuse_button.on_click(self._on_duplicates_choice)
+        self.resubmit_button.on_click(self._on_duplicates_choice)
+        self.duplicates_box = ipw.VBox(
+            children=[
+                self.duplicates_message,
+                ipw.HBox(children=[self.reuse_button, self.resubmit_button]),
+            ],
+            layout=ipw.Layout(display="none"),
+        )
+        self._duplicates = {}
+        # the queue entries of the submission waiting for the computer
+        self._waiting_entries = []
+        self.submission_queue = SubmissionQueueWidget(
+            on_processed=self._on_queue_processed
+        )
 
         # After all self variable set
         self.set_resource_defaults()
@@ -826,8 +1118,12 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
                 self.ph_code,
                 self.resources_config,
                 self.parallelization,
+                self.runtime_estimate,
                 self._submission_blocker_messages,
                 self.submit_button,
+                self.duplicates_box,
+                self.submission_report,
+                self.submission_queue,
             ],
             **kwargs,
         )
@@ -849,23 +1145,48 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
             self.set_resource_defaults(change["new"].computer)
 
     def set_resource_defaults(self, computer=None):
+        self.submission_queue.computer = None if computer is None else computer.label
 
         if computer is None or computer.hostname == "localhost":
             self.resources_config.num_nodes.disabled = True
             self.resources_config.num_nodes.value = 1
             self.resources_config.num_cpus.max = os.cpu_count()
-            self.resources_config.num_cpus.value = 1
+            self.resources_config.num_cpus.value = (
+                1
+                if computer is None
+                else computer.get_default_mpiprocs_per_machine() or os.cpu_count()
+            )
             self.resources_config.num_cpus.description = "CPUs"
-            self.parallelization.npools.value = 1
         else:
             default_mpiprocs = computer.get_default_mpiprocs_per_machine()
             self.resources_config.num_nodes.disabled = False
             self.resources_config.num_cpus.max = default_mpiprocs
             self.resources_config.num_cpus.value = default_mpiprocs
             self.resources_config.num_cpus.description = "CPUs/node"
-            # self.parallelization.npools.value = self._get_default_parallelization()
 
-        # self._check_resources()
+        self._update_parallelization()
+
+    def _update_parallelization(self, _=None):
+        """Derive the k-pools from the MPI processes and the k-points of the
+        structures of the pseudos, the fewest if they are of many elements.
+        The k-points are of the protocol the convergence is submitted with."""
+        self.parallelization.set_auto_npools(
+            self.resources_config.num_nodes.value
+            * self.resources_config.num_cpus.value,
+            min_num_kpoints(
+                (pseudo.element for pseudo in self._selected_pseudos()),
+                protocol=self._PROTOCOL,
+            ),
+        )
+
+    def _selected_pseudos(self) -> list:
+        """The UpfData of the pseudos to verify, of the batch or the single one"""
+        if self.pseudos:
+            return [pseudo for _, pseudo in self.pseudos]
+        if self.pseudo:
+            return [self.pseudo[1]]
+
+        return []
 
     @traitlets.observe("_submission_blockers")
     def _observe_submission_blockers(self, change):
@@ -897,74 +1218,267 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
                 except NotExistent:
                     pass
 
-    def submit(self):
-        """Run the workflow to calculate delta factor"""
-        from aiida.engine import submit
+    def _get_settings(self) -> dict:
+        """The json settings of the verifications, shared by all pseudos"""
+        return {
+            "accuracy": {
+                "protocol": self._PROTOCOL,
+                "cutoff_control": self.workchain_settings.calc_type.value,
+            },
+            "convergence": {
+                "protocol": self._PROTOCOL,
+                "cutoff_control": self.workchain_settings.calc_type.value,
+                "criteria": self.workchain_settings.criteria.value,
+            },
+            "properties_list": list(self.workchain_settings.properties_list),
+            "options": {
+                "resources": {
+                    "num_machines": self.resources_config.num_nodes.value,
+                    "num_mpiprocs_per_machine": self.resources_config.num_cpus.value,
+                },
+            },
+            "parallelization": {"npool": self.parallelization.npools.value},
+            "clean_workchain": True,  # anyway clean all
+        }
 
-        builder = VerificationWorkChain.get_builder()
+    def _get_inputs(self, pseudo, label, properties_list=None) -> dict:
+        """The json inputs of the verification of the pseudo with the settings,
+        the pseudo is stored to be referenced by the submission queue."""
+        if not pseudo.is_stored:
+            pseudo.store()
+
+        inputs = {
+            "pseudo": pseudo.uuid,
+            "pw_code": self.pw_code.value.uuid,
+            "ph_code": self.ph_code.value.uuid,
+            "label": label,
+            **self._get_settings(),
+        }
+        if properties_list is not None:
+            inputs["properties_list"] = properties_list
 
-        builder.pseudo = self.pseudo[1]
-        builder.pw_code = self.pw_code.value
-        builder.ph_code = self.ph_code.value
-        builder.label = orm.Str(self.pseudo_label)
+        return inputs
 
-        builder.accuracy = {
-            "protocol": orm.Str(self._PROTOCOL),
-            "cutoff_control": orm.Str(self.workchain_settings.calc_type.value),
-        }
+    def _candidates(self) -> list:
+        """The (filename, label, pseudo) to verify, only one if not in batch mode"""
+        if self.pseudos:
+            return [
+                (fname, label, pseudo)
+                for (fname, pseudo), label in zip(self.pseudos, self.pseudo_labels)
+            ]
 
-        builder.convergence = {
-            "protocol": orm.Str(self._PROTOCOL),
-            "cutoff_control": orm.Str(self.workchain_settings.calc_type.value),
-            "criteria": orm.Str(self.workchain_settings.criteria.value),
-        }
+        return [(self.pseudo[0] or "", self.pseudo_label, self.pseudo[1])]
 
-        builder.properties_list = orm.List(list=self.workchain_settings.properties_list)
+    def find_duplicates(self) -> dict:
+        """The finished verifications of the pseudos with the same settings.
 
-        builder.options = orm.Dict(
-            dict={
-                "resources": {
-                    "num_machines": self.resources_config.num_nodes.value,
-                    "num_mpiprocs_per_machine": self.resources_config.num_cpus.value,
-                },
-            }
-        )
-        builder.parallelization = orm.Dict(
-            dict={"npool": self.parallelization.npools.value}
+        :return: dict of the label to (verifications, properties missing from them)
+            of the pseudos with at least one finished verification.
+        """
+        settings = self._get_settings()
+
+        duplicates = {}
+        for _, label, pseudo in self._candidates():
+            nodes = find_verifications(pseudo.md5, settings)
+            if nodes:
+                duplicates[label] = (
+                    nodes,
+                    missing_properties(nodes, settings["properties_list"]),
+                )
+
+        return duplicates
+
+    def submit(self, reuse=False) -> list:
+        """Queue one workflow per pseudo with the same settings, they are
+        submitted right away while the computer is under its limit of active
+        verifications.
+
+        A failed pseudo does not stop the batch, the report is a list of
+        (filename, label, queue entry) of every pseudo.
+
+        :param reuse: reuse the finished verifications with the same settings
+            found by `find_duplicates`, only the missing properties are run.
+        """
+        duplicates = self._duplicates if reuse else {}
+
+        queued = []
+        report = []
+        for fname, label, pseudo in self._candidates():
+            nodes, missing = duplicates.get(label, (None, None))
+            if nodes and not missing:
+                report.append(
+                    (
+                        fname,
+                        label,
+                        {"state": REUSED, "process": nodes[0].uuid, "error": ""},
+                    )
+                )
+                continue
+
+            try:
+                queued.append((fname, label, self._get_inputs(pseudo, label, missing)))
+            except Exception as exc:
+                report.append(
+                    (
+                        fname,
+                        label,
+                        {"state": FAILED, "process": None, "error": str(exc)},
+                    )
+                )
+
+        entry_ids = self.submission_queue.enqueue(
+            [inputs for _, _, inputs in queued], self.pw_code.value.computer.label
         )
-        builder.clean_workchain = orm.Bool(True)  # anyway clean all
+        entries = self._queue_entries()
+        report = [
+            (fname, label, entries[entry_id])
+            for (fname, label, _), entry_id in zip(queued, entry_ids)
+        ] + report
+
+        self.submission_report.value = self._format_report(report)
+
+        # the status step follows the first process of the batch, if none is
+        # submitted yet it follows the first one the queue submits
+        processes = [entry["process"] for _, _, entry in report if entry["process"]]
+        if processes:
+            self.value = processes[0]
+        else:
+            self._waiting_entries = [
+                entry["id"] for _, _, entry in report if entry["state"] == QUEUED
+            ]
 
-        # print("properties_list:", builder.properties_list.get_list())
-        # print("protocol:", builder.accuracy.protocol.value)
-        # print("criteria:", builder.convergence.criteria.value)
-        # print("cutoff_control:", builder.accuracy.cutoff_control.value)
-        # print("options:", builder.options.get_dict())
-        # print("parallelization:", builder.parallelization.get_dict())
-        # print("clean_workdir_level:", builder.clean_workchain.value)
-        # print("label:", builder.label.value)
+        return report
 
-        process = submit(builder)
-        process.description = self.pseudo_label
+    def _update_submitted_state(self):
+        """Succeed once a process is submitted, stay active while the
+        verifications wait in the queue and fail if none of them is submitted"""
+        if self.value is not None:
+            self.state = self.State.SUCCESS
+        elif self._waiting_entries:
+            self.state = self.State.ACTIVE
+        else:
+            self.state = self.State.FAIL
 
-        self.value = process.uuid
+    def _on_queue_processed(self):
+        if not self._waiting_entries:
+            return
+
+        entries = self._queue_entries()
+        waiting = [
+            entries[entry_id]
+            for entry_id in self._waiting_entries
+            if entry_id in entries and entries[entry_id]["state"] != FAILED
+        ]
+        processes = [entry["process"] for entry in waiting if entry["process"]]
+        if processes:
+            self.value = processes[0]
+        if processes or not waiting:
+            self._waiting_entries = []
+            self._update_submitted_state()
+
+    def _queue_entries(self) -> dict:
+        return {entry["id"]: entry for entry in self.submission_queue.queue.entries()}
+
+    @staticmethod
+    def _format_report(report) -> str:
+        rows = "".join(
+            f"""<tr><td>{html.escape(fname)}</td><td>{html.escape(label)}</td>
+            <td>{entry["state"]}</td><td>{html.escape(entry["error"])}</td></tr>"""
+            for fname, label, entry in report
+        )
+        n_submitted = sum(
+            1 for _, _, entry in report if entry["process"] and entry["state"] != REUSED
+        )
+        n_queued = sum(1 for _, _, entry in report if entry["state"] == QUEUED)
+        n_reused = sum(1 for _, _, entry in report if entry["state"] == REUSED)
+        return f"""<p>{n_submitted} of {len(report)} verifications submitted,
+            {n_queued} queued until the computer has capacity, {n_reused} reused.</p>
+            <table><tr><th>File</th><th>Label</th><th>State</th><th>Error</th></tr>
+            {rows}</table>"""
 
     def _on_submit_button_clicked(self, _):
         self.submit_button.disabled = True
-        self.submit()
 
-        self.state = self.State.SUCCESS
+        self._duplicates = self.find_duplicates()
+        if self._duplicates:
+            # let the user choose to reuse them or to submit anyway
+            self._show_duplicates()
+            return
 
-    @traitlets.observe("pseudo")
+        self.submit()
+        self._update_submitted_state()
+
+    def _show_duplicates(self):
+        rows = "".join(
+            f"""<tr><td>{html.escape(label)}</td>
+            <td>{", ".join(str(node.pk) for node in nodes)}</td>
+            <td>{", ".join(missing) if missing else "none"}</td></tr>"""
+            for label, (nodes, missing) in self._duplicates.items()
+        )
+        self.duplicates_message.value = f"""<div class="alert alert-warning">
+            <p>Finished verifications with the same pseudopotential and settings
+            exist. Reuse them and run only the missing properties, or submit
+            all properties anyway.</p>
+            <table><tr><th>Label</th><th>PK</th><th>Missing properties</th></tr>
+            {rows}</table></div>"""
+        self.duplicates_box.layout.display = "flex"
+
+    def _on_duplicates_choice(self, button):
+        self.duplicates_box.layout.display = "none"
+        self.submit(reuse=button is self.reuse_button)
+        self._update_submitted_state()
+
+    @traitlets.observe("pseudo", "pseudos", "pseudo_labels")
     def _observe_pseudo(self, change):
         self._update_state()
+        if change["name"] != "pseudo_labels":
+            self._update_parallelization()
+            self._update_runtime_estimate()
+
+    @traitlets.observe("workchain_settings")
+    def _observe_workchain_settings(self, change):
+        if change["old"] is not None:
+            change["old"].unobserve(self._update_runtime_estimate, "properties_list")
+            change["old"].calc_type.unobserve(self._update_runtime_estimate, "value")
+        if change["new"] is not None:
+            change["new"].observe(self._update_runtime_estimate, "properties_list")
+            change["new"].calc_type.observe(self._update_runtime_estimate, "value")
+
+        self._update_runtime_estimate()
+
+    def _update_runtime_estimate(self, _=None):
+        if self.workchain_settings is None:
+            self.runtime_estimate.estimate([], None, [], 1, 1)
+            return
+
+        self.runtime_estimate.estimate(
+            [
+                {"element": pseudo.element, "pp_type": pseudo_header(pseudo)["pp_type"]}
+                for pseudo in self._selected_pseudos()
+            ],
+            cutoff_control=self.workchain_settings.calc_type.value,
+            properties=self.workchain_settings.properties_list,
+            num_machines=self.resources_config.num_nodes.value,
+            mpiprocs_per_machine=self.resources_config.num_cpus.value,
+        )
+
+    def _apply_num_nodes(self, num_nodes):
+        if not self.resources_config.num_nodes.disabled:
+            self.resources_config.num_nodes.value = min(
+                num_nodes, self.resources_config.num_nodes.max
+            )
 
     def _update_state(self, _=None):
+        # The submission is waiting in the queue.
+        if self._waiting_entries:
+            return
+
         # Process is already running.
         if self.value is not None:
             self.state = self.State.SUCCESS
 
         # Input structure not specified.
-        if not self.pseudo:
+        if not self.pseudo and not self.pseudos:
             self._submission_blockers = ["No pseudo selected."]
             # This blocker is handled differently than the other blockers,
             # because it is displayed as INIT state.
@@ -980,9 +1494,12 @@ class SubmitSsspWorkChainStep(ipw.VBox, WizardAppWidgetStep):
 
     def _identify_submission_blockers(self):
         # No input pseudo specified.
-        if self.pseudo is None:
+        if self.pseudo is None and not self.pseudos:
             yield "No pseudo selected."
 
+        if self.pseudos and len(self.pseudo_labels) != len(self.pseudos):
+            yield "The pseudos of the batch are not labelled."
+
         # No code selected (this is ignored while the setup process is running).
         if self.pw_code.value is None:
             yield (
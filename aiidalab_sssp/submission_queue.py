@@ -0,0 +1,380 @@
+"""Module contains the local submission queue of the verifications.
+Every verification work chain fans out into many pw.x/ph.x calculations, so the
+verifications are not submitted straight to the daemon. They are queued in a json
+file and submitted in order, while the number of active verifications on each
+computer is under its limit.
+
+The queue is processed periodically as long as there are queued or active
+verifications, either by the widget on the event loop of the kernel of the app,
+which resumes the queue left by a previous session when it is opened, or without
+any kernel by the runner of this module, the supported mode for long batches:
+
+    python -m aiidalab_sssp.submission_queue
+
+which runs until the queue is empty, or with `--once` to process it a single
+time, e.g. from a cron job. The file lock serialises the runner and the kernels
+processing the same queue."""
+import argparse
+import asyncio
+import html
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from threading import Lock
+
+import ipywidgets as ipw
+import traitlets
+from aiida import orm
+from aiida.common import NotExistent
+from aiida.orm import load_node
+from aiida.plugins import WorkflowFactory
+from filelock import FileLock
+
+from aiidalab_sssp.duplicates import SETTINGS_HASH_EXTRA, settings_hash
+
+VerificationWorkChain = WorkflowFactory("sssp_workflow.verification")
+
+FN_QUEUE = Path.home().joinpath(".aiidalab-sssp-submission-queue.json")
+
+# The maximum number of active verifications on a computer without a limit set
+DEFAULT_MAX_ACTIVE = 4
+
+# The seconds between two processings of the queue
+PROCESS_INTERVAL = 30
+
+# The states of a queue entry
+QUEUED = "queued"
+ACTIVE = "active"
+FINISHED = "finished"
+FAILED = "failed"
+
+# serialise the read-modify-write of the queue file of this kernel, the file lock
+# serialise it between the kernels
+_QUEUE_LOCK = Lock()
+
+
+def get_builder(inputs):
+    """Return the builder of the verification from the json inputs of an entry"""
+    builder = VerificationWorkChain.get_builder()
+
+    builder.pseudo = load_node(inputs["pseudo"])
+    builder.pw_code = load_node(inputs["pw_code"])
+    builder.ph_code = load_node(inputs["ph_code"])
+    builder.label = orm.Str(inputs["label"])
+
+    builder.accuracy = {
+        key: orm.Str(value) for key, value in inputs["accuracy"].items()
+    }
+    builder.convergence = {
+        key: orm.Str(value) for key, value in inputs["convergence"].items()
+    }
+
+    builder.properties_list = orm.List(list=inputs["properties_list"])
+    builder.options = orm.Dict(dict=inputs["options"])
+    builder.parallelization = orm.Dict(dict=inputs["parallelization"])
+    builder.clean_workchain = orm.Bool(inputs["clean_workchain"])
+
+    return builder
+
+
+def _is_terminated(process_uuid) -> bool:
+    try:
+        return load_node(process_uuid).is_terminated
+    except NotExistent:
+        # the process is deleted
+        return True
+
+
+class SubmissionQueue:
+    """The persistent queue of the verifications to submit.
+
+    :param path: the json file of the queue.
+    """
+
+    def __init__(self, path=FN_QUEUE):
+        self.path = Path(path)
+        self._file_lock = FileLock(f"{self.path}.lock")
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as fh:
+                return json.load(fh)
+        except FileNotFoundError:
+            return {"limits": {}, "entries": []}
+
+    def _dump(self, queue):
+        # write to a temporary file first, the file is never seen half written
+        with open(f"{self.path}.tmp", "w") as fh:
+            json.dump(queue, fh, indent=2)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def entries(self) -> list:
+        """The entries of the queue, in the submission order"""
+        return self._load()["entries"]
+
+    def pending(self) -> list:
+        """The queued and active entries"""
+        return [entry for entry in self.entries() if entry["state"] in (QUEUED, ACTIVE)]
+
+    def limit(self, computer) -> int:
+        """The maximum number of active verifications on the computer"""
+        return self._load()["limits"].get(computer, DEFAULT_MAX_ACTIVE)
+
+    def set_limit(self, computer, max_active):
+        with _QUEUE_LOCK, self._file_lock:
+            queue = self._load()
+            queue["limits"][computer] = max_active
+            self._dump(queue)
+
+    def enqueue(self, inputs_list, computer) -> list:
+        """Add verifications to the queue and return the ids of their entries.
+
+        :param inputs_list: the json inputs of the verifications, see `get_builder`.
+        :param computer: the label of the computer the verifications run on.
+        """
+        entries = [
+            {
+                "id": uuid.uuid4().hex,
+                "label": inputs["label"],
+                "computer": computer,
+                "inputs": inputs,
+                "state": QUEUED,
+                "process": None,
+                "error": "",
+            }
+            for inputs in inputs_list
+        ]
+        with _QUEUE_LOCK, self._file_lock:
+            queue = self._load()
+            queue["entries"].extend(entries)
+            self._dump(queue)
+
+        return [entry["id"] for entry in entries]
+
+    def process(self) -> list:
+        """Update the active entries and submit the queued ones while the computer
+        is under its limit. Return the entries submitted."""
+        from aiida.engine import submit
+
+        submitted = []
+        with _QUEUE_LOCK, self._file_lock:
+            queue = self._load()
+
+            active = {}
+            for entry in queue["entries"]:
+                if entry["state"] == ACTIVE:
+                    if _is_terminated(entry["process"]):
+                        entry["state"] = FINISHED
+                    else:
+                        active[entry["computer"]] = active.get(entry["computer"], 0) + 1
+
+            for entry in queue["entries"]:
+                if entry["state"] != QUEUED:
+                    continue
+
+                computer = entry["computer"]
+                limit = queue["limits"].get(computer, DEFAULT_MAX_ACTIVE)
+                if active.get(computer, 0) >= limit:
+                    continue
+
+                try:
+                    process = submit(get_builder(entry["inputs"]))
+                    process.description = entry["label"]
+                    process.base.extras.set(
+                        SETTINGS_HASH_EXTRA, settings_hash(entry["inputs"])
+                    )
+                except Exception as exc:
+                    entry["state"] = FAILED
+                    entry["error"] = str(exc)
+                else:
+                    entry["state"] = ACTIVE
+                    entry["process"] = process.uuid
+                    active[computer] = active.get(computer, 0) + 1
+                    submitted.append(entry)
+
+            self._dump(queue)
+
+        return submitted
+
+    def clear_done(self):
+        """Remove the finished and failed entries"""
+        with _QUEUE_LOCK, self._file_lock:
+            queue = self._load()
+            queue["entries"] = [
+                entry
+                for entry in queue["entries"]
+                if entry["state"] in (QUEUED, ACTIVE)
+            ]
+            self._dump(queue)
+
+
+class SubmissionQueueWidget(ipw.VBox):
+    """The limit of active verifications of the computer and the status of the
+    submission queue.
+
+    The queue is processed on enqueue, by the process button, and when the widget
+    is created in a running event loop with the entries left by a previous session,
+    afterwards periodically on the event loop of the kernel until it is empty.
+
+    :param on_processed: called without arguments after every processing.
+    """
+
+    computer = traitlets.Unicode(allow_none=True)
+
+    def __init__(
+        self, queue=None, on_processed=None, interval=PROCESS_INTERVAL, **kwargs
+    ):
+        self.queue = queue or SubmissionQueue()
+        self.on_processed = on_processed
+        self.interval = interval
+        self._handle = None
+
+        self.max_active = ipw.BoundedIntText(
+            value=DEFAULT_MAX_ACTIVE,
+            min=1,
+            max=1000,
+            description="Max. active verifications on the computer:",
+            style={"description_width": "initial"},
+        )
+        self.max_active.observe(self._on_max_active_change, "value")
+
+        self.clear_button = ipw.Button(
+            description="Clear done",
+            tooltip="Remove the finished and failed verifications from the queue.",
+        )
+        self.clear_button.on_click(self._on_clear)
+
+        self.process_button = ipw.Button(
+            description="Process queue",
+            tooltip="Submit the queued verifications while the computers have "
+            "capacity, e.g. the ones left by a previous session.",
+        )
+        self.process_button.on_click(lambda _: self.process())
+
+        self.status = ipw.HTML()
+
+        super().__init__(
+            children=[
+                ipw.HBox(
+                    children=[self.max_active, self.process_button, self.clear_button]
+                ),
+                self.status,
+            ],
+            **kwargs,
+        )
+
+        self.update_status()
+
+        # resume the queue left by a previous session, once the widget is built
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and self.queue.pending():
+            self._handle = loop.call_soon(self.process)
+
+    @traitlets.observe("computer")
+    def _observe_computer(self, change):
+        if change["new"] is not None:
+            self.max_active.value = self.queue.limit(change["new"])
+
+    def _on_max_active_change(self, change):
+        if self.computer is not None:
+            self.queue.set_limit(self.computer, change["new"])
+
+    def _on_clear(self, _):
+        self.queue.clear_done()
+        self.update_status()
+
+    def enqueue(self, inputs_list, computer) -> list:
+        """Queue the verifications, submit them right away while the computer
+        has capacity and keep processing the queue."""
+        entry_ids = self.queue.enqueue(inputs_list, computer)
+        self.process()
+
+        return entry_ids
+
+    def process(self):
+        """Process the queue now and again every `interval` seconds on the event
+        loop of the kernel, as long as there are queued or active entries.
+        Without a running event loop it is processed once."""
+        self.stop()
+        self.queue.process()
+        self.update_status()
+        if self.on_processed is not None:
+            self.on_processed()
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        if self.queue.pending():
+            self._handle = loop.call_later(self.interval, self.process)
+
+    def stop(self):
+        """Stop the periodic processing of the queue"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def update_status(self):
+        entries = self.queue.entries()
+        if not entries:
+            self.status.value = "<p>The submission queue is empty.</p>"
+            return
+
+        counts = {
+            state: sum(1 for entry in entries if entry["state"] == state)
+            for state in (QUEUED, ACTIVE, FINISHED, FAILED)
+        }
+        rows = "".join(
+            f"""<tr><td>{html.escape(entry["label"])}</td>
+            <td>{html.escape(entry["computer"])}</td><td>{entry["state"]}</td>
+            <td>{html.escape(entry["error"])}</td></tr>"""
+            for entry in entries
+            if entry["state"] != FINISHED
+        )
+        self.status.value = f"""<p>Submission queue: {counts[QUEUED]} queued,
+            {counts[ACTIVE]} active, {counts[FINISHED]} finished,
+            {counts[FAILED]} failed.</p>
+            <table><tr><th>Label</th><th>Computer</th><th>State</th><th>Error</th></tr>
+            {rows}</table>"""
+
+
+def run(queue=None, interval=PROCESS_INTERVAL, once=False):
+    """Process the queue every `interval` seconds until there is no queued or
+    active entry left, without a kernel of the app.
+
+    :param once: process the queue a single time, e.g. when called by cron.
+    """
+    queue = queue or SubmissionQueue()
+    while True:
+        for entry in queue.process():
+            print(f"Submitted {entry['label']}: {entry['process']}")
+        if once or not queue.pending():
+            break
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    from aiida import load_profile
+
+    parser = argparse.ArgumentParser(
+        description="Submit the queued verifications while the computers have capacity."
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=PROCESS_INTERVAL,
+        help="seconds between two processings of the queue",
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="process the queue a single time"
+    )
+    args = parser.parse_args()
+
+    load_profile()
+    run(interval=args.interval, once=args.once)
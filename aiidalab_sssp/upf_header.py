@@ -0,0 +1,104 @@
+"""Module contains the header-only parsing of the UPF files. The file is streamed
+line by line and only the `PP_HEADER` is parsed, the mesh and the projectors are
+never read. The headers are cached by the md5 of the file, so a pseudo uploaded
+again or labelled again is not read at all."""
+import hashlib
+import io
+from collections import OrderedDict
+from threading import Lock
+
+# The number of headers cached
+_CACHE_SIZE = 1024
+
+_HEADER_CACHE = OrderedDict()
+_CACHE_LOCK = Lock()
+
+
+def _header_lines(stream):
+    """Yield the lines of the `PP_HEADER` of the text stream, the v1 block or the
+    v2 tag. The tag ends at its first `>` outside of the quoted attribute values,
+    if it is not self-closing the header ends at `</PP_HEADER>`."""
+    in_header = in_tag = False
+    quote = previous = None
+    for line in stream:
+        if not in_header:
+            start = line.find("<PP_HEADER")
+            if start < 0:
+                continue
+            in_header = in_tag = True
+            line = line[start:]
+
+        if in_tag:
+            for pos, char in enumerate(line):
+                if quote is not None:
+                    if char == quote:
+                        quote = None
+                elif char in "\"'":
+                    quote = char
+                elif char == ">":
+                    if previous == "/":
+                        yield line[: pos + 1]
+                        return
+                    in_tag = False
+                    break
+                previous = char
+
+        yield line
+        if not in_tag and "</PP_HEADER>" in line:
+            return
+
+
+def parse_header(stream) -> dict:
+    """Parse the element, pp_type and z_valence from the `PP_HEADER` of a UPF file.
+
+    :param stream: a binary or text filelike object, read up to the end of the header.
+    :raises ValueError: if the header is missing or incomplete.
+    """
+    from pseudo_parser.upf_parser import (
+        parse_element,
+        parse_pseudo_type,
+        parse_z_valence,
+    )
+
+    if isinstance(stream.read(0), bytes):
+        stream = io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+
+    header = "".join(_header_lines(stream))
+    if not header:
+        raise ValueError("no PP_HEADER in the UPF content.")
+
+    return {
+        "element": parse_element(header),
+        "pp_type": parse_pseudo_type(header),
+        "z_valence": parse_z_valence(header),
+    }
+
+
+def _cached(md5, open_stream) -> dict:
+    with _CACHE_LOCK:
+        if md5 in _HEADER_CACHE:
+            _HEADER_CACHE.move_to_end(md5)
+            return _HEADER_CACHE[md5]
+
+    with open_stream() as stream:
+        header = parse_header(stream)
+
+    with _CACHE_LOCK:
+        _HEADER_CACHE[md5] = header
+        while len(_HEADER_CACHE) > _CACHE_SIZE:
+            _HEADER_CACHE.popitem(last=False)
+
+    return header
+
+
+def upf_header(content) -> dict:
+    """The header of the UPF content, str or bytes, cached by its md5"""
+    if isinstance(content, str):
+        content = content.encode()
+
+    return _cached(hashlib.md5(content).hexdigest(), lambda: io.BytesIO(content))
+
+
+def pseudo_header(pseudo) -> dict:
+    """The header of the `UpfData`, cached by its md5 without reading the file"""
+    return _cached(pseudo.md5, lambda: pseudo.open(mode="rb"))
@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def aiida_profile():
+    """A temporary AiiDA profile with an in-memory storage"""
+    from aiida import load_profile
+    from aiida.storage.sqlite_temp import SqliteTempBackend
+
+    return load_profile(
+        SqliteTempBackend.create_profile("tests", options={"runner.poll.interval": 0}),
+        allow_switch=True,
+    )
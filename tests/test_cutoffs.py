@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from aiidalab_sssp.inspect.cutoffs import CRITERIA_MEASURES, CutoffEngine
+from aiidalab_sssp.inspect.dataset import (
+    build_convergence_dataset,
+    pseudo_convergence_frames,
+)
+
+CRITERIA = ("efficiency", "precision")
+
+ECUTWFC = [200, 150, 120, 100, 90, 80, 70, 60, 50, 40, 30]
+ECUTRHO = [1600, 1200, 960, 800, 720, 640, 560, 480]
+
+# the measures of a property fall at different rates, so they converge at
+# different cutoffs under the same bounds
+_ERRORS = np.array([0.0, 0.01, 0.05, 0.1, 0.3, 0.6, 1.0, 1.5, 2.5, 4.0, 8.0, 16.0])
+_SCALES = {"absolute_diff": 1.0, "relative_diff": 0.3, "eta_c": 10.0}
+
+
+def _curves(cutoff_key, cutoffs, shift):
+    errors = _ERRORS[shift : shift + len(cutoffs)]
+    return {
+        cutoff_key: cutoffs,
+        **{measure: list(scale * errors) for measure, scale in _SCALES.items()},
+    }
+
+
+def _property_result(prop, criteria, shift):
+    """The convergence result of the property as stored by its work chain, the
+    cutoffs analysed by the work chain's measure and criteria"""
+    from aiida import orm
+    from aiida.plugins import WorkflowFactory
+    from aiida_sssp_workflow.utils import convergence_analysis, get_protocol
+
+    measure = WorkflowFactory(f"sssp_workflow.convergence.{prop}")._MEASURE_OUT_PROPERTY
+    wfc_test = _curves("ecutwfc", ECUTWFC, shift)
+    rho_test = _curves("ecutrho", ECUTRHO, shift)
+
+    def analyse(test, cutoff_key, name):
+        xy = orm.List(list=list(zip(test[cutoff_key], test[measure])))
+        property_criteria = orm.Dict(dict=get_protocol("criteria", name)[prop])
+        return convergence_analysis(xy, property_criteria)["cutoff"].value
+
+    return {
+        "output_parameters_wfc_test": wfc_test,
+        "output_parameters_rho_test": rho_test,
+        "output_parameters": {
+            "wavefunction_cutoff": analyse(wfc_test, "ecutwfc", criteria),
+            "chargedensity_cutoff": analyse(rho_test, "ecutrho", criteria),
+            "all_criteria_wavefunction_cutoff": {
+                name: analyse(wfc_test, "ecutwfc", name) for name in CRITERIA
+            },
+        },
+    }
+
+
+@pytest.mark.parametrize("criteria", CRITERIA)
+def test_recommend_reproduces_workflow_cutoffs(aiida_profile, criteria):
+    """The engine recommends the cutoffs the work chains stored, for every property"""
+    from aiida_sssp_workflow.utils import get_protocol
+
+    pseudos = {
+        f"Si.nc.z_4.tool.family.v{shift}": {
+            "convergence": {
+                prop: _property_result(prop, criteria, shift)
+                for prop in CRITERIA_MEASURES
+            }
+        }
+        for shift in (0, 1)
+    }
+    dataset = build_convergence_dataset(
+        pseudo_convergence_frames(label, out) for label, out in pseudos.items()
+    )
+
+    recommended = (
+        CutoffEngine(dataset)
+        .recommend({criteria: get_protocol("criteria", criteria)})
+        .set_index(["label", "property"])
+    )
+
+    assert len(recommended) == len(pseudos) * len(CRITERIA_MEASURES)
+    for (label, prop), row in recommended.iterrows():
+        assert row["wavefunction_cutoff"] == dataset.cutoff(label, prop)
+        assert row["chargedensity_cutoff"] == dataset.cutoff(
+            label, prop, "chargedensity_cutoff"
+        )
+
+
+def test_criteria_measures_of_workflow():
+    from aiida.plugins import WorkflowFactory
+
+    for prop, measure in CRITERIA_MEASURES.items():
+        workchain = WorkflowFactory(f"sssp_workflow.convergence.{prop}")
+        assert measure == workchain._MEASURE_OUT_PROPERTY
@@ -0,0 +1,82 @@
+import io
+import uuid
+
+import pytest
+
+from aiidalab_sssp.duplicates import (
+    SETTINGS_HASH_EXTRA,
+    find_verifications,
+    missing_properties,
+)
+
+SETTINGS = {
+    "accuracy": {"protocol": "acwf", "cutoff_control": "standard"},
+    "convergence": {
+        "protocol": "acwf",
+        "cutoff_control": "standard",
+        "criteria": "efficiency",
+    },
+    "properties_list": ["accuracy.delta", "convergence.pressure"],
+}
+
+
+@pytest.fixture
+def pseudo(aiida_profile):
+    from aiida.plugins import DataFactory
+
+    upf = (
+        b'<UPF version="2.0.1">\n<PP_HEADER element="Si" pseudo_type="NC" '
+        b'z_valence="4.0" />\n</UPF>\n'
+    )
+    # unique content, so every test has its own pseudo
+    upf += f"<!-- {uuid.uuid4()} -->\n".encode()
+    return DataFactory("pseudo.upf")(io.BytesIO(upf), filename="Si.upf").store()
+
+
+def _verification(pseudo, criteria="efficiency", exit_status=0, returns=()):
+    """A finished verification of the pseudo, its settings as input links"""
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    node = orm.WorkflowNode()
+    node.set_process_label("VerificationWorkChain")
+    node.set_process_state("finished")
+    node.set_exit_status(exit_status)
+    node.base.links.add_incoming(pseudo, LinkType.INPUT_WORK, "pseudo")
+    inputs = {
+        **SETTINGS,
+        "convergence": {**SETTINGS["convergence"], "criteria": criteria},
+    }
+    for namespace in ("accuracy", "convergence"):
+        for key, value in inputs[namespace].items():
+            node.base.links.add_incoming(
+                orm.Str(value).store(), LinkType.INPUT_WORK, f"{namespace}__{key}"
+            )
+    node.store()
+
+    for label in returns:
+        orm.Dict().store().base.links.add_incoming(node, LinkType.RETURN, label)
+
+    return node
+
+
+def test_find_verifications(pseudo):
+    older = _verification(pseudo, returns=["accuracy__delta__output_parameters"])
+    newer = _verification(pseudo)
+    _verification(pseudo, criteria="precision")
+    _verification(pseudo, exit_status=401)
+
+    nodes = find_verifications(pseudo.md5, SETTINGS)
+
+    assert [node.pk for node in nodes] == [newer.pk, older.pk]
+    assert missing_properties(nodes, SETTINGS["properties_list"]) == [
+        "convergence.pressure"
+    ]
+    # the lookup does not modify the nodes
+    assert all(SETTINGS_HASH_EXTRA not in node.base.extras.all for node in nodes)
+
+
+def test_find_verifications_other_pseudo(pseudo):
+    _verification(pseudo)
+
+    assert find_verifications("0" * 32, SETTINGS) == []
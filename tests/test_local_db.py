@@ -0,0 +1,43 @@
+from aiidalab_sssp.inspect.local_db import validate_results
+
+RESULT = {"accuracy": {"delta": {"SiO": {"output_parameters": {}, "eos": {}}}}}
+
+
+def test_validate_results_real_label():
+    """The labels of the verifications, with the `z_` prefix, are accepted"""
+    valid, errors = validate_results(
+        {
+            "N.us.z_5.ld1.theose.v0": RESULT,
+            "Si.nc.z_4.oncvpsp3.dojo.v0.4.1-std": RESULT,
+        }
+    )
+
+    assert errors == {}
+    assert set(valid) == {"N", "Si"}
+    assert list(valid["N"]) == ["N.us.z_5.ld1.theose.v0"]
+
+
+def test_validate_results_invalid_entries():
+    valid, errors = validate_results(
+        {
+            "N.us.z_5.ld1.theose.v0": RESULT,
+            "N.ultrasoft.z_5": RESULT,
+            "O.paw.z_6.ld1.psl.v1": {"accuracy": {"bands": {"bands": 1}}},
+            "O.paw.z_6.ld1.psl.v2": {},
+        }
+    )
+
+    assert list(valid) == ["N"]
+    assert set(errors) == {
+        "N.ultrasoft.z_5",
+        "O.paw.z_6.ld1.psl.v1",
+        "O.paw.z_6.ld1.psl.v2",
+    }
+    assert errors["O.paw.z_6.ld1.psl.v1"].startswith("accuracy/bands/bands:")
+
+
+def test_validate_results_not_a_dict():
+    assert validate_results([RESULT]) == (
+        {},
+        {"": "the json file is not a dict of pseudo label to result."},
+    )
@@ -0,0 +1,58 @@
+import pytest
+
+from aiidalab_sssp import parallelization
+from aiidalab_sssp.parallelization import (
+    auto_npool,
+    estimate_num_kpoints,
+    min_num_kpoints,
+)
+
+
+@pytest.mark.parametrize(
+    "num_mpiprocs, num_kpoints, npool",
+    [
+        (1, 100, 1),
+        (48, 1372, 48),
+        (48, 10, 8),
+        (48, 7, 6),
+        (7, 5, 1),
+        (64, None, 1),
+        (0, 10, 1),
+    ],
+)
+def test_auto_npool(num_mpiprocs, num_kpoints, npool):
+    assert auto_npool(num_mpiprocs, num_kpoints) == npool
+
+
+def test_estimate_num_kpoints(aiida_profile):
+    """Si diamond with the 0.15 1/Å k-points distance of the acwf protocol"""
+    assert estimate_num_kpoints("Si", "acwf") == 1372
+
+
+def test_estimate_num_kpoints_no_structure(aiida_profile):
+    with pytest.raises(KeyError):
+        estimate_num_kpoints("Xx", "acwf")
+
+
+def test_min_num_kpoints(aiida_profile):
+    assert min_num_kpoints(["Si", "Xx", "Si"], protocol="acwf") == 1372
+    assert min_num_kpoints(["Xx"], protocol="acwf") is None
+    assert min_num_kpoints([]) is None
+
+
+def test_min_num_kpoints_failure_warned_and_cached(monkeypatch):
+    calls = []
+
+    def estimate(element, protocol):
+        calls.append(element)
+        raise ModuleNotFoundError("No module named 'CifFile'")
+
+    parallelization._element_num_kpoints.cache_clear()
+    monkeypatch.setattr(parallelization, "estimate_num_kpoints", estimate)
+
+    with pytest.warns(UserWarning, match="CifFile"):
+        assert min_num_kpoints(["Al"], protocol="acwf") is None
+    assert min_num_kpoints(["Al"], protocol="acwf") is None
+    assert calls == ["Al"]
+
+    parallelization._element_num_kpoints.cache_clear()
@@ -0,0 +1,100 @@
+import pytest
+
+from aiidalab_sssp.runtime import predict_runtime, runtime_records, suggest_num_nodes
+
+
+def _workflow(process_label=None, caller=None, exit_status=0):
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    node = orm.WorkflowNode()
+    if process_label is not None:
+        node.set_process_label(process_label)
+    node.set_process_state("finished")
+    node.set_exit_status(exit_status)
+    if caller is not None:
+        node.base.links.add_incoming(caller, LinkType.CALL_WORK, "CALL")
+
+    return node.store()
+
+
+def _calcjob(caller, cores, hours):
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    node = orm.CalcJobNode()
+    node.set_option("resources", {"num_machines": 2, "num_mpiprocs_per_machine": cores})
+    node.base.attributes.set("last_job_info", {"wallclock_time_seconds": hours * 3600})
+    node.base.links.add_incoming(caller, LinkType.CALL_CALC, "CALL")
+
+    return node.store()
+
+
+def _verification(element, cutoff_control="standard", exit_status=0):
+    from aiida import orm
+    from aiida.common.links import LinkType
+
+    node = orm.WorkflowNode()
+    node.set_process_label("VerificationWorkChain")
+    node.set_process_state("finished")
+    node.set_exit_status(exit_status)
+    node.base.links.add_incoming(
+        orm.Str(cutoff_control).store(),
+        LinkType.INPUT_WORK,
+        "accuracy__cutoff_control",
+    )
+    node.store()
+    node.base.extras.set_many({"element": element, "pp_type": "nc"})
+
+    return node
+
+
+@pytest.fixture(scope="module")
+def records(aiida_profile):
+    # the calculations are called by the property or by its sub work chains
+    verification = _verification("Si")
+    pressure = _workflow("ConvergencePressureWorkChain", verification)
+    base = _workflow(caller=_workflow(caller=pressure))
+    _calcjob(base, cores=8, hours=1.0)
+    _calcjob(base, cores=8, hours=2.0)
+    _calcjob(pressure, cores=4, hours=0.5)
+
+    delta = _workflow("DeltaMeasureWorkChain", verification)
+    _calcjob(_workflow(caller=delta), cores=16, hours=1.0)
+
+    # the failed property and verification are not counted
+    _calcjob(_workflow("ConvergenceBandsWorkChain", verification, 401), 8, 10.0)
+    failed = _verification("Si", exit_status=401)
+    _calcjob(_workflow("ConvergencePressureWorkChain", failed), 8, 10.0)
+
+    # a calculation of another workflow
+    _calcjob(_workflow(), cores=8, hours=10.0)
+
+    return runtime_records()
+
+
+def test_runtime_records(records):
+    records = records.set_index("property")
+
+    assert sorted(records.index) == ["accuracy.delta", "convergence.pressure"]
+    assert set(records["element"]) == {"Si"}
+    assert set(records["cutoff_control"]) == {"standard"}
+    assert records.at["convergence.pressure", "num_mpiprocs"] == 16
+    assert records.at["convergence.pressure", "core_hours"] == pytest.approx(52.0)
+    assert records.at["accuracy.delta", "num_mpiprocs"] == 32
+    assert records.at["accuracy.delta", "core_hours"] == pytest.approx(32.0)
+
+
+def test_predict_runtime(records):
+    prediction = predict_runtime(
+        records,
+        {"element": "O", "pp_type": "nc"},
+        "standard",
+        ["convergence.pressure", "convergence.bands"],
+        32,
+    )
+
+    assert prediction.at["convergence.pressure", "core_hours"] == pytest.approx(52.0)
+    assert prediction.at["convergence.pressure", "matched_by"] == "nc, standard"
+    assert prediction.at["convergence.bands", "runs"] == 0
+    assert suggest_num_nodes(52.0, 16, 2.0) == 2
@@ -0,0 +1,192 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from aiidalab_sssp import submission_queue
+from aiidalab_sssp.submission_queue import (
+    ACTIVE,
+    DEFAULT_MAX_ACTIVE,
+    FAILED,
+    FINISHED,
+    QUEUED,
+    SubmissionQueue,
+    SubmissionQueueWidget,
+    run,
+)
+
+
+def _inputs(label):
+    return {
+        "label": label,
+        "accuracy": {"protocol": "acwf", "cutoff_control": "standard"},
+        "convergence": {
+            "protocol": "acwf",
+            "cutoff_control": "standard",
+            "criteria": "efficiency",
+        },
+    }
+
+
+@pytest.fixture
+def submitted(aiida_profile, monkeypatch):
+    """Submit the entries as work chain nodes in `process_state`, the processes
+    by label, the labels in `fail` can not be submitted"""
+    from aiida.orm import WorkflowNode
+
+    submitted = SimpleNamespace(processes={}, fail=[], process_state="running")
+
+    def submit(inputs):
+        if inputs["label"] in submitted.fail:
+            raise ValueError(f"can not submit {inputs['label']}")
+
+        node = WorkflowNode()
+        node.set_process_state(submitted.process_state)
+        submitted.processes[inputs["label"]] = node.store()
+        return node
+
+    monkeypatch.setattr(submission_queue, "get_builder", lambda inputs: inputs)
+    monkeypatch.setattr("aiida.engine.submit", submit)
+
+    return submitted
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SubmissionQueue(tmp_path / "queue.json")
+
+
+def _states(queue):
+    return {entry["label"]: entry["state"] for entry in queue.entries()}
+
+
+def test_process_respects_limit(queue, submitted):
+    queue.set_limit("cluster", 2)
+    queue.enqueue([_inputs(f"pseudo{i}") for i in range(3)], "cluster")
+
+    assert [entry["label"] for entry in queue.process()] == ["pseudo0", "pseudo1"]
+    assert _states(queue) == {"pseudo0": ACTIVE, "pseudo1": ACTIVE, "pseudo2": QUEUED}
+
+    # the computer is still at its limit
+    assert queue.process() == []
+
+    submitted.processes["pseudo0"].set_process_state("finished")
+    assert [entry["label"] for entry in queue.process()] == ["pseudo2"]
+    assert _states(queue) == {
+        "pseudo0": FINISHED,
+        "pseudo1": ACTIVE,
+        "pseudo2": ACTIVE,
+    }
+    assert queue.entries()[2]["process"] == submitted.processes["pseudo2"].uuid
+
+
+def test_process_limit_per_computer(queue, submitted):
+    queue.set_limit("cluster", 1)
+    queue.enqueue([_inputs("pseudo0"), _inputs("pseudo1")], "cluster")
+    queue.enqueue([_inputs("pseudo2")], "localhost")
+
+    queue.process()
+
+    assert _states(queue) == {"pseudo0": ACTIVE, "pseudo1": QUEUED, "pseudo2": ACTIVE}
+    assert queue.limit("localhost") == DEFAULT_MAX_ACTIVE
+
+
+def test_process_failed_submission(queue, submitted):
+    submitted.fail.append("pseudo0")
+    queue.set_limit("cluster", 1)
+    queue.enqueue([_inputs("pseudo0"), _inputs("pseudo1")], "cluster")
+
+    queue.process()
+
+    # the failed entry does not take the place of the next one
+    assert _states(queue) == {"pseudo0": FAILED, "pseudo1": ACTIVE}
+    assert queue.entries()[0]["error"] == "can not submit pseudo0"
+
+
+def test_persistence(tmp_path, submitted):
+    path = tmp_path / "queue.json"
+    queue = SubmissionQueue(path)
+    queue.set_limit("cluster", 1)
+    entry_ids = queue.enqueue([_inputs("pseudo0"), _inputs("pseudo1")], "cluster")
+    queue.process()
+
+    # the queue of the next session
+    resumed = SubmissionQueue(path)
+    assert resumed.limit("cluster") == 1
+    assert [entry["id"] for entry in resumed.entries()] == entry_ids
+    assert [entry["label"] for entry in resumed.pending()] == ["pseudo0", "pseudo1"]
+
+    submitted.processes["pseudo0"].set_process_state("finished")
+    resumed.process()
+    resumed.clear_done()
+
+    assert _states(SubmissionQueue(path)) == {"pseudo1": ACTIVE}
+    assert not (tmp_path / "queue.json.tmp").exists()
+
+
+def test_widget_process_without_loop(queue, submitted):
+    calls = []
+    widget = SubmissionQueueWidget(queue=queue, on_processed=lambda: calls.append(1))
+    widget.computer = "cluster"
+    widget.max_active.value = 1
+
+    assert widget.enqueue([_inputs("pseudo0"), _inputs("pseudo1")], "cluster")
+    assert _states(queue) == {"pseudo0": ACTIVE, "pseudo1": QUEUED}
+    assert calls == [1]
+    # processed once, nothing is scheduled
+    assert widget._handle is None
+    assert "1 queued" in widget.status.value
+
+
+def test_widget_process_on_loop(queue, submitted):
+    widget = SubmissionQueueWidget(queue=queue, interval=0.01)
+    widget.computer = "cluster"
+    widget.max_active.value = 1
+
+    async def run():
+        widget.enqueue([_inputs("pseudo0"), _inputs("pseudo1")], "cluster")
+        assert widget._handle is not None
+
+        submitted.processes["pseudo0"].set_process_state("finished")
+        await asyncio.sleep(0.1)
+        assert _states(queue) == {"pseudo0": FINISHED, "pseudo1": ACTIVE}
+
+        widget.stop()
+        assert widget._handle is None
+
+    asyncio.run(run())
+
+
+def test_widget_resumes_on_loop(queue, submitted):
+    queue.set_limit("cluster", 1)
+    queue.enqueue([_inputs("pseudo0")], "cluster")
+
+    # not resumed without a running loop
+    SubmissionQueueWidget(queue=queue)
+    assert _states(queue) == {"pseudo0": QUEUED}
+
+    async def run_widget():
+        widget = SubmissionQueueWidget(queue=queue, interval=0.01)
+        await asyncio.sleep(0.05)
+        assert _states(queue) == {"pseudo0": ACTIVE}
+        widget.stop()
+
+    asyncio.run(run_widget())
+
+
+def test_run_without_kernel(queue, submitted):
+    queue.set_limit("cluster", 1)
+    queue.enqueue([_inputs(f"pseudo{i}") for i in range(3)], "cluster")
+
+    run(queue, once=True)
+    assert _states(queue) == {"pseudo0": ACTIVE, "pseudo1": QUEUED, "pseudo2": QUEUED}
+
+    # the verifications finish right away, run until the queue is empty
+    submitted.process_state = "finished"
+    submitted.processes["pseudo0"].set_process_state("finished")
+    run(queue, interval=0)
+    assert _states(queue) == {
+        "pseudo0": FINISHED,
+        "pseudo1": FINISHED,
+        "pseudo2": FINISHED,
+    }
@@ -0,0 +1,123 @@
+import io
+from collections import OrderedDict
+from importlib import resources
+from types import SimpleNamespace
+
+import pytest
+from pseudo_parser.upf_parser import parse
+
+from aiidalab_sssp import upf_header
+from aiidalab_sssp.upf_header import (
+    _header_lines,
+    parse_header,
+    pseudo_header,
+)
+
+UPF_FILES = sorted(
+    path.name
+    for path in (resources.files("aiida_sssp_workflow") / "statics" / "upf").iterdir()
+    if path.name.endswith(".upf")
+)
+
+UPF_V1 = """\
+<PP_INFO>
+  Generated by new atomic code, or converted to UPF format
+</PP_INFO>
+<PP_HEADER>
+   0                   Version Number
+  Si                   Element
+   NC                  Norm - Conserving pseudopotential
+    F                  Nonlinear Core Correction
+ SLA  PW   PBE  PBE     PBE  Exchange-Correlation functional
+    4.00000000000      Z valence
+</PP_HEADER>
+<PP_MESH>
+</PP_MESH>
+"""
+
+UPF_V2 = """\
+<UPF version="2.0.1">
+  <PP_HEADER generated='Generated using "atomic" code'
+             element="Fe"
+             pseudo_type="USPP"
+             z_valence="1.600000000000000E+001"
+             number_of_proj="6"/>
+  <PP_MESH dx="1.25E-002" mesh="1085"/>
+</UPF>
+"""
+
+
+@pytest.fixture(autouse=True)
+def header_cache(monkeypatch):
+    monkeypatch.setattr(upf_header, "_HEADER_CACHE", OrderedDict())
+
+
+@pytest.mark.parametrize("filename", UPF_FILES)
+def test_parse_header_bundled(filename):
+    path = resources.files("aiida_sssp_workflow") / "statics" / "upf" / filename
+
+    with path.open("rb") as stream:
+        header = parse_header(stream)
+
+    assert header == parse(path.read_text())
+
+
+@pytest.mark.parametrize("content", [UPF_V1, UPF_V2])
+def test_parse_header(content):
+    assert parse_header(io.BytesIO(content.encode())) == parse(content)
+    assert parse_header(io.StringIO(content)) == parse(content)
+
+
+def test_parse_header_missing():
+    with pytest.raises(ValueError, match="no PP_HEADER"):
+        parse_header(io.StringIO("<UPF>\n</UPF>\n"))
+
+
+@pytest.mark.parametrize(
+    "content, header",
+    [
+        # the v1 block up to its closing tag
+        (UPF_V1, UPF_V1[UPF_V1.index("<PP_HEADER>") : UPF_V1.index("<PP_MESH>")]),
+        # the v2 tag spanning several lines
+        (UPF_V2, UPF_V2[UPF_V2.index("<PP_HEADER") : UPF_V2.index('/>\n') + 2]),
+        # the tag is closed before the next tag on the same line
+        ('<PP_HEADER element="O"/><PP_MESH/>\n', '<PP_HEADER element="O"/>'),
+        # a `/>` in the quoted values does not close the tag
+        (
+            '<PP_HEADER comment="<b/>"\n element="O"\n/>\n<PP_MESH/>\n',
+            '<PP_HEADER comment="<b/>"\n element="O"\n/>',
+        ),
+        # a v2 tag closed by `</PP_HEADER>`
+        (
+            '<PP_HEADER element="O">\n</PP_HEADER>\n<PP_MESH/>\n',
+            '<PP_HEADER element="O">\n</PP_HEADER>\n',
+        ),
+    ],
+)
+def test_header_lines(content, header):
+    assert "".join(_header_lines(io.StringIO(content))) == header
+
+
+def test_pseudo_header_cached():
+    opened = []
+
+    def open_stream(mode):
+        opened.append(mode)
+        return io.BytesIO(UPF_V2.encode())
+
+    pseudo = SimpleNamespace(md5="0" * 32, open=open_stream)
+
+    assert pseudo_header(pseudo) == {"element": "Fe", "pp_type": "us", "z_valence": 16}
+    # cached by the md5, the file is not opened again
+    assert pseudo_header(pseudo)["element"] == "Fe"
+    assert opened == ["rb"]
+
+
+def test_upf_header_cache_size(monkeypatch):
+    monkeypatch.setattr(upf_header, "_CACHE_SIZE", 1)
+
+    upf_header.upf_header(UPF_V1)
+    upf_header.upf_header(UPF_V2)
+
+    assert len(upf_header._HEADER_CACHE) == 1
+    assert next(iter(upf_header._HEADER_CACHE.values()))["element"] == "Fe"